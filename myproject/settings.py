@@ -23,11 +23,13 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'users.middleware.RequestTimingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'users.middleware.RequestProfilerMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -36,10 +38,16 @@ ROOT_URLCONF = 'myproject.urls'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'BACKEND': 'users.instrumentation.InstrumentedDjangoTemplates',
         'DIRS': [],
-        'APP_DIRS': True,
         'OPTIONS': {
+            # Parse every template once per process instead of once per render.
+            'loaders': [
+                ('django.template.loaders.cached.Loader', [
+                    'django.template.loaders.filesystem.Loader',
+                    'django.template.loaders.app_directories.Loader',
+                ]),
+            ],
             'context_processors': [
                 'django.template.context_processors.debug',
                 'django.template.context_processors.request',
@@ -60,6 +68,29 @@ DATABASES = {
     }
 }
 
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'world-photo',
+        'OPTIONS': {
+            'MAX_ENTRIES': 50000,
+        },
+    }
+}
+
+# Sessions are read through the cache and only written to the database when
+# they change. Switch to 'django.contrib.sessions.backends.signed_cookies' to
+# keep no server-side session state at all, or back to
+# 'django.contrib.sessions.backends.db'. Stale rows left by the old
+# per-visitor sessions are removed with `manage.py cleanup_sessions`.
+SESSION_ENGINE = 'django.contrib.sessions.backends.cached_db'
+
+# How long a counted profile view is remembered in the cache (users.profile_views)
+PROFILE_VIEW_CACHE_TIMEOUT = 6 * 60 * 60
+
+# How long a user's cached favorites and likes live (users.memberships)
+MEMBERSHIP_CACHE_TIMEOUT = 24 * 60 * 60
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
@@ -87,17 +118,121 @@ mimetypes.add_type("text/css", ".css", True)
 
 STATIC_URL = '/static/'
 STATICFILES_DIRS = [BASE_DIR / 'static']
+STATIC_ROOT = BASE_DIR / 'staticfiles'
+
+# `collectstatic` writes content-hashed, minified and precompressed files
+# (see users/storage.py); they are served by users.static_serve.
+STORAGES = {
+    'default': {
+        'BACKEND': 'django.core.files.storage.FileSystemStorage',
+    },
+    'staticfiles': {
+        'BACKEND': 'users.storage.OptimizedManifestStaticFilesStorage',
+    },
+}
+STATIC_RESPONSIVE_IMAGES = ['img/slideshow/*.jpg']
+STATIC_RESPONSIVE_WIDTHS = [640, 1280, 1920]
 
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Медиафайлы в S3-совместимом хранилище (users/object_storage.py), если задан
+# бакет. Фото тогда загружаются браузером напрямую по подписанной ссылке;
+# бакету нужен CORS, разрешающий PUT с адреса сайта.
+S3_BUCKET = os.environ.get('S3_BUCKET', '')
+S3_ENDPOINT_URL = os.environ.get('S3_ENDPOINT_URL', 'https://s3.amazonaws.com')
+S3_REGION = os.environ.get('S3_REGION', 'us-east-1')
+S3_ACCESS_KEY_ID = os.environ.get('S3_ACCESS_KEY_ID', '')
+S3_SECRET_ACCESS_KEY = os.environ.get('S3_SECRET_ACCESS_KEY', '')
+S3_PUBLIC_URL = os.environ.get('S3_PUBLIC_URL', '')  # CDN or public bucket URL; presigned GET URLs otherwise
+if S3_BUCKET:
+    STORAGES['default'] = {'BACKEND': 'users.object_storage.S3Storage'}
+PHOTO_UPLOAD_MAX_SIZE = 20 * 1024 * 1024
+
+# Без S3 фото загружаются фрагментами с докачкой (users/chunked_uploads.py).
+CHUNKED_UPLOAD_DIR = BASE_DIR / 'uploads_tmp'
+CHUNKED_UPLOAD_CHUNK_SIZE = 2 * 1024 * 1024
+CHUNKED_UPLOAD_EXPIRES = 24 * 60 * 60  # seconds; then `manage.py cleanup_uploads` removes them
+
 LOGIN_REDIRECT_URL = 'home'
 LOGOUT_REDIRECT_URL = 'home'
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
+# Request instrumentation (users.middleware.RequestTimingMiddleware)
+SERVER_TIMING_HEADER = DEBUG
+SLOW_REQUEST_THRESHOLD_MS = 500
+
+# On-demand request profiler (users.profiler)
+PROFILER_ENABLED = True
+PROFILER_DIR = BASE_DIR / 'profiles'
+PROFILER_TOKEN_MAX_AGE = 24 * 60 * 60
+PROFILER_SAMPLE_INTERVAL_MS = 1
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'formatters': {
+        'json_line': {
+            'format': '{"time": "%(asctime)s", "request": %(message)s}',
+        },
+    },
+    'handlers': {
+        'slow_requests_file': {
+            'class': 'logging.FileHandler',
+            'filename': BASE_DIR / 'slow_requests.log',
+            'formatter': 'json_line',
+            'delay': True,
+        },
+    },
+    'loggers': {
+        'users.slow_requests': {
+            'handlers': ['slow_requests_file'],
+            'level': 'WARNING',
+            'propagate': False,
+        },
+    },
+}
+
+# Письма не отправляются из запроса: они попадают в очередь (users/outbox.py)
+# в той же транзакции, а `manage.py send_outbox` отправляет их пачками.
+EMAIL_BACKEND = 'users.outbox.OutboxBackend'
+OUTBOX_BATCH_SIZE = 100
+OUTBOX_MAX_ATTEMPTS = 8
+OUTBOX_RETRY_DELAY = 60  # seconds, doubled after every failed attempt
+OUTBOX_MAX_RETRY_DELAY = 6 * 60 * 60
+OUTBOX_LEASE = 10 * 60  # seconds a claimed batch stays with its worker
+
+# Удаление аккаунта только деактивирует пользователя; данные и файлы удаляет
+# `manage.py purge_accounts` пачками (users/purge.py).
+PURGE_BATCH_SIZE = 500
+
+# «Похожие фотографы» на странице фотографа пересчитывает
+# `manage.py build_recommendations` (users/recommendations.py); NumPy и SciPy
+# ускоряют расчёт, но не обязательны.
+SIMILAR_PHOTOGRAPHERS_COUNT = 6
+
+# Каталог фотографов по умолчанию отсортирован по популярности; её
+# пересчитывает `manage.py update_popularity` (users/popularity.py), например раз в час.
+POPULARITY_LIKES_DAYS = 30  # учитываются лайки за последние N дней
+
+# Подсказки городов (users/cities.py) отвечают из дерева префиксов в памяти
+# процесса; оно перестраивается раз в CITY_INDEX_TIMEOUT секунд.
+CITY_SUGGESTIONS = 10
+CITY_INDEX_TIMEOUT = 5 * 60
+
+# Гистограммы цен для фильтра каталога (модель PriceBucket): шаг в рублях и
+# граница, начиная с которой все цены попадают в последний столбец.
+PRICE_BUCKET_WIDTH = 500
+PRICE_BUCKET_MAX = 20000
+
+# `manage.py serve` (gunicorn, users/server.py): число рабочих процессов (по умолчанию
+# по числу ядер) и страницы, которые запрашиваются при прогреве до запуска.
+SERVE_WORKERS = None
+SERVE_WARMUP_PATHS = ['/', '/users/specialists/']
+
 # Настройки отправки почты через Gmail (для реальной отправки)
-EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
+OUTBOX_DELIVERY_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
 EMAIL_HOST = 'smtp.gmail.com'
 EMAIL_PORT = 587
 EMAIL_USE_TLS = True
@@ -1,6 +1,7 @@
 from django.contrib import admin
 from django.urls import path, include
 from users.views import home
+from users.static_serve import serve_static
 from django.conf import settings
 from django.conf.urls.static import static
 
@@ -8,4 +9,5 @@ urlpatterns = [
     path('admin/', admin.site.urls),
     path('', home, name='home'),
     path('users/', include('users.urls')),
+    path(f"{settings.STATIC_URL.strip('/')}/<path:path>", serve_static),
 ] + static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
@@ -0,0 +1,197 @@
+"""
+Booking inboxes.
+
+A photographer's ``received`` inbox and anybody's ``sent`` inbox are read a
+page at a time with keyset pagination. Rows are ordered by
+``(created_at, id)`` descending, and the cursor of the last row on a page
+starts the next page. Each query is then a range scan of the
+``(photographer, status, created_at)`` or ``(client, status, created_at)``
+index, with no OFFSET and no COUNT. The totals come from
+``BookingCounter`` instead.
+
+Status changes and archiving go through the ``BookingRequest.TRANSITIONS``
+state machine. They work on whole querysets: ``perform`` issues one
+``UPDATE`` per transition, whether it targets one booking or a whole
+season, and adjusts ``BookingCounter`` with grouped counts taken before and
+after, in the same transaction. A booking archived by both sides is no
+longer visible anywhere and is deleted.
+"""
+from collections import Counter
+
+from django.db import transaction
+from django.db.models import Count, Q
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from . import notifications
+from .models import BookingCounter, BookingRequest
+
+BOXES = {
+    # box: (owner lookup, hidden-by-owner flag, related rows shown on a card)
+    'received': ('photographer__user', 'is_deleted_by_photographer', ('client',)),
+    'sent': ('client', 'is_deleted_by_client', ('photographer__user',)),
+}
+STATUSES = [status for status, _ in BookingRequest.STATUS_CHOICES]
+ACTIVE_STATUSES = ['new', 'in_progress', 'cancelled']
+COMPLETED_STATUSES = ['completed']
+
+PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+# action: target status, or None for archiving
+ACTIONS = {
+    'start': 'in_progress',
+    'complete': 'completed',
+    'cancel': 'cancelled',
+    'archive': None,
+}
+BOX_ACTIONS = {
+    'received': ('start', 'complete', 'cancel', 'archive'),
+    'sent': ('cancel', 'archive'),
+}
+
+
+def parse_statuses(value):
+    """``"new,in_progress"`` -> list of statuses; ValueError on unknown ones."""
+    statuses = [status for status in (value or '').split(',') if status]
+    unknown = set(statuses) - set(STATUSES)
+    if unknown:
+        raise ValueError(f"Unknown status: {', '.join(sorted(unknown))}")
+    return statuses
+
+
+def make_cursor(booking):
+    return f'{booking.created_at.isoformat()}|{booking.pk}'
+
+
+def parse_cursor(cursor):
+    created_at, _, pk = (cursor or '').rpartition('|')
+    created_at = parse_datetime(created_at) if created_at else None
+    if created_at is None or not pk.isdigit():
+        raise ValueError("Invalid cursor")
+    return created_at, int(pk)
+
+
+def owned(user, box):
+    """Bookings in ``user``'s ``box`` that they have not archived."""
+    owner, hidden, _ = BOXES[box]
+    return BookingRequest.objects.filter(**{owner: user, hidden: False})
+
+
+def inbox(user, box, statuses=None):
+    bookings = owned(user, box).select_related(*BOXES[box][2])
+    if statuses:
+        bookings = bookings.filter(status__in=statuses)
+    return bookings.order_by('-created_at', '-pk')
+
+
+def page(bookings, before=None, limit=PAGE_SIZE):
+    """One page of an ``inbox`` queryset: ``(bookings, cursor of the next page or None)``."""
+    if before is not None:
+        created_at, pk = before
+        bookings = bookings.filter(Q(created_at__lt=created_at) | Q(created_at=created_at, pk__lt=pk))
+    items = list(bookings[:limit + 1])
+    if len(items) > limit:
+        items = items[:limit]
+        return items, make_cursor(items[-1])
+    return items, None
+
+
+def counts(user, box):
+    return BookingCounter.for_user(user, box)
+
+
+def as_json(booking, box):
+    data = {
+        'id': booking.pk,
+        'status': booking.status,
+        'status_display': booking.get_status_display(),
+        'message': booking.message,
+        'contact_phone': booking.contact_phone,
+        'created_at': booking.created_at.isoformat(),
+    }
+    if box == 'received':
+        data['client'] = booking.client.username
+    else:
+        data['photographer'] = booking.photographer.user.username
+        data['photographer_id'] = booking.photographer_id
+    return data
+
+
+# --- State changes ---------------------------------------------------------
+
+def counter_totals(bookings):
+    """BookingCounter contributions of ``bookings``: ``{(user_id, box, status): count}``."""
+    totals = Counter()
+    for box, (owner, hidden, _) in BOXES.items():
+        rows = bookings.filter(**{hidden: False}).values_list(owner, 'status').annotate(total=Count('pk'))
+        totals.update({(user_id, box, status): total for user_id, status, total in rows})
+    return totals
+
+
+def _locked(bookings):
+    """Freeze the rows a transition applies to so the counts before and after see the same set."""
+    pks = list(bookings.order_by().select_for_update().values_list('pk', flat=True))
+    return BookingRequest.objects.filter(pk__in=pks) if pks else None
+
+
+def _update(bookings, **changes):
+    if bookings is None:
+        return 0
+    before = counter_totals(bookings)
+    updated = bookings.update(**changes)
+    after = counter_totals(bookings)
+    BookingCounter.apply({key: after[key] - before[key] for key in before.keys() | after.keys()})
+    return updated
+
+
+def change_status(bookings, status, notify=None):
+    """Move every booking in ``bookings`` that is allowed to become ``status``; returns how many moved.
+
+    ``notify`` (``'client'`` or ``'photographer'``) queues an email to that
+    side of every moved booking in the same transaction.
+    """
+    sources = [source for source, targets in BookingRequest.TRANSITIONS.items() if status in targets]
+    with transaction.atomic():
+        target = _locked(bookings.filter(status__in=sources))
+        changed = _update(target, status=status, updated_at=timezone.now())
+        if changed and notify:
+            notifications.bookings_status_changed(target.values_list('pk', flat=True), notify)
+    return changed
+
+
+def archive(bookings, box):
+    """Hide finished bookings from ``box``; ones hidden from both sides are deleted."""
+    hidden = BOXES[box][1]
+    with transaction.atomic():
+        target = _locked(bookings.filter(status__in=BookingRequest.FINAL_STATUSES, **{hidden: False}))
+        archived = _update(target, **{hidden: True, 'updated_at': timezone.now()})
+        if archived:
+            purge(target)
+    return archived
+
+
+def purge(bookings):
+    """Delete bookings that both sides have archived. They are not counted anywhere."""
+    deleted, _ = bookings.filter(is_deleted_by_client=True, is_deleted_by_photographer=True).delete()
+    return deleted
+
+
+def discard(bookings):
+    """Delete ``bookings`` whatever their state (account purge), keeping the counters right."""
+    with transaction.atomic():
+        target = _locked(bookings)
+        if target is None:
+            return 0
+        _update(target, is_deleted_by_client=True, is_deleted_by_photographer=True)
+        return purge(target)
+
+
+def perform(action, box, bookings):
+    """Run ``action`` on ``bookings`` as the owner of ``box``; returns how many bookings changed."""
+    if action not in BOX_ACTIONS[box]:
+        raise ValueError(f"Action {action!r} is not available for {box} bookings")
+    status = ACTIONS[action]
+    if status is None:
+        return archive(bookings, box)
+    return change_status(bookings, status, notify='client' if box == 'received' else 'photographer')
@@ -0,0 +1,172 @@
+"""
+Chunked, resumable photo uploads.
+
+The dashboard splits each selected file into ``CHUNKED_UPLOAD_CHUNK_SIZE``
+pieces and sends them as separate requests, several at a time:
+
+* ``create`` registers the file (name, size, category). It returns the
+  upload id and the chunk size, and preallocates a sparse file of the full
+  size in ``CHUNKED_UPLOAD_DIR``.
+* Every chunk is a ``PUT`` with ``Upload-Offset``. The offset must be a
+  chunk boundary and the body exactly that chunk's length. The body is
+  streamed into place, so the file's chunks can arrive in any order and in
+  parallel.
+* ``status`` lists the chunks already received. After a disconnect the
+  client sends only the missing ones, also after a page reload.
+* ``finish`` runs once all chunks are in. It checks the file is an image
+  and hands it to the normal ingestion path: ``Photo.save`` compresses it
+  and the media storage stores it. It then makes the thumbnail. If storing
+  fails, the upload goes back to ``uploading`` so ``finish`` can be retried.
+
+Parts live on the local disk of the node that received them. Behind a load
+balancer, ``CHUNKED_UPLOAD_DIR`` has to be a shared volume or uploads
+sticky. ``manage.py cleanup_uploads`` removes abandoned uploads.
+"""
+import os
+from datetime import timedelta
+from pathlib import Path
+
+from django.conf import settings
+from django.core.files.uploadedfile import UploadedFile
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from PIL import Image, UnidentifiedImageError
+
+from .models import ChunkedUpload, ChunkedUploadPart, Photo
+from .thumbnails import thumbnail_url
+
+COPY_BUFFER = 64 * 1024
+
+
+class UploadError(ValueError):
+    """A refused request; ``status`` is the HTTP status to answer with."""
+
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+def chunk_size():
+    return getattr(settings, 'CHUNKED_UPLOAD_CHUNK_SIZE', 2 * 1024 * 1024)
+
+
+def max_size():
+    return getattr(settings, 'PHOTO_UPLOAD_MAX_SIZE', 20 * 1024 * 1024)
+
+
+def upload_dir():
+    return Path(getattr(settings, 'CHUNKED_UPLOAD_DIR', Path(settings.MEDIA_ROOT).parent / 'uploads_tmp'))
+
+
+def part_path(upload):
+    return upload_dir() / f'{upload.pk}.part'
+
+
+def create(profile, filename, size, category):
+    if not 0 < size <= max_size():
+        raise UploadError(f'Файл должен быть не больше {max_size() // (1024 * 1024)} МБ.')
+    upload = ChunkedUpload.objects.create(
+        photographer=profile, filename=os.path.basename(filename)[:255] or 'photo.jpg', size=size,
+        chunk_size=chunk_size(), category=category,
+    )
+    upload_dir().mkdir(parents=True, exist_ok=True)
+    with open(part_path(upload), 'wb') as part:
+        part.truncate(size)
+    return upload
+
+
+def received(upload):
+    return list(upload.parts.order_by('index').values_list('index', flat=True))
+
+
+def write_chunk(upload, offset, length, stream):
+    """Store the chunk at ``offset`` read from ``stream``; returns its index."""
+    if upload.status != 'uploading':
+        raise UploadError('Загрузка уже завершена.', status=409)
+    index, misaligned = divmod(offset, upload.chunk_size)
+    if misaligned or not 0 <= index < upload.chunk_count:
+        raise UploadError('Неверное смещение фрагмента.', status=409)
+    if length != upload.chunk_length(index):
+        raise UploadError('Неверный размер фрагмента.', status=409)
+
+    remaining = length
+    with open(part_path(upload), 'r+b') as part:
+        part.seek(offset)
+        while remaining:
+            data = stream.read(min(COPY_BUFFER, remaining))
+            if not data:
+                raise UploadError('Фрагмент получен не полностью.')
+            part.write(data)
+            remaining -= len(data)
+    try:
+        # A chunk sent again (a retry after a lost response) is simply rewritten.
+        with transaction.atomic():
+            ChunkedUploadPart.objects.create(upload=upload, index=index)
+    except IntegrityError:
+        pass
+    return index
+
+
+def finish(upload):
+    """Turn a fully received upload into a ``Photo``; returns it (also when already finished)."""
+    if upload.status == 'done' and upload.photo_id:
+        return upload.photo
+    if upload.parts.count() != upload.chunk_count:
+        raise UploadError('Получены не все фрагменты.', status=409)
+    # Only one of concurrent finishing requests gets past this line.
+    if not ChunkedUpload.objects.filter(pk=upload.pk, status='uploading').update(status='processing'):
+        raise UploadError('Загрузка уже обрабатывается.', status=409)
+
+    path = part_path(upload)
+    try:
+        with Image.open(path) as image:
+            image.verify()
+    except (UnidentifiedImageError, OSError, SyntaxError):
+        discard(upload)
+        raise UploadError('Файл не является изображением.')
+
+    try:
+        with open(path, 'rb') as part:
+            photo = Photo.objects.create(
+                photographer=upload.photographer, category=upload.category,
+                image=UploadedFile(part, name=upload.filename, size=upload.size),
+            )
+    except Exception:
+        # The parts are still there: let the client finish again.
+        ChunkedUpload.objects.filter(pk=upload.pk).update(status='uploading')
+        raise
+    upload.status, upload.photo = 'done', photo
+    upload.save(update_fields=['status', 'photo'])
+    upload.parts.all().delete()
+    path.unlink(missing_ok=True)
+    thumbnail_url(photo.image)
+    return photo
+
+
+def discard(upload):
+    part_path(upload).unlink(missing_ok=True)
+    upload.delete()
+
+
+def cleanup(older_than=None):
+    """Remove unfinished uploads started before ``older_than`` and stray part files; returns counts."""
+    older_than = older_than or timezone.now() - timedelta(
+        seconds=getattr(settings, 'CHUNKED_UPLOAD_EXPIRES', 24 * 60 * 60))
+    expired = 0
+    for upload in ChunkedUpload.objects.filter(created_at__lt=older_than).exclude(status='done').iterator():
+        discard(upload)
+        expired += 1
+    finished, _ = ChunkedUpload.objects.filter(created_at__lt=older_than, status='done').delete()
+
+    strays = 0
+    directory = upload_dir()
+    if directory.is_dir():
+        with os.scandir(directory) as entries:
+            names = [entry.name for entry in entries if entry.name.endswith('.part')]
+        known = {f'{pk}.part' for pk in ChunkedUpload.objects.values_list('pk', flat=True)}
+        for name in names:
+            path = directory / name
+            if name not in known and path.stat().st_mtime < older_than.timestamp():
+                path.unlink(missing_ok=True)
+                strays += 1
+    return {'expired': expired, 'finished': finished, 'strays': strays}
@@ -0,0 +1,136 @@
+"""
+Cities photographers work in.
+
+``PhotographerProfile.city`` stays the text shown on pages, but every
+profile also points at a ``City`` row, found or created by its search key
+whenever the profile is saved. The key is the casefolded name with
+``ё`` read as ``е`` and whitespace collapsed, so "москва", "Москва " and
+"МОСКВА" are one city. SQLite's LIKE only folds ASCII letters, so the
+catalog filter compares keys instead: an indexed equality lookup when the
+typed text is a known city, an indexed range (prefix) lookup otherwise.
+
+Autocompletion is answered from a process-local trie of all keys. Each node
+keeps its ``CITY_SUGGESTIONS`` best completions, those with the most
+photographers, so a lookup costs one step per typed character and no query.
+The trie is rebuilt every ``CITY_INDEX_TIMEOUT`` seconds, and at once when
+this process adds a city.
+"""
+import time
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Count, Q
+
+from .models import City
+
+# Above every character a key can contain: key__lt=prefix + KEY_END ends a prefix range.
+KEY_END = '\U0010ffff'
+
+_index = None
+
+
+def normalize(name):
+    return ' '.join((name or '').split()).casefold().replace('ё', 'е')
+
+
+def limit():
+    return getattr(settings, 'CITY_SUGGESTIONS', 10)
+
+
+class Trie:
+    """Prefix tree whose nodes keep the first ``limit`` items inserted below them."""
+
+    def __init__(self, limit):
+        self.limit = limit
+        self.root = ({}, [])
+
+    def insert(self, key, item):
+        """Add ``item`` under ``key``; insert the best items first."""
+        node = self.root
+        for char in key:
+            if len(node[1]) < self.limit:
+                node[1].append(item)
+            node = node[0].setdefault(char, ({}, []))
+        if len(node[1]) < self.limit:
+            node[1].append(item)
+
+    def complete(self, prefix):
+        node = self.root
+        for char in prefix:
+            node = node[0].get(char)
+            if node is None:
+                return []
+        return node[1]
+
+
+class CityIndex:
+
+    def __init__(self):
+        self.built_at = time.monotonic()
+        self.trie = Trie(limit())
+        self.by_key = {}
+        cities = (
+            City.objects.annotate(photographers_count=Count('photographers', filter=Q(photographers__user__is_active=True)))
+            .order_by('-photographers_count', 'name').values_list('pk', 'key', 'name')
+        )
+        for pk, key, name in cities:
+            self.by_key[key] = pk
+            self.trie.insert(key, name)
+
+    def expired(self):
+        return time.monotonic() - self.built_at > getattr(settings, 'CITY_INDEX_TIMEOUT', 5 * 60)
+
+
+def index():
+    global _index
+    if _index is None or _index.expired():
+        _index = CityIndex()
+    return _index
+
+
+def invalidate():
+    global _index
+    _index = None
+
+
+def suggest(prefix):
+    """Names of the best known cities starting with ``prefix``, in any case."""
+    key = normalize(prefix)
+    return index().trie.complete(key) if key else []
+
+
+def resolve(name):
+    """The ``City`` for the free-text ``name``, created if new; None for a blank name."""
+    key = normalize(name)
+    if not key:
+        return None
+    try:
+        return City.objects.get(key=key)
+    except City.DoesNotExist:
+        pass
+    try:
+        with transaction.atomic():
+            city = City.objects.create(key=key, name=' '.join(name.split()))
+    except IntegrityError:  # created concurrently
+        return City.objects.get(key=key)
+    invalidate()
+    return city
+
+
+def assign(profile):
+    """Point ``profile`` at the ``City`` its text names and spell the text like that city."""
+    city = resolve(profile.city)
+    profile.city_ref = city
+    if city is not None:
+        profile.city = city.name
+
+
+def filter_by_city(queryset, text):
+    """Photographers of the city ``text`` names, or of every city starting with it."""
+    key = normalize(text)
+    if not key:
+        return queryset
+    pk = index().by_key.get(key)
+    if pk is not None:
+        return queryset.filter(city_ref_id=pk)
+    return queryset.filter(city_ref__in=City.objects.filter(key__gte=key, key__lt=key + KEY_END))
@@ -0,0 +1,33 @@
+"""
+Helpers for conditional GET in views that compute their own validators.
+
+Views build an ETag and Last-Modified from a cheap query and call
+``conditional_response`` before any heavy query or template work. When the
+client's copy is still current the view returns that 304 response at once.
+Otherwise it renders as usual and passes the result through
+``with_validators``.
+
+A page that still has flash messages to show is always rendered in full.
+A 304 would leave those messages queued for some later page.
+"""
+from django.contrib.messages import get_messages
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+
+
+def conditional_response(request, etag, last_modified=None):
+    """Return a 304/412 response if the request's preconditions allow it, else None."""
+    if request.method not in ('GET', 'HEAD') or len(get_messages(request)):
+        return None
+    timestamp = int(last_modified.timestamp()) if last_modified else None
+    response = get_conditional_response(request, etag=etag, last_modified=timestamp)
+    if response is not None:
+        with_validators(response, etag, last_modified)
+    return response
+
+
+def with_validators(response, etag, last_modified=None):
+    response['ETag'] = etag
+    if last_modified:
+        response['Last-Modified'] = http_date(last_modified.timestamp())
+    return response
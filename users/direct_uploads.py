@@ -0,0 +1,126 @@
+"""
+Photos uploaded by the browser straight to object storage.
+
+Uploading takes three steps, each a small request:
+
+1. ``start`` checks the file name, type and size. It picks the final
+   storage name and returns a presigned ``PUT`` URL, plus a signed token
+   that binds that name to the photographer.
+2. The browser ``PUT``s the file to the storage; no app worker is involved.
+3. ``complete`` checks the token and what actually arrived, registers the
+   ``Photo`` and processes it. Processing verifies that the object is an
+   image, compresses it like a photo posted through a form (``Photo.save``)
+   and makes the thumbnail the dashboard and admin show. An object that is
+   not acceptable is deleted again.
+
+Direct uploads need a storage with ``presigned_upload`` (``S3Storage``).
+With local disk storage the dashboard keeps posting the files to Django.
+"""
+import os
+import uuid
+
+from django.conf import settings
+from django.core import signing
+from django.core.files.storage import default_storage
+from PIL import Image, UnidentifiedImageError
+
+from .models import Photo, compress_image
+from .thumbnails import thumbnail_url
+
+TOKEN_SALT = 'users.direct_uploads'
+CONTENT_TYPES = {
+    'image/jpeg': ('.jpg', '.jpeg'),
+    'image/png': ('.png',),
+    'image/webp': ('.webp',),
+    'image/gif': ('.gif',),
+}
+
+
+def is_available(storage=None):
+    return hasattr(storage or default_storage, 'presigned_upload')
+
+
+def max_size():
+    return getattr(settings, 'PHOTO_UPLOAD_MAX_SIZE', 20 * 1024 * 1024)
+
+
+def expires():
+    return getattr(settings, 'PHOTO_UPLOAD_EXPIRES', 15 * 60)
+
+
+def storage_name(filename, content_type):
+    """A fresh name under the ``Photo.image`` upload directory, keeping a sane extension."""
+    extension = os.path.splitext(filename)[1].lower()
+    if extension not in CONTENT_TYPES[content_type]:
+        extension = CONTENT_TYPES[content_type][0]
+    return f"{Photo._meta.get_field('image').upload_to}/{uuid.uuid4().hex}{extension}"
+
+
+def start(profile, filename, content_type, size):
+    """Presigned upload for one file of ``profile``; ValueError with a user-facing message if refused."""
+    if not is_available():
+        raise ValueError('Прямая загрузка недоступна.')
+    if content_type not in CONTENT_TYPES:
+        raise ValueError('Можно загружать только изображения JPEG, PNG, WebP или GIF.')
+    if not 0 < size <= max_size():
+        raise ValueError(f'Файл должен быть не больше {max_size() // (1024 * 1024)} МБ.')
+    name = storage_name(filename, content_type)
+    upload = default_storage.presigned_upload(name, content_type, expires())
+    upload['token'] = signing.dumps({'name': name, 'profile': profile.pk}, salt=TOKEN_SALT)
+    return upload
+
+
+def complete(profile, token, category):
+    """Register the photo uploaded under ``token``; ValueError with a user-facing message if refused."""
+    try:
+        data = signing.loads(token, salt=TOKEN_SALT, max_age=expires() + 60 * 60)
+    except signing.BadSignature:
+        raise ValueError('Ссылка для загрузки недействительна или устарела.') from None
+    if data['profile'] != profile.pk:
+        raise ValueError('Ссылка для загрузки недействительна или устарела.')
+    name = data['name']
+    # Completing twice (a retried request) registers the photo once. By then
+    # the original may have been replaced by its compressed JPEG.
+    photo = Photo.objects.filter(photographer=profile, image__in={name, compressed_name(name)}).first()
+    if photo is not None:
+        return photo
+    try:
+        size = default_storage.size(name)
+    except FileNotFoundError:
+        raise ValueError('Файл не был загружен.') from None
+    if size > max_size():
+        default_storage.delete(name)
+        raise ValueError(f'Файл должен быть не больше {max_size() // (1024 * 1024)} МБ.')
+    photo = Photo(photographer=profile, image=name, category=category)
+    if not process(photo):
+        default_storage.delete(name)
+        raise ValueError('Файл не является изображением.')
+    photo.save()
+    return photo
+
+
+def compressed_name(name):
+    return f"{os.path.splitext(name)[0]}.jpg"
+
+
+def process(photo):
+    """Check the uploaded object is an image, compress it and make its thumbnail; False if it is not an image."""
+    try:
+        with photo.image.open('rb') as source:
+            Image.open(source).verify()
+    except (UnidentifiedImageError, OSError, SyntaxError):
+        return False
+    compress(photo)
+    thumbnail_url(photo.image)
+    return True
+
+
+def compress(photo):
+    """Replace the uploaded original with the JPEG ``Photo.save`` would have stored for a form upload."""
+    with photo.image.open('rb'):
+        compressed = compress_image(photo.image, quality=70, max_width=1600)
+    if compressed is photo.image:
+        return
+    original = photo.image.name
+    default_storage.delete(original)
+    photo.image.name = default_storage.save(compressed_name(original), compressed)
@@ -0,0 +1,38 @@
+from django.contrib.syndication.views import Feed
+from django.urls import reverse, reverse_lazy
+from django.utils.feedgenerator import Atom1Feed
+from django.utils.html import strip_tags
+from django.utils.text import Truncator
+
+from .models import News
+
+FEED_ITEMS = 20
+
+
+class LatestNewsFeed(Feed):
+    title = "World Photo — новости"
+    link = reverse_lazy('news')
+    description = "Новости мира фотографии на World Photo."
+
+    def items(self):
+        return News.objects.order_by('-created_at')[:FEED_ITEMS]
+
+    def item_title(self, item):
+        return item.title
+
+    def item_description(self, item):
+        return Truncator(strip_tags(item.content)).words(60)
+
+    def item_link(self, item):
+        return reverse('news_detail', args=[item.pk])
+
+    def item_pubdate(self, item):
+        return item.created_at
+
+    def item_updateddate(self, item):
+        return item.updated_at
+
+
+class LatestNewsAtomFeed(LatestNewsFeed):
+    feed_type = Atom1Feed
+    subtitle = LatestNewsFeed.description
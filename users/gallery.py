@@ -0,0 +1,39 @@
+"""
+Version of the public gallery page, for its ETag.
+
+The gallery lists every visible photo with its photographer, so any saved
+or deleted ``Photo`` or ``PhotographerProfile`` changes it, and so does a
+``User`` that is renamed or deactivated. Rather than aggregating over all
+the photos on each request, the page carries a version token kept in the
+cache. The receivers in ``signals`` (and bulk updates, which send no
+signals) ``bump_on_commit``: the token is replaced once the transaction
+commits, a single time however many rows it changed.
+
+A token lost from the cache is simply recreated, which only makes clients
+download the page once more.
+"""
+import uuid
+
+from django.core.cache import cache
+from django.db import transaction
+
+CACHE_KEY = 'gallery:version'
+
+
+def version():
+    token = cache.get(CACHE_KEY)
+    if token is None:
+        token = uuid.uuid4().hex
+        if not cache.add(CACHE_KEY, token, None):
+            token = cache.get(CACHE_KEY, token)
+    return token
+
+
+def bump():
+    cache.set(CACHE_KEY, uuid.uuid4().hex, None)
+
+
+def bump_on_commit():
+    connection = transaction.get_connection()
+    if not any(entry[1] is bump for entry in connection.run_on_commit):
+        transaction.on_commit(bump)
@@ -0,0 +1,106 @@
+"""
+Per-request timing collection.
+
+``RequestTimingMiddleware`` (see ``users/middleware.py``) opens a
+``RequestTimings`` collector for every request. Code that wants its time
+accounted for wraps the work in ``track('<metric>')``; outside of a request
+(management commands, shell) ``track`` is a no-op.
+"""
+import heapq
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.template.backends.django import DjangoTemplates, Template
+
+_current = ContextVar('request_timings', default=None)
+
+# How many of the slowest queries are kept for the slow request log.
+WORST_QUERIES = 5
+
+
+class RequestTimings:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.durations = defaultdict(float)
+        self.query_count = 0
+        self.worst_queries = []
+        self._active = set()
+
+    @property
+    def elapsed_ms(self):
+        return (time.perf_counter() - self.started) * 1000
+
+    def ms(self, metric):
+        return self.durations.get(metric, 0.0) * 1000
+
+    def execute_wrapper(self, execute, sql, params, many, context):
+        """Database execute wrapper: counts and times every query."""
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = time.perf_counter() - start
+            self.query_count += 1
+            self.durations['db'] += duration
+            entry = (duration, self.query_count, sql)
+            if len(self.worst_queries) < WORST_QUERIES:
+                heapq.heappush(self.worst_queries, entry)
+            else:
+                heapq.heappushpop(self.worst_queries, entry)
+
+    def slowest_queries(self):
+        return [
+            {'ms': round(duration * 1000, 2), 'sql': sql}
+            for duration, _, sql in sorted(self.worst_queries, reverse=True)
+        ]
+
+
+def current():
+    """Return the collector of the request being served, or None."""
+    return _current.get()
+
+
+def activate(timings):
+    return _current.set(timings)
+
+
+def deactivate(token):
+    _current.reset(token)
+
+
+@contextmanager
+def track(metric):
+    """Add the time spent inside the block to ``metric`` of the current request.
+
+    Nested blocks for the same metric (a template rendered from inside another
+    template) are only counted once.
+    """
+    timings = _current.get()
+    if timings is None or metric in timings._active:
+        yield
+        return
+    timings._active.add(metric)
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings.durations[metric] += time.perf_counter() - start
+        timings._active.discard(metric)
+
+
+class InstrumentedTemplate(Template):
+    def render(self, context=None, request=None):
+        with track('template'):
+            return super().render(context, request)
+
+
+class InstrumentedDjangoTemplates(DjangoTemplates):
+    """The stock Django template backend with render time accounted per request."""
+
+    def from_string(self, template_code):
+        return InstrumentedTemplate(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        return InstrumentedTemplate(super().get_template(template_name).template, self)
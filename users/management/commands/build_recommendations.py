@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+
+from users import recommendations
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute the similar photographers shown on photographer pages from "
+        "favorites and likes. With --incremental, only the photographers affected "
+        "by favorites and likes added since the previous build."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--incremental', action='store_true',
+                            help="Only refresh what changed since the previous build (a full build if there is none).")
+        parser.add_argument('--count', type=int, help="Similar photographers kept per photographer.")
+
+    def handle(self, *args, **options):
+        since = recommendations.last_build() if options['incremental'] else None
+        stored = recommendations.build(since=since, k=options['count'])
+        engine = 'pure Python' if recommendations.sparse is None else 'SciPy'
+        kind = f"changes since {since:%Y-%m-%d %H:%M}" if since else "full build"
+        self.stdout.write(f"Stored similar photographers of {stored} photographers ({kind}, {engine}).")
@@ -0,0 +1,49 @@
+from django.contrib.sessions.models import Session
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+
+class Command(BaseCommand):
+    help = (
+        "Delete expired sessions and the empty sessions that used to be created "
+        "for every anonymous profile visitor. Rows are deleted in batches."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--dry-run', action='store_true', help="Only report what would be deleted.")
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        dry_run = options['dry_run']
+
+        expired = Session.objects.filter(expire_date__lt=timezone.now())
+        expired_count = expired.count()
+        if not dry_run:
+            self.delete_in_batches(expired.values_list('session_key', flat=True), batch_size)
+
+        # Sessions saved only to obtain a session key carry no data at all.
+        # Walk the live sessions in key order so no cursor stays open while deleting.
+        store = Session.get_session_store_class()()
+        live = Session.objects.filter(expire_date__gte=timezone.now()).order_by('session_key')
+        empty_count = 0
+        last_key = ''
+        while True:
+            batch = list(live.filter(session_key__gt=last_key).values_list('session_key', 'session_data')[:batch_size])
+            if not batch:
+                break
+            last_key = batch[-1][0]
+            empty_keys = [key for key, data in batch if not store.decode(data)]
+            empty_count += len(empty_keys)
+            if empty_keys and not dry_run:
+                Session.objects.filter(session_key__in=empty_keys).delete()
+
+        verb = 'Would delete' if dry_run else 'Deleted'
+        self.stdout.write(f"{verb} {expired_count} expired and {empty_count} empty sessions.")
+
+    def delete_in_batches(self, keys, batch_size):
+        while True:
+            batch = list(keys[:batch_size])
+            if not batch:
+                break
+            Session.objects.filter(session_key__in=batch).delete()
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from users.chunked_uploads import cleanup
+
+
+class Command(BaseCommand):
+    help = "Remove chunked photo uploads that were abandoned or finished long ago, and stray part files."
+
+    def handle(self, *args, **options):
+        counts = cleanup()
+        self.stdout.write(
+            f"Removed {counts['expired']} abandoned and {counts['finished']} finished uploads, "
+            f"{counts['strays']} stray part files."
+        )
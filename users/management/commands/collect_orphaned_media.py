@@ -0,0 +1,47 @@
+import os
+import time
+
+from django.conf import settings
+from django.core.files.storage import FileSystemStorage, default_storage
+from django.core.management.base import BaseCommand, CommandError
+from django.template.defaultfilters import filesizeformat
+
+from users.media_gc import collect
+
+
+class Command(BaseCommand):
+    help = (
+        "Find files under MEDIA_ROOT that no model refers to and delete them, or move them "
+        "to a quarantine directory. Only a report is printed unless --delete or --quarantine is given."
+    )
+
+    def add_arguments(self, parser):
+        action = parser.add_mutually_exclusive_group()
+        action.add_argument('--delete', action='store_true', help="Delete the orphans.")
+        action.add_argument('--quarantine', metavar='DIR', help="Move the orphans into DIR, keeping their paths.")
+        parser.add_argument('--grace-hours', type=float, default=24,
+                            help="Keep orphans modified more recently than this (uploads in flight).")
+
+    def handle(self, *args, **options):
+        if not isinstance(default_storage, FileSystemStorage):
+            raise CommandError("Only media on the local file system can be collected.")
+        root = settings.MEDIA_ROOT
+        if not os.path.isdir(root):
+            raise CommandError(f"MEDIA_ROOT {root!r} is not a directory.")
+        dry_run = not (options['delete'] or options['quarantine'])
+        stats = collect(
+            root,
+            older_than=time.time() - options['grace_hours'] * 3600,
+            dry_run=dry_run,
+            quarantine=options['quarantine'],
+        )
+        if dry_run:
+            verb = 'Would reclaim'
+        elif options['quarantine']:
+            verb = 'Quarantined'
+        else:
+            verb = 'Deleted'
+        self.stdout.write(f"{verb} {stats['files']} files, {filesizeformat(stats['bytes'])} ({stats['bytes']} bytes).")
+        self.stdout.write(f"Kept {stats['young']} orphans younger than {options['grace_hours']:g} h.")
+        if stats['missing']:
+            self.stdout.write(self.style.WARNING(f"{stats['missing']} stored names have no file."))
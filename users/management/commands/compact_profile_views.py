@@ -0,0 +1,60 @@
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from users.models import ProfileView, ProfileViewDaily
+from users.profile_views import aggregate_by_day
+
+
+class Command(BaseCommand):
+    help = (
+        "Fold ProfileView rows older than --days into per-day ProfileViewDaily "
+        "rollups and delete them. Each batch is one short transaction."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=90, help="Keep raw views for this many days.")
+        parser.add_argument('--batch-size', type=int, default=2000)
+        parser.add_argument('--pause', type=float, default=0, help="Seconds to sleep between batches.")
+
+    def handle(self, *args, **options):
+        # Whole days only, so a day is never split between raw rows and a rollup.
+        today = timezone.localdate()
+        cutoff = today - timedelta(days=options['days'])
+        old_views = ProfileView.objects.filter(date__lt=cutoff)
+
+        compacted = 0
+        while True:
+            with transaction.atomic():
+                batch_ids = list(old_views.order_by('pk').values_list('pk', flat=True)[:options['batch_size']])
+                if not batch_ids:
+                    break
+                # Every old row with a pk up to the last one selected is in this batch.
+                batch = old_views.filter(pk__lte=batch_ids[-1])
+                self.merge(aggregate_by_day(batch))
+                batch.delete()
+            compacted += len(batch_ids)
+            if options['pause']:
+                time.sleep(options['pause'])
+
+        self.stdout.write(f"Compacted {compacted} profile views older than {cutoff:%Y-%m-%d}.")
+
+    def merge(self, groups):
+        # A viewer has at most one raw row per photographer and day, so unique
+        # counts from different batches can simply be added up.
+        for group in groups:
+            updated = ProfileViewDaily.objects.filter(
+                photographer_id=group['photographer_id'], date=group['date'],
+            ).update(
+                unique_views=F('unique_views') + group['unique'],
+                total_views=F('total_views') + group['total'],
+            )
+            if not updated:
+                ProfileViewDaily.objects.create(
+                    photographer_id=group['photographer_id'], date=group['date'],
+                    unique_views=group['unique'], total_views=group['total'],
+                )
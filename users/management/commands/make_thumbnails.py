@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+
+from users.models import News, Photo, PhotographerProfile
+from users.thumbnails import thumbnail_url
+
+# The images the admin lists with a thumbnail.
+IMAGE_FIELDS = [(Photo, 'image'), (PhotographerProfile, 'profile_image'), (News, 'image')]
+
+
+class Command(BaseCommand):
+    help = (
+        "Make the thumbnails that are still missing, e.g. of images stored before uploads made them. "
+        "The admin shows a placeholder until then."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        checked = broken = 0
+        for model, field in IMAGE_FIELDS:
+            images = model.objects.exclude(**{f'{field}__isnull': True}).exclude(**{field: ''})
+            for obj in images.only('pk', field).order_by('pk').iterator(chunk_size=options['batch_size']):
+                checked += 1
+                if not thumbnail_url(getattr(obj, field)):
+                    broken += 1
+        self.stdout.write(f"Checked the thumbnails of {checked} images.")
+        if broken:
+            self.stdout.write(self.style.WARNING(f"{broken} images are missing or broken."))
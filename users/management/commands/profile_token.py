@@ -0,0 +1,18 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from users.profiler import QUERY_PARAM, make_token
+
+
+class Command(BaseCommand):
+    help = "Print a signed token that lets the given user trigger a profile of their own requests."
+
+    def add_arguments(self, parser):
+        parser.add_argument('username')
+
+    def handle(self, *args, **options):
+        try:
+            user = User.objects.get(username=options['username'])
+        except User.DoesNotExist:
+            raise CommandError(f"User {options['username']!r} does not exist")
+        self.stdout.write(f'?{QUERY_PARAM}={make_token(user)}')
@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+
+from users.models import AccountPurge
+from users.purge import claim_next, run_job
+
+
+class Command(BaseCommand):
+    help = "Delete the rows and media files of deactivated accounts queued for purging."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=None)
+        parser.add_argument('--retry-failed', action='store_true', help="Queue failed jobs again before running.")
+
+    def handle(self, *args, **options):
+        if options['retry_failed']:
+            retried = AccountPurge.objects.filter(status='failed').update(status='pending')
+            self.stdout.write(f"Requeued {retried} failed jobs.")
+        done = failed = 0
+        while (job := claim_next()) is not None:
+            run_job(job, options['batch_size'])
+            if job.status == 'done':
+                done += 1
+            else:
+                failed += 1
+                self.stderr.write(f"{job.username} (#{job.user_id}): {job.last_error}")
+            self.stdout.write(f"{job.username}: {job.deleted_rows} rows, {job.deleted_files} files, {job.status}.")
+        self.stdout.write(f"Done: {done} purged, {failed} failed.")
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from users import search
+
+
+class Command(BaseCommand):
+    help = "Recreate the full-text search index of photographers and news from scratch."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        if not search.is_supported():
+            raise CommandError("Full-text search needs the SQLite FTS5 extension.")
+        for table, count in search.rebuild(options['batch_size']).items():
+            self.stdout.write(f"{table}: {count} rows indexed.")
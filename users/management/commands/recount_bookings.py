@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from users.models import BookingCounter
+
+
+class Command(BaseCommand):
+    help = "Rebuild the per-status booking counters of every inbox from the bookings themselves."
+
+    def handle(self, *args, **options):
+        BookingCounter.rebuild()
+        self.stdout.write(f"{BookingCounter.objects.count()} counters rebuilt.")
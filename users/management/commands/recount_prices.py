@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from users.models import PriceBucket
+
+
+class Command(BaseCommand):
+    help = "Rebuild the price histograms of the specialists filter from the photographer profiles themselves."
+
+    def handle(self, *args, **options):
+        PriceBucket.rebuild()
+        self.stdout.write(f"{PriceBucket.objects.count()} price buckets rebuilt.")
@@ -0,0 +1,28 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from users.outbox import deliver_batch
+
+
+class Command(BaseCommand):
+    help = "Send queued emails from the outbox in batches, one SMTP connection per batch."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=None)
+        parser.add_argument('--loop', action='store_true', help="Keep running and poll for new messages.")
+        parser.add_argument('--interval', type=float, default=5.0, help="Seconds to sleep when idle in --loop mode.")
+
+    def handle(self, *args, **options):
+        total_sent = total_failed = 0
+        while True:
+            sent, failed = deliver_batch(options['batch_size'])
+            total_sent += sent
+            total_failed += failed
+            if sent or failed:
+                self.stdout.write(f"Sent {sent}, failed {failed}.")
+                continue
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
+        self.stdout.write(f"Done: {total_sent} sent, {total_failed} failed.")
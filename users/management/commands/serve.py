@@ -0,0 +1,55 @@
+import os
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from users import server
+
+
+class Command(BaseCommand):
+    help = (
+        "Serve the project with gunicorn: the master preloads and warms the project, then forks "
+        "the workers. Signals are gunicorn's (TERM, HUP, USR2). With --benchmark, measure "
+        "time-to-first-byte after a start instead."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--host', default='127.0.0.1')
+        parser.add_argument('--port', type=int, default=8000, help="0 picks a free port.")
+        parser.add_argument('--workers', type=int, default=getattr(settings, 'SERVE_WORKERS', None) or os.cpu_count())
+        parser.add_argument('--max-requests', type=int, default=0,
+                            help="Replace a worker after about this many requests (0: never).")
+        parser.add_argument('--timeout', type=int, default=30, help="Restart a worker stuck this long on a request.")
+        parser.add_argument('--graceful-timeout', type=int, default=30,
+                            help="Seconds workers get to finish their requests when stopping.")
+        parser.add_argument('--no-warmup', action='store_false', dest='warmup')
+        parser.add_argument('--benchmark', action='store_true',
+                            help="Start the server with and without warm-up and report time-to-first-byte.")
+        parser.add_argument('--repeat', type=int, default=3, help="Starts per mode with --benchmark.")
+
+    def handle(self, *args, **options):
+        if server.Application is None:
+            raise CommandError("gunicorn is not installed (pip install gunicorn).")
+        paths = getattr(settings, 'SERVE_WARMUP_PATHS', ['/'])
+        if options['benchmark']:
+            return self.benchmark(paths, options)
+
+        server.Application(
+            server.gunicorn_options(
+                options['host'], options['port'], options['workers'], max_requests=options['max_requests'],
+                graceful_timeout=options['graceful_timeout'], timeout=options['timeout'],
+            ),
+            warmup_paths=paths if options['warmup'] else None,
+        ).run()
+
+    def benchmark(self, paths, options):
+        command = [
+            sys.executable, '-m', 'django', 'serve', '--settings', os.environ['DJANGO_SETTINGS_MODULE'],
+            '--host', options['host'], '--port', '0', '--workers', '1',
+        ]
+        rows = server.startup_benchmark(paths, command, repeat=options['repeat'])
+        self.stdout.write(f"{'mode':<6} {'ready ms':>9}  path first/later request, ms")
+        for mode, ready, timings in rows:
+            requests = '  '.join(f'{path} {first}/{later}' for path, (first, later) in timings.items())
+            self.stdout.write(f"{mode:<6} {ready:>9}  {requests}")
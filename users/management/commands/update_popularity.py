@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from users import popularity
+
+
+class Command(BaseCommand):
+    help = "Recompute the popularity score the specialists catalog is sorted by. Run it on a schedule."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        changed = popularity.update(batch_size=options['batch_size'])
+        self.stdout.write(f"Updated the popularity of {changed} photographers.")
@@ -0,0 +1,194 @@
+"""
+Garbage collection of media files that no row refers to any more.
+
+Replaced and removed profile images, deleted photos and purged accounts
+used to leave their files under MEDIA_ROOT. ``manage.py
+collect_orphaned_media`` finds these files with a merge of two streams,
+both in the same (code point) order:
+
+* the files under MEDIA_ROOT, walked with ``os.scandir``. Each directory
+  listing goes through ``external_sort``, which sorts ``SORT_CHUNK`` names
+  at a time in memory and merges the sorted runs back from temporary files;
+* the names stored in every ``FileField``/``ImageField`` of every model,
+  each read with ``iterator()`` ordered by the name.
+
+A file is an orphan when the file stream gets ahead of the name stream
+without a match. Memory is therefore bounded by ``SORT_CHUNK`` and the
+query chunk size, even for a flat directory of millions of photos.
+
+Renditions under ``thumbs/<size>/`` (see ``users/thumbnails.py``) are
+orphans when the name they were made from is not stored any more. The
+source names of a size directory are sorted the same way and merged with
+the stored names.
+"""
+import heapq
+import itertools
+import json
+import os
+import shutil
+import tempfile
+
+from django.apps import apps
+from django.core.cache import cache
+from django.db import connection, models
+from django.db.models.functions import Collate
+
+from .thumbnails import THUMBS_DIR, cache_key, source_name
+
+CHUNK_SIZE = 2000
+# Names sorted in memory at a time; longer listings are sorted in runs on disk.
+SORT_CHUNK = 100_000
+
+
+def file_fields():
+    """``(model, field name)`` of every file field in the project."""
+    for model in apps.get_models():
+        for field in model._meta.concrete_fields:
+            if isinstance(field, models.FileField):
+                yield model, field.name
+
+
+def _names(model, field):
+    names = model._default_manager.exclude(**{field: ''}).filter(**{f'{field}__isnull': False})
+    # Python compares strings by code point; SQLite's BINARY collation (UTF-8
+    # bytes) agrees, PostgreSQL needs the "C" collation to.
+    order = Collate(field, 'C') if connection.vendor == 'postgresql' else field
+    return names.order_by(order).values_list(field, flat=True).iterator(chunk_size=CHUNK_SIZE)
+
+
+def referenced_names():
+    """Every stored file name, sorted, without duplicates."""
+    previous = None
+    for name in heapq.merge(*(_names(model, field) for model, field in file_fields())):
+        if name != previous:
+            yield name
+            previous = name
+
+
+def _spill(chunk):
+    run = tempfile.TemporaryFile('w+', encoding='ascii')
+    # JSON keeps newlines and undecodable bytes (lone surrogates) of file names intact.
+    run.writelines(json.dumps(item) + '\n' for item in sorted(chunk))
+    run.seek(0)
+    return run
+
+
+def external_sort(items, chunk_size=None):
+    """The strings of ``items`` in sorted order, with at most ``chunk_size`` of them in memory at once."""
+    chunk_size = chunk_size or SORT_CHUNK
+    items = iter(items)
+    chunk = list(itertools.islice(items, chunk_size))
+    if len(chunk) < chunk_size:
+        yield from sorted(chunk)
+        return
+    runs = []
+    try:
+        while chunk:
+            runs.append(_spill(chunk))
+            chunk = list(itertools.islice(items, chunk_size))
+        yield from heapq.merge(*((json.loads(line) for line in run) for run in runs))
+    finally:
+        for run in runs:
+            run.close()
+
+
+def _listing(path):
+    with os.scandir(path) as entries:
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                yield entry.name + '/'
+            elif entry.is_file(follow_symlinks=False):
+                yield entry.name
+
+
+def walk(root, prefix='', skip=()):
+    """Names of the files under ``root/prefix``, sorted.
+
+    Directories sort as ``"<name>/"`` so that the order is that of the full
+    relative names (``a.jpg`` < ``a/b.jpg`` < ``a_b.jpg``).
+    """
+    for key in external_sort(_listing(os.path.join(root, prefix))):
+        if not key.endswith('/'):
+            yield prefix + key
+        elif prefix + key not in skip:
+            yield from walk(root, prefix + key, skip)
+
+
+def diff(files, names, stats):
+    """Files of the ``files`` stream that are not in the ``names`` stream; both sorted."""
+    names = iter(names)
+    current = next(names, None)
+    for name in files:
+        while current is not None and current < name:
+            stats['missing'] += 1
+            current = next(names, None)
+        if current == name:
+            current = next(names, None)
+        else:
+            yield name
+    if current is not None:
+        stats['missing'] += 1 + sum(1 for _ in names)
+
+
+def orphaned_renditions(root):
+    """Files under ``thumbs/<size>/`` whose source name is no longer stored anywhere."""
+    for key in external_sort(_listing(os.path.join(root, THUMBS_DIR))):
+        if not key.endswith('/'):
+            continue
+        prefix = f'{THUMBS_DIR}/{key}'
+        # "<source>\0<rendition>" sorts by source first: no name contains NUL.
+        # Renditions without a source name get '' and so never match.
+        renditions = external_sort(
+            f"{source_name(name[len(prefix):]) or ''}\0{name}" for name in walk(root, prefix)
+        )
+        names = referenced_names()
+        current = next(names, None)
+        for rendition in renditions:
+            source, _, name = rendition.partition('\0')
+            while current is not None and current < source:
+                current = next(names, None)
+            if current != source:
+                yield name
+
+
+def collect(root, older_than, dry_run=True, quarantine=None):
+    """Delete (or move to ``quarantine``) orphans modified before ``older_than``, a timestamp.
+
+    Returns counters: ``files`` and ``bytes`` reclaimed (or reclaimable on a
+    dry run), ``young`` orphans kept for the grace period, and ``missing``
+    names whose file does not exist.
+    """
+    root = os.fspath(root)
+    stats = dict.fromkeys(('files', 'bytes', 'young', 'missing'), 0)
+    skip = {f'{THUMBS_DIR}/'}
+    if quarantine:
+        relative = os.path.relpath(quarantine, root)
+        if not relative.startswith('..'):
+            skip.add(relative.replace(os.sep, '/') + '/')
+
+    orphans = diff(walk(root, skip=skip), referenced_names(), stats)
+    if os.path.isdir(os.path.join(root, THUMBS_DIR)):
+        orphans = itertools.chain(orphans, orphaned_renditions(root))
+
+    for name in orphans:
+        path = os.path.join(root, name)
+        try:
+            info = os.stat(path, follow_symlinks=False)
+        except FileNotFoundError:  # gone since the listing
+            continue
+        if info.st_mtime >= older_than:
+            stats['young'] += 1
+            continue
+        stats['files'] += 1
+        stats['bytes'] += info.st_size
+        if dry_run:
+            continue
+        if quarantine:
+            target = os.path.join(quarantine, name)
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            shutil.move(path, target)
+        else:
+            os.remove(path)
+        if name.startswith(f'{THUMBS_DIR}/'):
+            cache.delete(cache_key(name))
+    return stats
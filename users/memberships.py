@@ -0,0 +1,118 @@
+"""
+Per-user membership sets: the photographers a user has favorited and the
+photos they have liked.
+
+Each set is kept in the cache as a sorted array of 64-bit ids (8 bytes per
+id, so thousands of favorites stay a few KB). It is loaded at most once per
+request and memoized on the user object as a frozenset, which makes
+``photographer.pk in favorites`` an O(1) check with no query. Sets missing
+from the cache are all loaded by a single UNION query.
+
+``toggle_favorite`` and ``toggle_photo_like`` ``forget`` the user's set
+once their change commits, and the next request that needs it reloads it.
+Dropping the cached set rather than rewriting it means two concurrent
+toggles of one user cannot lose an update. Bulk deletions (account purge,
+quick photo deletion in the admin) forget the sets of the users whose rows
+they delete, each user once per batch. There are no per-row signals, so
+deleting rows keeps Django's fast path. A set that still holds the id of a
+row deleted some other way only marks an item nobody can see any more, and
+it expires after ``MEMBERSHIP_CACHE_TIMEOUT``.
+"""
+from array import array
+from functools import partial
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Value
+
+from .models import Favorite, PhotoLike
+
+FAVORITES = 'favorites'
+LIKES = 'likes'
+# kind: (model, id field)
+KINDS = {
+    FAVORITES: (Favorite, 'photographer_id'),
+    LIKES: (PhotoLike, 'photo_id'),
+}
+TYPECODE = 'q'
+
+
+def timeout():
+    return getattr(settings, 'MEMBERSHIP_CACHE_TIMEOUT', 24 * 60 * 60)
+
+
+def cache_key(kind, user_id):
+    return f'members:{kind}:{user_id}'
+
+
+def pack(ids):
+    return array(TYPECODE, sorted(ids)).tobytes()
+
+
+def unpack(data):
+    ids = array(TYPECODE)
+    ids.frombytes(data)
+    return ids
+
+
+def load(user, *kinds):
+    """``{kind: frozenset of ids}`` for ``user``; empty sets for anonymous users."""
+    kinds = kinds or tuple(KINDS)
+    if not user.is_authenticated:
+        return {kind: frozenset() for kind in kinds}
+    memo = _memo(user)
+    missing = [kind for kind in kinds if kind not in memo]
+    if missing:
+        cached = cache.get_many([cache_key(kind, user.pk) for kind in missing])
+        stale = []
+        for kind in missing:
+            data = cached.get(cache_key(kind, user.pk))
+            if data is None:
+                stale.append(kind)
+            else:
+                memo[kind] = frozenset(unpack(data))
+        if stale:
+            fresh = _query(user, stale)
+            cache.set_many({cache_key(kind, user.pk): pack(ids) for kind, ids in fresh.items()}, timeout())
+            memo.update({kind: frozenset(ids) for kind, ids in fresh.items()})
+    return {kind: memo[kind] for kind in kinds}
+
+
+def _memo(user):
+    # request.user is a lazy proxy; attributes set through it land on the user.
+    memo = getattr(user, '_memberships', None)
+    if memo is None:
+        memo = {}
+        user._memberships = memo
+    return memo
+
+
+def _query(user, kinds):
+    ids = {kind: [] for kind in kinds}
+    queries = []
+    for kind in kinds:
+        model, field = KINDS[kind]
+        queries.append(model.objects.filter(user=user).annotate(kind=Value(kind)).values_list('kind', field))
+    rows = queries[0].union(*queries[1:], all=True) if len(queries) > 1 else queries[0]
+    for kind, pk in rows:
+        ids[kind].append(pk)
+    return ids
+
+
+def favorites(user):
+    return load(user, FAVORITES)[FAVORITES]
+
+
+def likes(user):
+    return load(user, LIKES)[LIKES]
+
+
+def forget(user_ids, kind=None):
+    kinds = [kind] if kind else list(KINDS)
+    cache.delete_many([cache_key(each, user_id) for user_id in set(user_ids) for each in kinds])
+
+
+def forget_on_commit(user_ids, kind=None):
+    """``forget`` the sets of ``user_ids`` once the current transaction commits."""
+    transaction.on_commit(partial(forget, set(user_ids), kind))
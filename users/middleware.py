@@ -0,0 +1,99 @@
+import json
+import logging
+import time
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connection
+
+from . import instrumentation, profiler
+
+slow_log = logging.getLogger('users.slow_requests')
+
+
+class RequestTimingMiddleware:
+    """
+    Measures SQL, template, image processing and total time for each request.
+
+    The numbers are sent back in a ``Server-Timing`` header (when
+    ``SERVER_TIMING_HEADER`` is on) and requests slower than
+    ``SLOW_REQUEST_THRESHOLD_MS`` are written to the ``users.slow_requests``
+    logger as one JSON object per line, together with their worst queries.
+    Keep it first in ``MIDDLEWARE`` so the total covers the whole stack.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        timings = instrumentation.RequestTimings()
+        token = instrumentation.activate(timings)
+        try:
+            with connection.execute_wrapper(timings.execute_wrapper):
+                response = self.get_response(request)
+        finally:
+            instrumentation.deactivate(token)
+
+        total_ms = timings.elapsed_ms
+        match = request.resolver_match
+        url_name = match.view_name if match else None
+
+        if getattr(settings, 'SERVER_TIMING_HEADER', False):
+            response['Server-Timing'] = self.server_timing(timings, total_ms, url_name)
+
+        threshold = getattr(settings, 'SLOW_REQUEST_THRESHOLD_MS', None)
+        if threshold is not None and total_ms >= threshold:
+            slow_log.warning(json.dumps({
+                'url_name': url_name,
+                'path': request.path,
+                'method': request.method,
+                'status': response.status_code,
+                'user_id': request.user.pk if getattr(request, 'user', None) and request.user.is_authenticated else None,
+                'total_ms': round(total_ms, 2),
+                'db_ms': round(timings.ms('db'), 2),
+                'queries': timings.query_count,
+                'template_ms': round(timings.ms('template'), 2),
+                'image_ms': round(timings.ms('image'), 2),
+                'worst_queries': timings.slowest_queries(),
+            }, ensure_ascii=False))
+
+        return response
+
+    @staticmethod
+    def server_timing(timings, total_ms, url_name):
+        entries = [
+            f'db;dur={timings.ms("db"):.2f};desc="{timings.query_count} queries"',
+            f'tpl;dur={timings.ms("template"):.2f};desc="templates"',
+        ]
+        if 'image' in timings.durations:
+            entries.append(f'img;dur={timings.ms("image"):.2f};desc="image processing"')
+        entries.append(f'total;dur={total_ms:.2f};desc="{url_name or "unresolved"}"')
+        return ', '.join(entries)
+
+
+class RequestProfilerMiddleware:
+    """
+    Profiles a single request on demand, see ``users/profiler.py``.
+
+    Requests without the ``_profile`` parameter or ``X-Profile`` header go
+    straight through. Must come after ``AuthenticationMiddleware``.
+    """
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'PROFILER_ENABLED', True):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        value = profiler.requested_value(request)
+        if value is None or not profiler.is_allowed(request, value):
+            return self.get_response(request)
+
+        start = time.perf_counter()
+        with profiler.RequestProfiler() as request_profiler:
+            response = self.get_response(request)
+        duration_ms = (time.perf_counter() - start) * 1000
+
+        profile = request_profiler.save(request, duration_ms)
+        response['X-Profile-Id'] = str(profile.pk)
+        return response
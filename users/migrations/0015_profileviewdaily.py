@@ -0,0 +1,41 @@
+# Generated by Django 5.2.18 on 2026-10-19 13:18
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0014_requestprofile'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProfileViewDaily',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('unique_views', models.PositiveIntegerField(default=0)),
+                ('total_views', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'ordering': ['date'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='profileview',
+            index=models.Index(fields=['photographer', 'created_at'], name='users_profi_photogr_34806a_idx'),
+        ),
+        migrations.AddField(
+            model_name='profileviewdaily',
+            name='photographer',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_views', to='users.photographerprofile'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='profileviewdaily',
+            unique_together={('photographer', 'date')},
+        ),
+    ]
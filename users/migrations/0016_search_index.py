@@ -0,0 +1,34 @@
+from django.db import migrations
+
+TABLES = ('search_photographers', 'search_news')
+
+
+def create_search_tables(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    # Same as users.search.create_tables at the time of this migration. The
+    # rows are indexed once migrate is done (users.signals.fill_search_index),
+    # with the stemmer the queries use.
+    for table in TABLES:
+        schema_editor.execute(
+            f'CREATE VIRTUAL TABLE IF NOT EXISTS {table} '
+            f'USING fts5(title, body, tokenize="unicode61 remove_diacritics 2")'
+        )
+
+
+def drop_search_tables(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for table in TABLES:
+        schema_editor.execute(f'DROP TABLE IF EXISTS {table}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0015_profileviewdaily'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_tables, drop_search_tables),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.2.18 on 2026-10-19 13:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0017_news_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='photographerprofile',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, db_index=True, verbose_name='Дата обновления'),
+        ),
+        migrations.AddIndex(
+            model_name='photo',
+            index=models.Index(fields=['photographer', 'uploaded_at'], name='users_photo_photogr_1175cb_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='photo',
+            index=models.Index(fields=['uploaded_at'], name='users_photo_uploade_fcaa59_idx'),
+        ),
+    ]
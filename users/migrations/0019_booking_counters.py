@@ -0,0 +1,56 @@
+# Generated by Django 5.2.18 on 2026-10-19 13:35
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def count_bookings(apps, schema_editor):
+    BookingRequest = apps.get_model('users', 'BookingRequest')
+    BookingCounter = apps.get_model('users', 'BookingCounter')
+    counters = []
+    for role, owner, hidden in (('received', 'photographer__user', 'is_deleted_by_photographer'),
+                                ('sent', 'client', 'is_deleted_by_client')):
+        rows = (BookingRequest.objects.filter(**{hidden: False})
+                .values_list(owner, 'status').annotate(total=models.Count('id')))
+        counters += [BookingCounter(user_id=user_id, role=role, status=status, count=total)
+                     for user_id, status, total in rows]
+    BookingCounter.objects.bulk_create(counters)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0018_portfolio_validators'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BookingCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('role', models.CharField(choices=[('received', 'Входящие'), ('sent', 'Исходящие')], max_length=10)),
+                ('status', models.CharField(choices=[('new', 'Новая'), ('in_progress', 'В работе'), ('completed', 'Выполнена'), ('cancelled', 'Отменена')], max_length=20)),
+                ('count', models.IntegerField(default=0)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='bookingrequest',
+            index=models.Index(fields=['photographer', 'status', 'created_at'], name='users_booki_photogr_e989a4_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='bookingrequest',
+            index=models.Index(fields=['client', 'status', 'created_at'], name='users_booki_client__9497fd_idx'),
+        ),
+        migrations.AddField(
+            model_name='bookingcounter',
+            name='user',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='booking_counters', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AlterUniqueTogether(
+            name='bookingcounter',
+            unique_together={('user', 'role', 'status')},
+        ),
+        migrations.RunPython(count_bookings, migrations.RunPython.noop),
+    ]
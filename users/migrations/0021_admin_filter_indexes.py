@@ -0,0 +1,22 @@
+# Generated by Django 5.2.18 on 2026-10-19 13:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0020_outbox'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='photographerprofile',
+            name='specialization',
+            field=models.CharField(choices=[('wedding', 'Свадьба'), ('portrait', 'Портрет'), ('reportage', 'Репортаж'), ('lovestory', 'Love Story'), ('fashion', 'Fashion')], db_index=True, default='wedding', max_length=50),
+        ),
+        migrations.AddIndex(
+            model_name='photo',
+            index=models.Index(fields=['category', 'uploaded_at'], name='users_photo_categor_a326b1_idx'),
+        ),
+    ]
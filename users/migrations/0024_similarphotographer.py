@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-19 14:04
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0023_chunked_upload'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SimilarPhotographer',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('rank', models.PositiveSmallIntegerField()),
+                ('score', models.FloatField()),
+                ('computed_at', models.DateTimeField(db_index=True)),
+                ('photographer', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='similar', to='users.photographerprofile')),
+                ('similar', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='users.photographerprofile')),
+            ],
+            options={
+                'ordering': ['photographer', 'rank'],
+                'unique_together': {('photographer', 'rank')},
+            },
+        ),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 5.2.18 on 2026-10-19 14:08
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0024_similarphotographer'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='photographerprofile',
+            name='popularity',
+            field=models.FloatField(default=0, editable=False, verbose_name='Популярность'),
+        ),
+        migrations.AddIndex(
+            model_name='photographerprofile',
+            index=models.Index(fields=['popularity', 'id'], name='users_photo_popular_c587bd_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='photographerprofile',
+            index=models.Index(fields=['price', 'id'], name='users_photo_price_a2487b_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='photographerprofile',
+            index=models.Index(fields=['views_count', 'id'], name='users_photo_views_c_3d246e_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='photographerprofile',
+            index=models.Index(fields=['specialization', 'popularity', 'id'], name='users_photo_special_68bf8b_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='photographerprofile',
+            index=models.Index(fields=['specialization', 'price', 'id'], name='users_photo_special_2976fb_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='photographerprofile',
+            index=models.Index(fields=['specialization', 'views_count', 'id'], name='users_photo_special_fac272_idx'),
+        ),
+    ]
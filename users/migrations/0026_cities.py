@@ -0,0 +1,60 @@
+# Generated by Django 5.2.18 on 2026-10-19 14:10
+
+import django.db.models.deletion
+from collections import Counter, defaultdict
+
+from django.db import migrations, models
+
+
+def normalize(name):
+    # Same as users.cities.normalize at the time of this migration.
+    return ' '.join((name or '').split()).casefold().replace('ё', 'е')
+
+
+def map_cities(apps, schema_editor):
+    City = apps.get_model('users', 'City')
+    PhotographerProfile = apps.get_model('users', 'PhotographerProfile')
+    spellings = defaultdict(Counter)
+    for city in PhotographerProfile.objects.exclude(city__isnull=True).values_list('city', flat=True).iterator():
+        if normalize(city):
+            spellings[normalize(city)][' '.join(city.split())] += 1
+    # The most common spelling of each city becomes its name.
+    City.objects.bulk_create(
+        City(key=key, name=counts.most_common(1)[0][0]) for key, counts in spellings.items()
+    )
+    cities = {key: (pk, name) for pk, key, name in City.objects.values_list('id', 'key', 'name')}
+    for city in PhotographerProfile.objects.exclude(city__isnull=True).values_list('city', flat=True).distinct():
+        key = normalize(city)
+        if key:
+            pk, name = cities[key]
+            PhotographerProfile.objects.filter(city=city).update(city_ref_id=pk, city=name)
+
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0025_photographer_sort_orders'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='City',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, verbose_name='Название')),
+                ('key', models.CharField(max_length=100, unique=True)),
+            ],
+            options={
+                'verbose_name': 'Город',
+                'verbose_name_plural': 'Города',
+                'ordering': ['name'],
+            },
+        ),
+        migrations.AddField(
+            model_name='photographerprofile',
+            name='city_ref',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='photographers', to='users.city', verbose_name='Город (справочник)'),
+        ),
+        migrations.RunPython(map_cities, migrations.RunPython.noop),
+    ]
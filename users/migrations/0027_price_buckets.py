@@ -0,0 +1,51 @@
+# Generated by Django 5.2.18 on 2026-10-19 14:13
+
+from collections import Counter
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def count_prices(apps, schema_editor):
+    PhotographerProfile = apps.get_model('users', 'PhotographerProfile')
+    PriceBucket = apps.get_model('users', 'PriceBucket')
+    width = getattr(settings, 'PRICE_BUCKET_WIDTH', 500)
+    highest = getattr(settings, 'PRICE_BUCKET_MAX', 20000)
+    counts = Counter()
+    for specialization, city_id, price in PhotographerProfile.objects.values_list(
+            'specialization', 'city_ref_id', 'price').iterator():
+        bucket = min(max(price or 0, 0), highest) // width * width
+        scopes = [('', 0), (specialization, 0)]
+        if city_id:
+            scopes += [('', city_id), (specialization, city_id)]
+        for scope in scopes:
+            counts[(*scope, bucket)] += 1
+    PriceBucket.objects.bulk_create(
+        PriceBucket(specialization=specialization, city=city, bucket=bucket, count=count)
+        for (specialization, city, bucket), count in counts.items()
+    )
+
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0026_cities'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PriceBucket',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('specialization', models.CharField(blank=True, max_length=50)),
+                ('city', models.PositiveIntegerField(default=0)),
+                ('bucket', models.IntegerField()),
+                ('count', models.IntegerField(default=0)),
+            ],
+            options={
+                'unique_together': {('specialization', 'city', 'bucket')},
+            },
+        ),
+        migrations.RunPython(count_prices, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 5.2.18 on 2026-10-19 14:33
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def record_viewers(apps, schema_editor):
+    ProfileView = apps.get_model('users', 'ProfileView')
+    ProfileViewer = apps.get_model('users', 'ProfileViewer')
+    for field in ('user_id', 'session_key'):
+        viewers = (
+            ProfileView.objects.filter(**{f'{field}__isnull': False})
+            .values_list('photographer_id', field).distinct().order_by().iterator()
+        )
+        batch = []
+        for photographer_id, viewer in viewers:
+            batch.append(ProfileViewer(photographer_id=photographer_id, **{field: viewer}))
+            if len(batch) == 1000:
+                ProfileViewer.objects.bulk_create(batch)
+                batch = []
+        ProfileViewer.objects.bulk_create(batch)
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0027_price_buckets'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='profileviewdaily',
+            name='total_views',
+        ),
+        migrations.CreateModel(
+            name='ProfileViewer',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('session_key', models.CharField(blank=True, max_length=40, null=True)),
+                ('photographer', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='viewers', to='users.photographerprofile')),
+                ('user', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(condition=models.Q(('user__isnull', False)), fields=('photographer', 'user'), name='unique_profile_viewer_user'), models.UniqueConstraint(condition=models.Q(('session_key__isnull', False)), fields=('photographer', 'session_key'), name='unique_profile_viewer_session')],
+            },
+        ),
+        migrations.RunPython(record_viewers, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-19 14:38
+
+from django.db import migrations, models
+from django.db.models import F
+
+
+def start_at_upload(apps, schema_editor):
+    apps.get_model('users', 'Photo').objects.update(updated_at=F('uploaded_at'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0028_profile_viewers'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='photo',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.RunPython(start_at_upload, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='photo',
+            index=models.Index(fields=['photographer', 'updated_at'], name='users_photo_photogr_62411d_idx'),
+        ),
+    ]
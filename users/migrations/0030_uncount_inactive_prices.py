@@ -0,0 +1,37 @@
+from collections import Counter
+
+from django.conf import settings
+from django.db import migrations
+
+
+def recount_listed_prices(apps, schema_editor):
+    # As 0027 count_prices, counting only active users, whom the catalog lists.
+    PhotographerProfile = apps.get_model('users', 'PhotographerProfile')
+    PriceBucket = apps.get_model('users', 'PriceBucket')
+    width = getattr(settings, 'PRICE_BUCKET_WIDTH', 500)
+    highest = getattr(settings, 'PRICE_BUCKET_MAX', 20000)
+    counts = Counter()
+    for specialization, city_id, price in PhotographerProfile.objects.filter(user__is_active=True).values_list(
+            'specialization', 'city_ref_id', 'price').iterator():
+        bucket = min(max(price or 0, 0), highest) // width * width
+        scopes = [('', 0), (specialization, 0)]
+        if city_id:
+            scopes += [('', city_id), (specialization, city_id)]
+        for scope in scopes:
+            counts[(*scope, bucket)] += 1
+    PriceBucket.objects.all().delete()
+    PriceBucket.objects.bulk_create(
+        PriceBucket(specialization=specialization, city=city, bucket=bucket, count=count)
+        for (specialization, city, bucket), count in counts.items()
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0029_photo_updated_at'),
+    ]
+
+    operations = [
+        migrations.RunPython(recount_listed_prices, migrations.RunPython.noop),
+    ]
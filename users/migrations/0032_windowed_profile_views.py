@@ -0,0 +1,73 @@
+# Generated by Django 5.2.18 on 2026-10-19 15:07
+
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import F
+from django.db.models.functions import TruncDate
+
+
+def date_existing_views(apps, schema_editor):
+    ProfileView = apps.get_model('users', 'ProfileView')
+    ProfileViewDaily = apps.get_model('users', 'ProfileViewDaily')
+    # Each existing row is a viewer's first (and only counted) visit.
+    ProfileView.objects.update(date=TruncDate('created_at'))
+    ProfileViewDaily.objects.update(total_views=F('unique_views'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0031_outbox_sending'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.DeleteModel(
+            name='ProfileViewer',
+        ),
+        migrations.RemoveIndex(
+            model_name='profileview',
+            name='users_profi_photogr_d41f71_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='profileview',
+            name='users_profi_photogr_f42209_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='profileview',
+            name='users_profi_photogr_34806a_idx',
+        ),
+        migrations.AddField(
+            model_name='profileview',
+            name='date',
+            field=models.DateField(default=django.utils.timezone.localdate),
+        ),
+        migrations.AddField(
+            model_name='profileview',
+            name='hits',
+            field=models.PositiveIntegerField(default=1),
+        ),
+        migrations.AddField(
+            model_name='profileviewdaily',
+            name='total_views',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(date_existing_views, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='profileview',
+            index=models.Index(fields=['photographer', 'date'], name='users_profi_photogr_c33fb3_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='profileview',
+            index=models.Index(fields=['date'], name='users_profi_date_d969b9_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='profileview',
+            constraint=models.UniqueConstraint(condition=models.Q(('user__isnull', False)), fields=('photographer', 'user', 'date'), name='unique_profile_view_user_day'),
+        ),
+        migrations.AddConstraint(
+            model_name='profileview',
+            constraint=models.UniqueConstraint(condition=models.Q(('session_key__isnull', False)), fields=('photographer', 'session_key', 'date'), name='unique_profile_view_session_day'),
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.18 on 2026-10-19 15:10
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0032_windowed_profile_views'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='photographerprofile',
+            index=models.Index(fields=['city_ref', 'popularity', 'id'], name='users_photo_city_re_657ff4_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='photographerprofile',
+            index=models.Index(fields=['city_ref', 'price', 'id'], name='users_photo_city_re_eec9c9_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='photographerprofile',
+            index=models.Index(fields=['city_ref', 'views_count', 'id'], name='users_photo_city_re_26e2db_idx'),
+        ),
+    ]
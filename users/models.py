@@ -1,15 +1,24 @@
-from django.db import models
+from collections import Counter
+from django.conf import settings
+from django.db import models, transaction
+from django.db.models import F
 from django.utils import timezone
 from django.contrib.auth.models import User
 from PIL import Image
 from io import BytesIO
-from django.core.files.uploadedfile import InMemoryUploadedFile
+from django.core.files.uploadedfile import InMemoryUploadedFile, UploadedFile
+import uuid
 import sys
+from .instrumentation import track
 
 def compress_image(image_field, quality=70, max_width=1920):
     if not image_field:
         return image_field
-    
+
+    with track('image'):
+        return _compress_image(image_field, quality, max_width)
+
+def _compress_image(image_field, quality, max_width):
     try:
         img = Image.open(image_field)
         
@@ -63,13 +72,30 @@ SPECIALIZATION_CHOICES = [
     ('fashion', 'Fashion'),
 ]
 
+class City(models.Model):
+    """A city photographers work in (see users/cities.py)."""
+    name = models.CharField(max_length=100, verbose_name="Название")
+    # Casefolded name, ё read as е: the indexed lookup and prefix-search key.
+    key = models.CharField(max_length=100, unique=True)
+
+    class Meta:
+        ordering = ['name']
+        verbose_name = "Город"
+        verbose_name_plural = "Города"
+
+    def __str__(self):
+        return self.name
+
 class PhotographerProfile(models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE)
     short_intro = models.CharField(max_length=250)
     bio = models.TextField()
     city = models.CharField(max_length=100, blank=True, null=True)
+    # Set from ``city`` on save; the catalog filters by it.
+    city_ref = models.ForeignKey(City, on_delete=models.SET_NULL, null=True, blank=True, editable=False,
+                                 related_name='photographers', verbose_name="Город (справочник)")
     
-    specialization = models.CharField(max_length=50, choices=SPECIALIZATION_CHOICES, default='wedding')
+    specialization = models.CharField(max_length=50, choices=SPECIALIZATION_CHOICES, default='wedding', db_index=True)
     
     price = models.IntegerField(default=0, help_text="Стоимость часа работы в RUB")
     
@@ -87,6 +113,43 @@ class PhotographerProfile(models.Model):
     social_vk = models.URLField(blank=True, null=True, verbose_name="Ссылка на ВКонтакте")
     social_telegram = models.CharField(max_length=50, blank=True, null=True, verbose_name="Telegram (username)")
     website = models.URLField(blank=True, null=True, verbose_name="Личный сайт")
+    updated_at = models.DateTimeField(auto_now=True, db_index=True, verbose_name="Дата обновления")
+    # Maintained by `manage.py update_popularity` (see users/popularity.py).
+    popularity = models.FloatField(default=0, editable=False, verbose_name="Популярность")
+
+    class Meta:
+        # Indexes for each sort order of the specialists catalog, also within
+        # a specialization or a city. The pk breaks ties, so pages are stable
+        # and read in index order.
+        indexes = [
+            models.Index(fields=['popularity', 'id']),
+            models.Index(fields=['price', 'id']),
+            models.Index(fields=['views_count', 'id']),
+            models.Index(fields=['specialization', 'popularity', 'id']),
+            models.Index(fields=['specialization', 'price', 'id']),
+            models.Index(fields=['specialization', 'views_count', 'id']),
+            models.Index(fields=['city_ref', 'popularity', 'id']),
+            models.Index(fields=['city_ref', 'price', 'id']),
+            models.Index(fields=['city_ref', 'views_count', 'id']),
+        ]
+
+    # (specialization, city_ref_id, price) as last read from or written to the database.
+    _priced_state = None
+    PRICED_FIELDS = ('specialization', 'city_ref_id', 'price')
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        if all(name in field_names for name in cls.PRICED_FIELDS):
+            instance._priced_state = instance.price_state()
+        return instance
+
+    def price_state(self):
+        return tuple(getattr(self, name) for name in self.PRICED_FIELDS)
+
+    def is_listed(self):
+        """Whether the catalog shows this photographer, and so whether the price histograms count them."""
+        return self.user.is_active
 
     def save(self, *args, **kwargs):
         if self.profile_image and not self.id: # Only compress on initial upload or handle update logic carefully
@@ -118,38 +181,89 @@ class PhotographerProfile(models.Model):
                  except (FileNotFoundError, ValueError, OSError):
                      pass
 
-        super().save(*args, **kwargs)
+        # Price histograms change in the same transaction as the profile.
+        # The state is read after saving: the pre_save signal sets city_ref.
+        old = self._priced_state
+        if old is None and not self._state.adding:
+            # Loaded without the priced fields.
+            old = PhotographerProfile.objects.filter(pk=self.pk).values_list(*self.PRICED_FIELDS).first()
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            state = self.price_state()
+            if state != old and self.is_listed():
+                PriceBucket.apply(PriceBucket.deltas(old, state))
+        self._priced_state = state
 
     def __str__(self):
         return self.user.username
 
 class ProfileView(models.Model):
+    """
+    A viewer's visits to a photographer's profile on one day: one row per
+    (photographer, viewer, day), ``hits`` counting the visits. Rows older
+    than the retention window are folded into ProfileViewDaily by
+    `manage.py compact_profile_views` (see users/profile_views.py).
+    """
     photographer = models.ForeignKey(PhotographerProfile, on_delete=models.CASCADE, related_name='profile_views')
     user = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True)
     session_key = models.CharField(max_length=40, null=True, blank=True)
     ip_address = models.GenericIPAddressField(null=True, blank=True)
+    date = models.DateField(default=timezone.localdate)
+    hits = models.PositiveIntegerField(default=1)
     created_at = models.DateTimeField(auto_now_add=True)
 
     class Meta:
         indexes = [
-            models.Index(fields=['photographer', 'user']),
-            models.Index(fields=['photographer', 'session_key']),
+            models.Index(fields=['photographer', 'date']),
+            models.Index(fields=['date']),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=['photographer', 'user', 'date'], condition=models.Q(user__isnull=False),
+                                    name='unique_profile_view_user_day'),
+            models.UniqueConstraint(fields=['photographer', 'session_key', 'date'],
+                                    condition=models.Q(session_key__isnull=False),
+                                    name='unique_profile_view_session_day'),
         ]
 
     def __str__(self):
         viewer = self.user.username if self.user else f"Anonymous ({self.session_key})"
-        return f"{viewer} viewed {self.photographer.user.username}"
+        return f"{viewer} viewed {self.photographer.user.username} on {self.date}"
+
+class ProfileViewDaily(models.Model):
+    """Unique viewers and visits of a photographer per day, filled by `manage.py compact_profile_views`."""
+    photographer = models.ForeignKey(PhotographerProfile, on_delete=models.CASCADE, related_name='daily_views')
+    date = models.DateField()
+    unique_views = models.PositiveIntegerField(default=0)
+    total_views = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        ordering = ['date']
+        unique_together = ('photographer', 'date')
+
+    def __str__(self):
+        return f"{self.photographer_id} {self.date}: {self.unique_views}/{self.total_views}"
 
 class Photo(models.Model):
     photographer = models.ForeignKey(PhotographerProfile, on_delete=models.CASCADE, related_name='photos')
     image = models.ImageField(upload_to='photographs')
     category = models.CharField(max_length=50, choices=SPECIALIZATION_CHOICES, default='wedding', verbose_name="Категория")
     uploaded_at = models.DateTimeField(auto_now_add=True)
+    # Moves on every change, bulk ones included (they set it explicitly): page versions depend on it.
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['photographer', 'uploaded_at']),
+            models.Index(fields=['photographer', 'updated_at']),
+            models.Index(fields=['uploaded_at']),
+            models.Index(fields=['category', 'uploaded_at']),
+        ]
 
     def save(self, *args, **kwargs):
         if self.image:
             try:
-                if isinstance(self.image.file, InMemoryUploadedFile):
+                # Fresh uploads of any size: in memory, spooled to disk or assembled from chunks.
+                if isinstance(self.image.file, UploadedFile):
                      self.image = compress_image(self.image, quality=70, max_width=1600)
             except (FileNotFoundError, ValueError, OSError):
                 pass
@@ -165,6 +279,14 @@ class BookingRequest(models.Model):
         ('completed', 'Выполнена'),
         ('cancelled', 'Отменена'),
     ]
+    # Allowed status changes; completed and cancelled bookings can only be archived.
+    TRANSITIONS = {
+        'new': ('in_progress', 'completed', 'cancelled'),
+        'in_progress': ('completed', 'cancelled'),
+        'completed': (),
+        'cancelled': (),
+    }
+    FINAL_STATUSES = ('completed', 'cancelled')
     
     client = models.ForeignKey(User, on_delete=models.CASCADE, related_name='bookings_made')
     photographer = models.ForeignKey(PhotographerProfile, on_delete=models.CASCADE, related_name='bookings_received')
@@ -176,12 +298,126 @@ class BookingRequest(models.Model):
     is_deleted_by_client = models.BooleanField(default=False)
     is_deleted_by_photographer = models.BooleanField(default=False)
 
+    # Counter-relevant state as last read from or written to the database.
+    _counted_state = None
+
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['photographer', 'status', 'created_at']),
+            models.Index(fields=['client', 'status', 'created_at']),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._counted_state = instance.counter_state()
+        return instance
+
+    def can_become(self, status):
+        return status in self.TRANSITIONS.get(self.status, ())
+
+    @property
+    def is_final(self):
+        return self.status in self.FINAL_STATUSES
+
+    def next_status_choices(self):
+        """Current status and the statuses it may change to, as (value, label) pairs."""
+        return [(value, label) for value, label in self.STATUS_CHOICES
+                if value == self.status or self.can_become(value)]
+
+    def counter_state(self):
+        return (self.status, self.photographer_id, self.client_id,
+                self.is_deleted_by_photographer, self.is_deleted_by_client)
+
+    def counter_deltas(self, old, new):
+        """BookingCounter changes for going from state ``old`` to ``new`` (None = no row)."""
+        deltas = Counter()
+        for state, sign in ((old, -1), (new, 1)):
+            if state is None:
+                continue
+            status, photographer_id, client_id, deleted_by_photographer, deleted_by_client = state
+            if not deleted_by_photographer:
+                deltas[(self._photographer_user_id(photographer_id), 'received', status)] += sign
+            if not deleted_by_client:
+                deltas[(client_id, 'sent', status)] += sign
+        return deltas
+
+    def _photographer_user_id(self, photographer_id):
+        if photographer_id == self.photographer_id:
+            return self.photographer.user_id
+        return PhotographerProfile.objects.filter(pk=photographer_id).values_list('user_id', flat=True).first()
+
+    def save(self, *args, **kwargs):
+        # Counters change in the same transaction as the booking itself.
+        state = self.counter_state()
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            if state != self._counted_state:
+                BookingCounter.apply(self.counter_deltas(self._counted_state, state))
+        self._counted_state = state
 
     def __str__(self):
         return f"Booking {self.id} from {self.client.username}"
 
+class BookingCounter(models.Model):
+    """
+    Number of bookings per status in a user's inbox: ``received`` for a
+    photographer, ``sent`` for whoever made the bookings. Bookings hidden by
+    that side (is_deleted_by_*) are not counted.
+
+    Maintained by BookingRequest.save() and the post_delete handler in
+    signals.py; ``manage.py recount_bookings`` rebuilds it from scratch.
+    """
+    ROLE_CHOICES = [
+        ('received', 'Входящие'),
+        ('sent', 'Исходящие'),
+    ]
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='booking_counters')
+    role = models.CharField(max_length=10, choices=ROLE_CHOICES)
+    status = models.CharField(max_length=20, choices=BookingRequest.STATUS_CHOICES)
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        unique_together = ('user', 'role', 'status')
+
+    def __str__(self):
+        return f"{self.user_id} {self.role} {self.status}: {self.count}"
+
+    @classmethod
+    def apply(cls, deltas):
+        for (user_id, role, status), delta in deltas.items():
+            if not delta or user_id is None:
+                continue
+            counters = cls.objects.filter(user_id=user_id, role=role, status=status)
+            if counters.update(count=F('count') + delta) or delta < 0:
+                continue
+            _, created = cls.objects.get_or_create(user_id=user_id, role=role, status=status, defaults={'count': delta})
+            if not created:
+                counters.update(count=F('count') + delta)
+
+    @classmethod
+    def rebuild(cls):
+        """Recount every inbox from BookingRequest."""
+        received = (BookingRequest.objects.filter(is_deleted_by_photographer=False)
+                    .values_list('photographer__user', 'status').annotate(total=models.Count('id')))
+        sent = (BookingRequest.objects.filter(is_deleted_by_client=False)
+                .values_list('client', 'status').annotate(total=models.Count('id')))
+        with transaction.atomic():
+            cls.objects.all().delete()
+            cls.objects.bulk_create(
+                [cls(user_id=user_id, role='received', status=status, count=total) for user_id, status, total in received]
+                + [cls(user_id=user_id, role='sent', status=status, count=total) for user_id, status, total in sent]
+            )
+
+    @classmethod
+    def for_user(cls, user, role):
+        """``{status: count}`` with every status present."""
+        counts = dict.fromkeys((status for status, _ in BookingRequest.STATUS_CHOICES), 0)
+        counts.update(cls.objects.filter(user=user, role=role).values_list('status', 'count'))
+        return counts
+
 class Favorite(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='favorites')
     photographer = models.ForeignKey(PhotographerProfile, on_delete=models.CASCADE, related_name='favorited_by')
@@ -198,7 +434,8 @@ class News(models.Model):
     title = models.CharField(max_length=200)
     content = models.TextField()
     image = models.ImageField(upload_to='news_images', blank=True)
-    created_at = models.DateTimeField(default=timezone.now, verbose_name="Дата публикации")
+    created_at = models.DateTimeField(default=timezone.now, db_index=True, verbose_name="Дата публикации")
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="Дата обновления")
 
     def __str__(self):
         return self.title
@@ -232,3 +469,255 @@ class SupportRequest(models.Model):
 
     def __str__(self):
         return f"{self.subject} - {self.user.username}"
+
+class RequestProfile(models.Model):
+    """A profile of a single request captured by RequestProfilerMiddleware."""
+    user = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='request_profiles')
+    method = models.CharField(max_length=10)
+    path = models.CharField(max_length=255)
+    url_name = models.CharField(max_length=100, blank=True)
+    duration_ms = models.FloatField(verbose_name="Время (мс)")
+    stats_file = models.CharField(max_length=255)
+    stacks_file = models.CharField(max_length=255)
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name="Дата")
+
+    class Meta:
+        ordering = ['-created_at']
+        verbose_name = "Профиль запроса"
+        verbose_name_plural = "Профили запросов"
+
+    def __str__(self):
+        return f"{self.method} {self.path} ({self.duration_ms:.0f} ms)"
+
+class OutboxEmail(models.Model):
+    """
+    An email queued by users.outbox.OutboxBackend and sent by
+    `manage.py send_outbox`. It is written in the caller's transaction, so
+    it exists only if the change it announces was committed.
+    """
+    STATUS_CHOICES = [
+        ('pending', 'В очереди'),
+        ('sending', 'Отправляется'),
+        ('sent', 'Отправлено'),
+        ('failed', 'Ошибка'),
+    ]
+
+    subject = models.CharField(max_length=255, verbose_name="Тема")
+    recipients = models.CharField(max_length=255, verbose_name="Получатели")
+    payload = models.JSONField()
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending', verbose_name="Статус")
+    attempts = models.PositiveIntegerField(default=0, verbose_name="Попыток")
+    next_attempt_at = models.DateTimeField(default=timezone.now, verbose_name="Следующая попытка")
+    last_error = models.TextField(blank=True, verbose_name="Последняя ошибка")
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name="Дата создания")
+    sent_at = models.DateTimeField(null=True, blank=True, verbose_name="Дата отправки")
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at']),
+        ]
+        verbose_name = "Письмо в очереди"
+        verbose_name_plural = "Очередь писем"
+
+    def __str__(self):
+        return f"{self.subject} → {self.recipients}"
+
+
+class AccountPurge(models.Model):
+    """
+    Deletion of a deactivated account, carried out in batches by
+    `manage.py purge_accounts` (see users/purge.py).
+    """
+    STATUS_CHOICES = [
+        ('pending', 'В очереди'),
+        ('running', 'Выполняется'),
+        ('done', 'Выполнено'),
+        ('failed', 'Ошибка'),
+    ]
+
+    # Not a foreign key: the job outlives the user row it deletes.
+    user_id = models.PositiveIntegerField(db_index=True)
+    username = models.CharField(max_length=150)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending', db_index=True, verbose_name="Статус")
+    deleted_rows = models.PositiveIntegerField(default=0, verbose_name="Удалено строк")
+    deleted_files = models.PositiveIntegerField(default=0, verbose_name="Удалено файлов")
+    last_error = models.TextField(blank=True, verbose_name="Последняя ошибка")
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name="Дата создания")
+    finished_at = models.DateTimeField(null=True, blank=True, verbose_name="Дата завершения")
+
+    class Meta:
+        ordering = ['-created_at']
+        verbose_name = "Удаление аккаунта"
+        verbose_name_plural = "Удаление аккаунтов"
+
+    def __str__(self):
+        return f"{self.username} ({self.get_status_display()})"
+
+
+class ChunkedUpload(models.Model):
+    """
+    A photo being uploaded in chunks (see users/chunked_uploads.py). The file
+    is assembled in CHUNKED_UPLOAD_DIR; received chunks are rows of
+    ChunkedUploadPart, so parallel chunk requests never update the same row.
+    """
+    STATUS_CHOICES = [
+        ('uploading', 'Загружается'),
+        ('processing', 'Обрабатывается'),
+        ('done', 'Загружено'),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    photographer = models.ForeignKey(PhotographerProfile, on_delete=models.CASCADE, related_name='chunked_uploads')
+    filename = models.CharField(max_length=255)
+    size = models.PositiveBigIntegerField()
+    chunk_size = models.PositiveIntegerField()
+    category = models.CharField(max_length=50, choices=SPECIALIZATION_CHOICES, default='wedding')
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='uploading')
+    photo = models.ForeignKey('Photo', on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    @property
+    def chunk_count(self):
+        return -(-self.size // self.chunk_size)
+
+    def chunk_length(self, index):
+        return min(self.chunk_size, self.size - index * self.chunk_size)
+
+    def __str__(self):
+        return f"{self.filename} ({self.get_status_display()})"
+
+
+class ChunkedUploadPart(models.Model):
+    upload = models.ForeignKey(ChunkedUpload, on_delete=models.CASCADE, related_name='parts')
+    index = models.PositiveIntegerField()
+
+    class Meta:
+        unique_together = ('upload', 'index')
+
+
+class SimilarPhotographer(models.Model):
+    """
+    Precomputed "similar photographers" of a photographer, ranked from 1
+    (see users/recommendations.py, rebuilt by `manage.py build_recommendations`).
+    """
+    photographer = models.ForeignKey(PhotographerProfile, on_delete=models.CASCADE, related_name='similar')
+    similar = models.ForeignKey(PhotographerProfile, on_delete=models.CASCADE, related_name='+')
+    rank = models.PositiveSmallIntegerField()
+    score = models.FloatField()
+    computed_at = models.DateTimeField(db_index=True)
+
+    class Meta:
+        # Also the index photographer_detail reads the list through.
+        unique_together = ('photographer', 'rank')
+        ordering = ['photographer', 'rank']
+
+    def __str__(self):
+        return f"{self.photographer} → {self.similar} ({self.score:.2f})"
+
+
+class PriceBucket(models.Model):
+    """
+    Number of photographers whose hourly price falls in
+    [``bucket``, ``bucket`` + PRICE_BUCKET_WIDTH), per specialization ('' for
+    all) and city (``City`` pk, 0 for all cities), for the price filter of the
+    catalog (see ``views.price_histogram``).
+
+    Only photographers the catalog lists (active users) are counted.
+    Maintained by PhotographerProfile.save() and the handlers in signals.py
+    (profile deletion, user activation and deactivation);
+    ``manage.py recount_prices`` rebuilds it from scratch.
+    """
+    specialization = models.CharField(max_length=50, blank=True)
+    city = models.PositiveIntegerField(default=0)
+    bucket = models.IntegerField()
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        unique_together = ('specialization', 'city', 'bucket')
+
+    def __str__(self):
+        return f"{self.specialization or '*'} {self.city or '*'} {self.bucket}: {self.count}"
+
+    @staticmethod
+    def width():
+        return getattr(settings, 'PRICE_BUCKET_WIDTH', 500)
+
+    @staticmethod
+    def highest():
+        return getattr(settings, 'PRICE_BUCKET_MAX', 20000)
+
+    @classmethod
+    def bucket_of(cls, price):
+        # Prices from PRICE_BUCKET_MAX up share the last bucket.
+        return min(max(price or 0, 0), cls.highest()) // cls.width() * cls.width()
+
+    @classmethod
+    def scopes(cls, specialization, city_id):
+        yield '', 0
+        yield specialization, 0
+        if city_id:
+            yield '', city_id
+            yield specialization, city_id
+
+    @classmethod
+    def deltas(cls, old, new):
+        """PriceBucket changes for a profile going from price state ``old`` to ``new`` (None = no row)."""
+        deltas = Counter()
+        for state, sign in ((old, -1), (new, 1)):
+            if state is None:
+                continue
+            specialization, city_id, price = state
+            for scope in cls.scopes(specialization, city_id):
+                deltas[(*scope, cls.bucket_of(price))] += sign
+        return deltas
+
+    @classmethod
+    def apply(cls, deltas):
+        for (specialization, city, bucket), delta in deltas.items():
+            if not delta:
+                continue
+            buckets = cls.objects.filter(specialization=specialization, city=city, bucket=bucket)
+            if buckets.update(count=F('count') + delta) or delta < 0:
+                continue
+            _, created = cls.objects.get_or_create(
+                specialization=specialization, city=city, bucket=bucket, defaults={'count': delta})
+            if not created:
+                buckets.update(count=F('count') + delta)
+
+    @classmethod
+    def rebuild(cls):
+        """Recount every histogram from PhotographerProfile."""
+        deltas = Counter()
+        listed = PhotographerProfile.objects.filter(user__is_active=True)
+        for state in listed.values_list(*PhotographerProfile.PRICED_FIELDS).iterator():
+            deltas.update(cls.deltas(None, state))
+        with transaction.atomic():
+            cls.objects.all().delete()
+            cls.objects.bulk_create(
+                cls(specialization=specialization, city=city, bucket=bucket, count=count)
+                for (specialization, city, bucket), count in deltas.items()
+            )
+
+    @classmethod
+    def percentiles(cls, histogram, points=(25, 50, 75, 90)):
+        """``{point: price}`` estimated from ``histogram``, interpolating inside buckets."""
+        width = cls.width()
+        total = sum(count for _, count in histogram)
+        result = {}
+        for point in points if total else ():
+            target, seen = total * point / 100, 0
+            for bucket, count in histogram:
+                if seen + count >= target:
+                    result[point] = round(bucket + width * (target - seen) / count)
+                    break
+                seen += count
+        return result
+
+    @classmethod
+    def histogram(cls, specialization='', city_id=0):
+        """``[(bucket, count), ...]`` of non-empty buckets in price order."""
+        return list(
+            cls.objects.filter(specialization=specialization, city=city_id or 0, count__gt=0)
+            .order_by('bucket').values_list('bucket', 'count')
+        )
@@ -0,0 +1,70 @@
+"""
+Emails about bookings and support requests.
+
+Every function here must run inside the transaction that makes the change
+it announces. With ``users.outbox.OutboxBackend`` configured, the messages
+are then queued atomically with that change; see ``users/outbox.py``.
+"""
+from django.core.mail import EmailMessage, get_connection
+
+from .models import BookingRequest
+
+
+def send(messages):
+    messages = [message for message in messages if message.to]
+    if messages:
+        get_connection().send_messages(messages)
+
+
+def display_name(user):
+    return user.get_full_name() or user.username
+
+
+def booking_created(booking):
+    photographer = booking.photographer.user
+    send([EmailMessage(
+        subject='Новая заявка на съёмку',
+        body=(
+            f'Здравствуйте, {display_name(photographer)}!\n\n'
+            f'{display_name(booking.client)} отправил(а) вам заявку:\n\n{booking.message}\n\n'
+            f'Телефон для связи: {booking.contact_phone}\n'
+            'Заявка доступна в личном кабинете.'
+        ),
+        to=[photographer.email] if photographer.email else [],
+    )])
+
+
+def bookings_status_changed(pks, notify):
+    """Tell the other side of bookings ``pks`` about their new status.
+
+    ``notify`` is ``'client'`` when the photographer changed the status and
+    ``'photographer'`` when the client did. One query for any number of bookings.
+    """
+    bookings = BookingRequest.objects.filter(pk__in=pks).select_related('client', 'photographer__user')
+    messages = []
+    for booking in bookings:
+        photographer = booking.photographer.user
+        recipient, other = (booking.client, photographer) if notify == 'client' else (photographer, booking.client)
+        messages.append(EmailMessage(
+            subject=f'Заявка №{booking.pk}: {booking.get_status_display()}',
+            body=(
+                f'Здравствуйте, {display_name(recipient)}!\n\n'
+                f'Статус заявки №{booking.pk} ({display_name(other)}) изменён: '
+                f'«{booking.get_status_display()}».'
+            ),
+            to=[recipient.email] if recipient.email else [],
+        ))
+    send(messages)
+
+
+def support_replied(support_request):
+    user = support_request.user
+    send([EmailMessage(
+        subject=f'Ответ на обращение: {support_request.subject}',
+        body=(
+            f'Здравствуйте, {display_name(user)}!\n\n'
+            f'Ваш вопрос:\n{support_request.message}\n\n'
+            f'Ответ поддержки:\n{support_request.admin_response}'
+        ),
+        to=[user.email] if user.email else [],
+    )])
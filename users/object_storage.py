@@ -0,0 +1,250 @@
+"""
+S3-compatible media storage.
+
+``S3Storage`` keeps ``FileField``/``ImageField`` files in a bucket of any
+S3-compatible service (AWS S3, MinIO, Ceph, ...). With it, app nodes share
+no local disk. It speaks the S3 REST API over ``urllib`` and signs requests
+with AWS Signature Version 4, so no SDK is needed.
+
+``presigned_upload`` returns a short-lived URL that the browser can ``PUT``
+a file to directly. Photos uploaded that way never pass through an app
+worker (see ``users/direct_uploads.py``).
+
+The storage is enabled by ``S3_BUCKET`` (see settings). Objects use
+path-style URLs ``<endpoint>/<bucket>/<key>`` by default, which every
+S3-compatible server understands. Set ``S3_ADDRESSING_STYLE = 'virtual'``
+for ``<bucket>.<endpoint host>/<key>``.
+"""
+import datetime
+import hashlib
+import hmac
+import mimetypes
+import posixpath
+from urllib.error import HTTPError
+from urllib.parse import quote, urlsplit
+from urllib.request import Request, urlopen
+from xml.etree import ElementTree
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import Storage
+from django.utils.deconstruct import deconstructible
+
+ALGORITHM = 'AWS4-HMAC-SHA256'
+UNSIGNED_PAYLOAD = 'UNSIGNED-PAYLOAD'
+S3_NS = '{http://s3.amazonaws.com/doc/2006-03-01/}'
+
+
+class S3Error(OSError):
+    """A failed request; ``status`` is None if the service could not be reached."""
+
+    def __init__(self, status, body=b''):
+        if status is None:
+            super().__init__(f'S3 unreachable: {body}')
+        else:
+            super().__init__(f'S3 responded {status}: {body[:200]!r}')
+        self.status = status
+
+
+# --- Signature Version 4 ---------------------------------------------------
+
+def _hmac(key, message):
+    return hmac.new(key, message.encode('utf-8'), hashlib.sha256).digest()
+
+
+def _sha256(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def _quote(value, safe='-_.~'):
+    return quote(value, safe=safe)
+
+
+def canonical_query(params):
+    return '&'.join(f'{_quote(key)}={_quote(str(value))}' for key, value in sorted(params.items()))
+
+
+def signature(secret_key, region, method, path, params, headers, payload_hash, amz_date):
+    """Signature of one request. ``headers`` are the signed ones, lowercase names."""
+    date = amz_date[:8]
+    scope = f'{date}/{region}/s3/aws4_request'
+    signed_headers = ';'.join(sorted(headers))
+    canonical_request = '\n'.join([
+        method,
+        _quote(path, safe='/-_.~'),
+        canonical_query(params),
+        ''.join(f'{name}:{str(headers[name]).strip()}\n' for name in sorted(headers)),
+        signed_headers,
+        payload_hash,
+    ])
+    string_to_sign = '\n'.join([ALGORITHM, amz_date, scope, _sha256(canonical_request.encode('utf-8'))])
+    key = _hmac(f'AWS4{secret_key}'.encode('utf-8'), date)
+    for part in (region, 's3', 'aws4_request'):
+        key = _hmac(key, part)
+    return hmac.new(key, string_to_sign.encode('utf-8'), hashlib.sha256).hexdigest()
+
+
+def _amz_date(now=None):
+    return (now or datetime.datetime.now(datetime.timezone.utc)).strftime('%Y%m%dT%H%M%SZ')
+
+
+# --- Storage ---------------------------------------------------------------
+
+@deconstructible
+class S3Storage(Storage):
+    def __init__(self, bucket=None, endpoint_url=None, access_key=None, secret_key=None, region=None,
+                 public_url=None, addressing_style=None, url_expires=None, timeout=None):
+        self.bucket = bucket or settings.S3_BUCKET
+        self.endpoint_url = (endpoint_url or settings.S3_ENDPOINT_URL).rstrip('/')
+        self.access_key = access_key or settings.S3_ACCESS_KEY_ID
+        self.secret_key = secret_key or settings.S3_SECRET_ACCESS_KEY
+        self.region = region or getattr(settings, 'S3_REGION', 'us-east-1')
+        self.public_url = (public_url or getattr(settings, 'S3_PUBLIC_URL', '')).rstrip('/')
+        self.addressing_style = addressing_style or getattr(settings, 'S3_ADDRESSING_STYLE', 'path')
+        self.url_expires = url_expires or getattr(settings, 'S3_URL_EXPIRES', 3600)
+        self.timeout = timeout or getattr(settings, 'S3_TIMEOUT', 10)
+
+    # Addressing and signing
+
+    def _location(self, key=''):
+        """``(base URL, host, path)`` of ``key`` in the bucket."""
+        parts = urlsplit(self.endpoint_url)
+        if self.addressing_style == 'virtual':
+            host = f'{self.bucket}.{parts.netloc}'
+            path = f'{parts.path}/{key}'
+        else:
+            host = parts.netloc
+            path = f'{parts.path}/{self.bucket}/{key}'
+        return f'{parts.scheme}://{host}', host, path
+
+    def _credential(self, amz_date):
+        return f'{self.access_key}/{amz_date[:8]}/{self.region}/s3/aws4_request'
+
+    def _request(self, method, key='', params=None, body=b'', headers=None):
+        params = params or {}
+        base, host, path = self._location(key)
+        amz_date = _amz_date()
+        payload_hash = _sha256(body)
+        signed = {'host': host, 'x-amz-date': amz_date, 'x-amz-content-sha256': payload_hash}
+        signed.update({name.lower(): value for name, value in (headers or {}).items()})
+        auth = signature(self.secret_key, self.region, method, path, params, signed, payload_hash, amz_date)
+        signed['authorization'] = (
+            f'{ALGORITHM} Credential={self._credential(amz_date)}, '
+            f'SignedHeaders={";".join(sorted(set(signed) - {"authorization"}))}, Signature={auth}'
+        )
+        url = base + _quote(path, safe='/-_.~') + (f'?{canonical_query(params)}' if params else '')
+        request = Request(url, data=body or None, method=method,
+                          headers={name: value for name, value in signed.items() if name != 'host'})
+        try:
+            with urlopen(request, timeout=self.timeout) as response:
+                return response.status, response.headers, response.read()
+        except HTTPError as error:
+            raise S3Error(error.code, error.read()) from None
+        except OSError as error:
+            # URLError (refused connection, DNS failure), timeouts, reset connections.
+            raise S3Error(None, getattr(error, 'reason', error)) from error
+
+    def presigned_url(self, method, name, expires=None, headers=None):
+        """URL that allows ``method`` on ``name`` without credentials until it expires."""
+        key = self._key(name)
+        base, host, path = self._location(key)
+        amz_date = _amz_date()
+        signed = {'host': host, **{header.lower(): value for header, value in (headers or {}).items()}}
+        params = {
+            'X-Amz-Algorithm': ALGORITHM,
+            'X-Amz-Credential': self._credential(amz_date),
+            'X-Amz-Date': amz_date,
+            'X-Amz-Expires': str(expires or self.url_expires),
+            'X-Amz-SignedHeaders': ';'.join(sorted(signed)),
+        }
+        params['X-Amz-Signature'] = signature(
+            self.secret_key, self.region, method, path, params, signed, UNSIGNED_PAYLOAD, amz_date)
+        return f'{base}{_quote(path, safe="/-_.~")}?{canonical_query(params)}'
+
+    def presigned_upload(self, name, content_type, expires=None):
+        """Where and how a browser uploads ``name`` itself: ``{'url', 'method', 'headers'}``."""
+        headers = {'Content-Type': content_type}
+        return {
+            'url': self.presigned_url('PUT', name, expires, headers),
+            'method': 'PUT',
+            'headers': headers,
+        }
+
+    def _key(self, name):
+        return posixpath.normpath(name.replace('\\', '/')).lstrip('/')
+
+    def _head(self, name):
+        try:
+            return self._request('HEAD', self._key(name))[1]
+        except S3Error as error:
+            if error.status == 404:
+                return None
+            raise
+
+    # Storage API
+
+    def _open(self, name, mode='rb'):
+        if 'w' in mode or 'a' in mode:
+            raise ValueError("S3Storage files can only be opened for reading")
+        try:
+            _, _, body = self._request('GET', self._key(name))
+        except S3Error as error:
+            if error.status == 404:
+                raise FileNotFoundError(name) from None
+            raise
+        return ContentFile(body, name=name)
+
+    def _save(self, name, content):
+        if hasattr(content, 'seek'):
+            content.seek(0)
+        body = content.read()
+        if isinstance(body, str):
+            body = body.encode('utf-8')
+        content_type = getattr(content, 'content_type', None) or mimetypes.guess_type(name)[0]
+        self._request('PUT', self._key(name), body=body,
+                      headers={'Content-Type': content_type or 'application/octet-stream'})
+        return name
+
+    def delete(self, name):
+        self._request('DELETE', self._key(name))
+
+    def exists(self, name):
+        return self._head(name) is not None
+
+    def size(self, name):
+        headers = self._head(name)
+        if headers is None:
+            raise FileNotFoundError(name)
+        return int(headers['Content-Length'])
+
+    def content_type(self, name):
+        headers = self._head(name)
+        return headers.get('Content-Type', '') if headers is not None else None
+
+    def get_modified_time(self, name):
+        headers = self._head(name)
+        if headers is None:
+            raise FileNotFoundError(name)
+        return datetime.datetime.strptime(headers['Last-Modified'], '%a, %d %b %Y %H:%M:%S GMT').replace(
+            tzinfo=datetime.timezone.utc)
+
+    def listdir(self, path):
+        prefix = self._key(path) if path else ''
+        prefix = '' if prefix == '.' else f'{prefix}/'
+        directories, files = [], []
+        params = {'list-type': '2', 'prefix': prefix, 'delimiter': '/'}
+        while True:
+            _, _, body = self._request('GET', params=params)
+            root = ElementTree.fromstring(body)
+            directories += [element.text[len(prefix):].rstrip('/') for element in root.iter(f'{S3_NS}Prefix')
+                            if element.text and element.text != prefix]
+            files += [element.text[len(prefix):] for element in root.iter(f'{S3_NS}Key')]
+            token = root.findtext(f'{S3_NS}NextContinuationToken')
+            if root.findtext(f'{S3_NS}IsTruncated') != 'true' or not token:
+                return directories, files
+            params['continuation-token'] = token
+
+    def url(self, name):
+        if self.public_url:
+            return f'{self.public_url}/{_quote(self._key(name), safe="/-_.~")}'
+        return self.presigned_url('GET', name)
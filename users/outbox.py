@@ -0,0 +1,163 @@
+"""
+Transactional email outbox.
+
+``EMAIL_BACKEND = 'users.outbox.OutboxBackend'`` turns every ``send_mail``
+and ``EmailMessage.send()`` in the project into an ``OutboxEmail`` row,
+Django's password reset emails included. A row is written in the caller's
+transaction: it is committed together with the booking or reply it
+announces, or rolled back with it. No request ever waits on SMTP.
+
+``manage.py send_outbox`` delivers due rows in batches through
+``OUTBOX_DELIVERY_BACKEND``, opening one connection per batch. A batch is
+claimed (marked ``sending`` for ``OUTBOX_LEASE`` seconds) before the
+connection is opened, so no transaction or row lock is held during SMTP. A failed
+message is retried with exponential backoff (``OUTBOX_RETRY_DELAY``
+seconds, doubled on each attempt, capped at ``OUTBOX_MAX_RETRY_DELAY``).
+After ``OUTBOX_MAX_ATTEMPTS`` attempts it is marked failed.
+"""
+import random
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.core.mail.backends.base import BaseEmailBackend
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .models import OutboxEmail
+
+
+def serialize(message):
+    if message.attachments:
+        raise ValueError("Outbox emails cannot carry attachments")
+    return {
+        'subject': message.subject,
+        'body': message.body,
+        'from_email': message.from_email,
+        'to': list(message.to),
+        'cc': list(message.cc),
+        'bcc': list(message.bcc),
+        'reply_to': list(message.reply_to),
+        'headers': dict(message.extra_headers),
+        'alternatives': [[content, mimetype] for content, mimetype in getattr(message, 'alternatives', [])],
+    }
+
+
+def deserialize(payload):
+    payload = dict(payload)
+    alternatives = payload.pop('alternatives', [])
+    message = EmailMultiAlternatives(**payload)
+    for content, mimetype in alternatives:
+        message.attach_alternative(content, mimetype)
+    return message
+
+
+class OutboxBackend(BaseEmailBackend):
+    """Queues messages in the outbox instead of sending them."""
+
+    def send_messages(self, email_messages):
+        rows = [
+            OutboxEmail(
+                subject=str(message.subject)[:255],
+                recipients=', '.join(message.recipients())[:255],
+                payload=serialize(message),
+            )
+            for message in email_messages
+            if message.recipients()
+        ]
+        OutboxEmail.objects.bulk_create(rows)
+        return len(rows)
+
+
+def retry_delay(attempts):
+    base = getattr(settings, 'OUTBOX_RETRY_DELAY', 60)
+    cap = getattr(settings, 'OUTBOX_MAX_RETRY_DELAY', 6 * 60 * 60)
+    delay = min(base * 2 ** (attempts - 1), cap)
+    # Jitter keeps messages that failed together from retrying together.
+    return timedelta(seconds=delay * random.uniform(0.8, 1.2))
+
+
+FIELDS = ['status', 'attempts', 'next_attempt_at', 'last_error', 'sent_at']
+
+
+def record_failure(email, error, now, max_attempts):
+    email.attempts += 1
+    email.last_error = f'{type(error).__name__}: {error}'[:2000]
+    if email.attempts >= max_attempts:
+        email.status = 'failed'
+    else:
+        email.status = 'pending'
+        email.next_attempt_at = now + retry_delay(email.attempts)
+
+
+def claim(batch_size, now):
+    """Mark up to ``batch_size`` due messages as ``sending`` and return them.
+
+    The claim is a short transaction of its own. Until the lease
+    (``OUTBOX_LEASE`` seconds) runs out, no other worker picks the messages
+    up; after that, messages of a worker that died while sending are due again.
+    """
+    lease_until = now + timedelta(seconds=getattr(settings, 'OUTBOX_LEASE', 10 * 60))
+    with transaction.atomic():
+        due = (
+            OutboxEmail.objects.filter(status__in=['pending', 'sending'], next_attempt_at__lte=now)
+            .order_by('next_attempt_at', 'pk')
+        )
+        if connection.features.has_select_for_update_skip_locked:
+            # Parallel workers each claim a different batch.
+            due = due.select_for_update(skip_locked=True)
+        ids = list(due.values_list('pk', flat=True)[:batch_size])
+        if not ids:
+            return []
+        # Conditional, so rows another worker claimed meanwhile are left to it.
+        OutboxEmail.objects.filter(pk__in=ids, next_attempt_at__lte=now).exclude(status__in=['sent', 'failed']).update(
+            status='sending', next_attempt_at=lease_until,
+        )
+        return list(OutboxEmail.objects.filter(pk__in=ids, status='sending', next_attempt_at=lease_until)
+                    .order_by('pk'))
+
+
+def deliver_batch(batch_size=None):
+    """Send one batch of due messages over one connection; returns ``(sent, failed)``.
+
+    No transaction is open while talking to the mail server: the batch is
+    claimed in one short transaction and the results are written in another.
+    """
+    batch_size = batch_size or getattr(settings, 'OUTBOX_BATCH_SIZE', 100)
+    max_attempts = getattr(settings, 'OUTBOX_MAX_ATTEMPTS', 8)
+    backend = getattr(settings, 'OUTBOX_DELIVERY_BACKEND', 'django.core.mail.backends.smtp.EmailBackend')
+    now = timezone.now()
+
+    batch = claim(batch_size, now)
+    if not batch:
+        return 0, 0
+
+    sent = failed = 0
+    mailer = get_connection(backend, fail_silently=False)
+    try:
+        mailer.open()
+    except Exception as error:
+        # Nothing can be sent: count one failed attempt for the whole batch.
+        for email in batch:
+            record_failure(email, error, now, max_attempts)
+        failed = len(batch)
+    else:
+        try:
+            for email in batch:
+                try:
+                    mailer.send_messages([deserialize(email.payload)])
+                except Exception as error:
+                    record_failure(email, error, now, max_attempts)
+                    failed += 1
+                else:
+                    email.attempts += 1
+                    email.status = 'sent'
+                    email.sent_at = timezone.now()
+                    email.last_error = ''
+                    sent += 1
+        finally:
+            mailer.close()
+
+    with transaction.atomic():
+        OutboxEmail.objects.bulk_update(batch, FIELDS)
+    return sent, failed
@@ -0,0 +1,135 @@
+"""
+Pagination that avoids what gets slow on large tables.
+
+``EstimatedCountPaginator`` is for large admin changelists. An unfiltered
+``COUNT(*)`` over hundreds of thousands of rows costs more than the rest of
+the page. When the changelist is unfiltered and the database statistics say
+the table is large, the planner's row estimate is used instead. PostgreSQL
+keeps it in ``pg_class.reltuples``; SQLite keeps it in ``sqlite_stat1`` once
+``ANALYZE`` has run. Filtered or small lists are still counted exactly.
+
+``keyset_page`` pages a queryset sorted by indexed columns ending with the
+pk, like the booking inboxes do (see ``users.bookings``). The cursor is the
+sort key of the first or last row shown, and the next page is a range scan
+of the ``(column, id)`` index from there: no OFFSET, which reads and drops
+every earlier row, and no COUNT. The price is that pages are not numbered.
+"""
+from functools import reduce
+from operator import or_
+
+from django.core.exceptions import ValidationError
+from django.core.paginator import Paginator
+from django.db import DatabaseError, connections, transaction
+from django.db.models import Q
+from django.utils.functional import cached_property
+
+ESTIMATE_THRESHOLD = 10_000
+
+
+def estimated_count(queryset):
+    """Row estimate for an unfiltered queryset from database statistics, or None."""
+    if queryset.query.where or queryset.query.distinct:
+        return None
+    connection = connections[queryset.db]
+    table = queryset.model._meta.db_table
+    try:
+        # A savepoint, so a missing statistics table does not break an open transaction.
+        with transaction.atomic(using=queryset.db), connection.cursor() as cursor:
+            if connection.vendor == 'postgresql':
+                cursor.execute('SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass', [table])
+                row = cursor.fetchone()
+                estimate = row[0] if row else None
+            elif connection.vendor == 'sqlite':
+                cursor.execute('SELECT stat FROM sqlite_stat1 WHERE tbl = %s', [table])
+                estimate = max((int(stat.split()[0]) for stat, in cursor.fetchall()), default=None)
+            else:
+                return None
+    except DatabaseError:
+        return None
+    if estimate is None or estimate < ESTIMATE_THRESHOLD:
+        return None
+    return estimate
+
+
+class EstimatedCountPaginator(Paginator):
+    @cached_property
+    def count(self):
+        estimate = estimated_count(self.object_list)
+        return estimate if estimate is not None else super().count
+
+
+def _sort_fields(order_by):
+    return [(name.removeprefix('-'), name.startswith('-')) for name in order_by]
+
+
+def make_cursor(obj, order_by):
+    return '|'.join(str(getattr(obj, name)) for name, _ in _sort_fields(order_by))
+
+
+def parse_cursor(model, order_by, cursor):
+    """The sort key encoded by ``make_cursor``; ValueError when it is not one."""
+    fields = _sort_fields(order_by)
+    values = (cursor or '').split('|')
+    if len(values) != len(fields):
+        raise ValueError("Invalid cursor")
+    try:
+        return [
+            (model._meta.pk if name == 'pk' else model._meta.get_field(name)).to_python(value)
+            for (name, _), value in zip(fields, values)
+        ]
+    except ValidationError:
+        raise ValueError("Invalid cursor")
+
+
+def beyond(order_by, key, backwards=False):
+    """Rows after ``key`` in ``order_by``, or before it with ``backwards``."""
+    fields = _sort_fields(order_by)
+    conditions, equal = [], {}
+    for (name, descending), value in zip(fields, key):
+        lookup = 'lt' if descending != backwards else 'gt'
+        conditions.append(Q(**equal, **{f'{name}__{lookup}': value}))
+        equal[name] = value
+    (name, descending), value = fields[0], key[0]
+    # The redundant bound on the first column lets the database seek the index.
+    seek = Q(**{f"{name}__{'lte' if descending != backwards else 'gte'}": value})
+    return seek & reduce(or_, conditions)
+
+
+class KeysetPage:
+    """One page of ``keyset_page``; the cursors of its neighbours are None at either end."""
+
+    def __init__(self, object_list, previous_cursor, next_cursor):
+        self.object_list = object_list
+        self.previous_cursor = previous_cursor
+        self.next_cursor = next_cursor
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def has_other_pages(self):
+        return bool(self.previous_cursor or self.next_cursor)
+
+
+def keyset_page(queryset, order_by, per_page, after=None, before=None):
+    """The page of ``queryset`` sorted by ``order_by`` (ending with the pk) that
+    follows the key ``after`` or precedes the key ``before``. Without either, or when
+    nothing is left on that side (rows were deleted meanwhile), the first page."""
+    if before is not None:
+        reverse = [name.removeprefix('-') if name.startswith('-') else f'-{name}' for name in order_by]
+        rows = list(queryset.filter(beyond(order_by, before, backwards=True)).order_by(*reverse)[:per_page + 1])
+        if rows:
+            previous_cursor = make_cursor(rows[per_page - 1], order_by) if len(rows) > per_page else None
+            rows = rows[:per_page][::-1]
+            return KeysetPage(rows, previous_cursor, make_cursor(rows[-1], order_by))
+    elif after is not None:
+        rows = list(queryset.filter(beyond(order_by, after)).order_by(*order_by)[:per_page + 1])
+        if rows:
+            next_cursor = make_cursor(rows[per_page - 1], order_by) if len(rows) > per_page else None
+            return KeysetPage(rows[:per_page], make_cursor(rows[0], order_by), next_cursor)
+
+    rows = list(queryset.order_by(*order_by)[:per_page + 1])
+    next_cursor = make_cursor(rows[per_page - 1], order_by) if len(rows) > per_page else None
+    return KeysetPage(rows[:per_page], None, next_cursor)
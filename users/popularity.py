@@ -0,0 +1,62 @@
+"""
+Popularity of photographers, the default order of the specialists catalog.
+
+    popularity = VIEW_WEIGHT * ln(1 + views)
+               + FAVORITE_WEIGHT * favorites
+               + LIKE_WEIGHT * likes of the last POPULARITY_LIKES_DAYS days
+
+Computing it per request would take aggregates over the whole catalog for
+every page and could not use an index. It is a column instead, indexed
+together with the pk, and ``manage.py update_popularity`` refreshes it on a
+schedule. Only rows whose score changed are written, with ``bulk_update``,
+so ``updated_at`` (and with it the photographer page ETag) stays put.
+"""
+import math
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count
+from django.utils import timezone
+
+from .models import Favorite, PhotographerProfile, PhotoLike
+
+VIEW_WEIGHT = 1.0
+FAVORITE_WEIGHT = 3.0
+LIKE_WEIGHT = 0.5
+DIGITS = 4
+
+
+def score(views, favorites, recent_likes):
+    return round(VIEW_WEIGHT * math.log1p(views) + FAVORITE_WEIGHT * favorites + LIKE_WEIGHT * recent_likes, DIGITS)
+
+
+def _counts(queryset, field):
+    return dict(queryset.values(field).annotate(count=Count('pk')).order_by().values_list(field, 'count'))
+
+
+def update(batch_size=1000, now=None):
+    """Recompute every photographer's score; returns how many changed."""
+    days = getattr(settings, 'POPULARITY_LIKES_DAYS', 30)
+    since = (now or timezone.now()) - timedelta(days=days)
+    favorites = _counts(Favorite.objects.all(), 'photographer_id')
+    likes = _counts(PhotoLike.objects.filter(created_at__gte=since), 'photo__photographer_id')
+
+    changed = 0
+    last_pk = 0
+    profiles = PhotographerProfile.objects.order_by('pk').only('pk', 'views_count', 'popularity')
+    while True:
+        batch = list(profiles.filter(pk__gt=last_pk)[:batch_size])
+        if not batch:
+            return changed
+        last_pk = batch[-1].pk
+        stale = []
+        for profile in batch:
+            value = score(profile.views_count, favorites.get(profile.pk, 0), likes.get(profile.pk, 0))
+            if value != profile.popularity:
+                profile.popularity = value
+                stale.append(profile)
+        if stale:
+            with transaction.atomic():
+                PhotographerProfile.objects.bulk_update(stale, ['popularity'])
+            changed += len(stale)
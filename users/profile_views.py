@@ -0,0 +1,107 @@
+"""
+Profile view counting.
+
+Logged-in viewers are told apart by user. Anonymous viewers are told apart
+by a keyed hash of their IP address and User-Agent, so counting a view never
+creates a server-side session. The hash is stored in ``session_key``, which
+has room for it.
+
+A viewer is unique per day. Each (photographer, viewer, day) has one raw
+``ProfileView`` row, whose unique constraints decide whether a view is the
+viewer's first that day. ``hits`` counts the visits. Visits already counted
+are remembered in the cache backend for ``PROFILE_VIEW_CACHE_TIMEOUT``
+seconds, so a reload is answered without touching the database and is not a
+new visit. ``views_count`` on the profile counts unique viewers per day.
+
+Rows older than the retention window are folded into ``ProfileViewDaily``
+by ``manage.py compact_profile_views``; ``daily_views`` combines both for the
+dashboard chart. No per-viewer data outlives the window: a viewer returning
+after it is counted as that day's unique viewer, which it is.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Sum
+from django.utils import timezone
+from django.utils.crypto import salted_hmac
+
+from .models import PhotographerProfile, ProfileView, ProfileViewDaily
+
+
+def viewer_fingerprint(request):
+    raw = f"{request.META.get('REMOTE_ADDR', '')}|{request.META.get('HTTP_USER_AGENT', '')}"
+    return salted_hmac('users.profile_views', raw).hexdigest()
+
+
+def register_view(request, photographer):
+    """Count a visit of ``photographer``; the viewer's first of the day also counts as a unique view."""
+    if request.user.is_authenticated:
+        if request.user.pk == photographer.user_id:
+            return
+        lookup = {'user': request.user}
+        viewer = f'u{request.user.pk}'
+    else:
+        fingerprint = viewer_fingerprint(request)
+        lookup = {'session_key': fingerprint}
+        viewer = f'a{fingerprint}'
+    today = timezone.localdate()
+    cache_key = f'profile_view:{photographer.pk}:{today}:{viewer}'
+
+    if cache.get(cache_key):
+        return
+
+    visit = ProfileView.objects.filter(photographer=photographer, date=today, **lookup)
+    if not visit.update(hits=F('hits') + 1):
+        try:
+            with transaction.atomic():
+                ProfileView.objects.create(
+                    photographer=photographer, date=today,
+                    ip_address=None if request.user.is_authenticated else request.META.get('REMOTE_ADDR'),
+                    **lookup
+                )
+        except IntegrityError:  # a concurrent request was first today
+            visit.update(hits=F('hits') + 1)
+        else:
+            PhotographerProfile.objects.filter(pk=photographer.pk).update(views_count=F('views_count') + 1)
+            photographer.views_count += 1
+
+    cache.set(cache_key, True, getattr(settings, 'PROFILE_VIEW_CACHE_TIMEOUT', 6 * 60 * 60))
+
+
+def aggregate_by_day(views):
+    """Group a ProfileView queryset by (photographer, day) with unique and total counts."""
+    return (
+        views.values('photographer_id', 'date')
+        .annotate(unique=Count('pk'), total=Sum('hits'))
+        .order_by()
+    )
+
+
+def daily_views(photographer, days=30):
+    """Unique and total views per day for the last ``days`` days, oldest first.
+
+    Compacted days come from ``ProfileViewDaily``; days that still have raw
+    rows are aggregated on the fly (both are indexed by photographer and date).
+    """
+    today = timezone.localdate()
+    start = today - timedelta(days=days - 1)
+    totals = {start + timedelta(days=i): [0, 0] for i in range(days)}
+
+    rollups = ProfileViewDaily.objects.filter(photographer=photographer, date__gte=start)
+    for date, unique, total in rollups.values_list('date', 'unique_views', 'total_views'):
+        totals[date][0] += unique
+        totals[date][1] += total
+
+    raw = ProfileView.objects.filter(photographer=photographer, date__gte=start)
+    for row in aggregate_by_day(raw):
+        if row['date'] in totals:
+            totals[row['date']][0] += row['unique']
+            totals[row['date']][1] += row['total']
+
+    peak = max((total for _, total in totals.values()), default=0) or 1
+    return [
+        {'date': date, 'unique': unique, 'total': total, 'percent': round(total * 100 / peak)}
+        for date, (unique, total) in totals.items()
+    ]
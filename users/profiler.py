@@ -0,0 +1,137 @@
+"""
+On-demand profiling of single requests.
+
+Staff trigger a profile with ``?_profile=1`` (or an ``X-Profile: 1`` header).
+To profile a request made by a regular user, staff mint a signed token with
+``make_token(user)`` (or ``manage.py profile_token <username>``) and hand out
+``?_profile=<token>``; the token only works for that user and expires after
+``PROFILER_TOKEN_MAX_AGE`` seconds. Anonymous requests are never profiled.
+
+Every profile is written to ``PROFILER_DIR`` as a ``.prof`` file (cProfile
+``pstats`` dump) and a ``.folded`` file of sampled stacks in the collapsed
+format understood by flamegraph.pl and speedscope, and is listed in the admin
+under "Request profiles".
+"""
+import cProfile
+import io
+import os
+import pstats
+import sys
+import threading
+from collections import Counter
+from pathlib import Path
+
+from django.conf import settings
+from django.core import signing
+from django.utils import timezone
+
+TOKEN_SALT = 'users.profiler'
+QUERY_PARAM = '_profile'
+HEADER = 'HTTP_X_PROFILE'
+
+
+def profiler_dir():
+    return Path(getattr(settings, 'PROFILER_DIR', settings.BASE_DIR / 'profiles'))
+
+
+def make_token(user):
+    return signing.dumps({'u': user.pk}, salt=TOKEN_SALT, compress=True)
+
+
+def requested_value(request):
+    """The trigger value sent with the request, or None. Cheap enough to run on every request."""
+    value = request.META.get(HEADER)
+    if value is None and QUERY_PARAM in request.META.get('QUERY_STRING', ''):
+        value = request.GET.get(QUERY_PARAM)
+    return value
+
+
+def is_allowed(request, value):
+    user = getattr(request, 'user', None)
+    if user is None or not user.is_authenticated:
+        return False
+    if user.is_staff or user.is_superuser:
+        return True
+    max_age = getattr(settings, 'PROFILER_TOKEN_MAX_AGE', 24 * 60 * 60)
+    try:
+        payload = signing.loads(value, salt=TOKEN_SALT, max_age=max_age)
+    except signing.BadSignature:
+        return False
+    return payload.get('u') == user.pk
+
+
+class StackSampler(threading.Thread):
+    """Samples the stack of one thread at a fixed interval and counts folded stacks."""
+
+    def __init__(self, thread_id, interval):
+        super().__init__(daemon=True)
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self._done = threading.Event()
+
+    def run(self):
+        while not self._done.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            frames = []
+            while frame is not None:
+                code = frame.f_code
+                frames.append(f'{os.path.basename(code.co_filename)}:{code.co_name}:{code.co_firstlineno}')
+                frame = frame.f_back
+            if frames:
+                self.stacks[';'.join(reversed(frames))] += 1
+
+    def stop(self):
+        self._done.set()
+        self.join()
+
+    def folded(self):
+        return ''.join(f'{stack} {count}\n' for stack, count in self.stacks.most_common())
+
+
+class RequestProfiler:
+    def __init__(self):
+        interval = getattr(settings, 'PROFILER_SAMPLE_INTERVAL_MS', 1) / 1000
+        self.profile = cProfile.Profile()
+        self.sampler = StackSampler(threading.get_ident(), interval)
+
+    def __enter__(self):
+        self.sampler.start()
+        self.profile.enable()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.profile.disable()
+        self.sampler.stop()
+
+    def save(self, request, duration_ms):
+        from .models import RequestProfile
+
+        directory = profiler_dir()
+        directory.mkdir(parents=True, exist_ok=True)
+        match = request.resolver_match
+        url_name = match.view_name if match else ''
+        stem = f"{timezone.now():%Y%m%d-%H%M%S-%f}-{(url_name or 'unresolved').replace(':', '_')}"
+
+        stats_name = f'{stem}.prof'
+        stacks_name = f'{stem}.folded'
+        self.profile.dump_stats(directory / stats_name)
+        (directory / stacks_name).write_text(self.sampler.folded(), encoding='utf-8')
+
+        return RequestProfile.objects.create(
+            user=request.user if request.user.is_authenticated else None,
+            method=request.method,
+            path=request.get_full_path()[:255],
+            url_name=url_name or '',
+            duration_ms=duration_ms,
+            stats_file=stats_name,
+            stacks_file=stacks_name,
+        )
+
+
+def top_functions(stats_path, limit=40):
+    """Render the hottest functions of a ``.prof`` dump as text for the admin."""
+    output = io.StringIO()
+    stats = pstats.Stats(str(stats_path), stream=output)
+    stats.strip_dirs().sort_stats('cumulative').print_stats(limit)
+    return output.getvalue()
@@ -0,0 +1,145 @@
+"""
+Asynchronous account deletion.
+
+Deleting an account in the request used to cascade through every photo,
+like, view and booking of the user in one transaction and left all of
+their images in MEDIA_ROOT. Now ``request_purge`` only deactivates the user
+and queues an ``AccountPurge`` job. ``manage.py purge_accounts`` then
+deletes the related rows children-first in batches of ``PURGE_BATCH_SIZE``,
+one short transaction per batch.
+
+The files of a batch (photos, profile images and their renditions) are
+unlinked in ``transaction.on_commit``, so a rolled-back batch never loses
+the files of rows that still exist. A job that fails part-way can simply
+be run again. The cached favorites and likes of every user whose rows go
+are forgotten the same way.
+"""
+from functools import partial
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from . import bookings, memberships
+from .models import (
+    AccountPurge, BookingCounter, BookingRequest, ClientProfile, Favorite, Photo, PhotographerProfile,
+    PhotoLike, ProfileView, ProfileViewDaily, SupportRequest,
+)
+from .thumbnails import delete_renditions
+
+
+def request_purge(user):
+    """Deactivate ``user`` now and queue the deletion of everything they own."""
+    with transaction.atomic():
+        user.is_active = False
+        user.save(update_fields=['is_active'])
+        return AccountPurge.objects.create(user_id=user.pk, username=user.username)
+
+
+def delete_files(names):
+    deleted = 0
+    for name in names:
+        if default_storage.exists(name):
+            default_storage.delete(name)
+            deleted += 1
+        deleted += delete_renditions(default_storage, name)
+    return deleted
+
+
+class Purge:
+    def __init__(self, job, batch_size=None):
+        self.user_id = job.user_id
+        self.batch_size = batch_size or getattr(settings, 'PURGE_BATCH_SIZE', 500)
+        self.rows = 0
+        self.files = 0
+
+    def _unlink_later(self, names):
+        names = [name for name in names if name]
+        if names:
+            transaction.on_commit(partial(self._unlink, names))
+
+    def _unlink(self, names):
+        self.files += delete_files(names)
+
+    def delete(self, queryset, file_field=None, membership=None):
+        """Delete ``queryset`` batch by batch; files of ``file_field`` go once each batch commits.
+
+        With ``membership``, the cached membership sets of that kind of the rows' users are forgotten too.
+        """
+        fields = ('pk', file_field) if file_field else ('pk',)
+        if membership:
+            fields += ('user_id',)
+        while True:
+            with transaction.atomic():
+                batch = list(queryset.order_by('pk').values_list(*fields)[:self.batch_size])
+                if not batch:
+                    return
+                queryset.model.objects.filter(pk__in=[row[0] for row in batch]).delete()
+                if file_field:
+                    self._unlink_later(row[1] for row in batch)
+                if membership:
+                    memberships.forget_on_commit((row[-1] for row in batch), membership)
+            self.rows += len(batch)
+
+    def detach(self, queryset, field):
+        """Set ``field`` to NULL batch by batch instead of the single big UPDATE of SET_NULL."""
+        while True:
+            pks = list(queryset.order_by('pk').values_list('pk', flat=True)[:self.batch_size])
+            if not pks:
+                return
+            self.rows += queryset.model.objects.filter(pk__in=pks).update(**{field: None})
+
+    def discard_bookings(self, queryset):
+        while True:
+            pks = list(queryset.order_by('pk').values_list('pk', flat=True)[:self.batch_size])
+            if not pks:
+                return
+            self.rows += bookings.discard(BookingRequest.objects.filter(pk__in=pks))
+
+    def run(self):
+        user_id = self.user_id
+        own_photos = Q(photographer__user_id=user_id)
+        self.delete(PhotoLike.objects.filter(Q(user_id=user_id) | Q(photo__photographer__user_id=user_id)),
+                    membership=memberships.LIKES)
+        self.delete(Favorite.objects.filter(Q(user_id=user_id) | own_photos), membership=memberships.FAVORITES)
+        self.delete(ProfileView.objects.filter(own_photos))
+        self.delete(ProfileViewDaily.objects.filter(own_photos))
+        self.detach(ProfileView.objects.filter(user_id=user_id), 'user')
+        self.delete(Photo.objects.filter(own_photos), 'image')
+        self.discard_bookings(BookingRequest.objects.filter(Q(client_id=user_id) | own_photos))
+        self.delete(SupportRequest.objects.filter(user_id=user_id))
+        self.delete(BookingCounter.objects.filter(user_id=user_id))
+        self.delete(PhotographerProfile.objects.filter(user_id=user_id), 'profile_image')
+        self.delete(ClientProfile.objects.filter(user_id=user_id), 'profile_image')
+        # Only small leftovers (sessions, admin log, request profiles) cascade from here.
+        self.delete(User.objects.filter(pk=user_id))
+
+
+def run_job(job, batch_size=None):
+    """Carry out one claimed job and record the outcome on it."""
+    purge = Purge(job, batch_size)
+    try:
+        purge.run()
+    except Exception as error:
+        job.status = 'failed'
+        job.last_error = f'{type(error).__name__}: {error}'[:2000]
+    else:
+        job.status = 'done'
+        job.last_error = ''
+    job.deleted_rows += purge.rows
+    job.deleted_files += purge.files
+    job.finished_at = timezone.now()
+    job.save(update_fields=['status', 'last_error', 'deleted_rows', 'deleted_files', 'finished_at'])
+    return job
+
+
+def claim_next():
+    """Mark the oldest pending job as running and return it, or None. Safe with several workers."""
+    for job in AccountPurge.objects.filter(status='pending').order_by('created_at', 'pk')[:10]:
+        if AccountPurge.objects.filter(pk=job.pk, status='pending').update(status='running'):
+            job.status = 'running'
+            return job
+    return None
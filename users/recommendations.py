@@ -0,0 +1,207 @@
+"""
+"Similar photographers", computed offline from what clients favorite and like.
+
+Users are the rows and photographers the columns of a sparse matrix. A cell
+holds ``FAVORITE_WEIGHT`` for a favorite plus ``LIKE_WEIGHT`` per liked photo
+of that photographer (at most ``LIKES_CAP`` likes count). Two photographers
+are similar when the same users are drawn to both: their score is the cosine
+of their columns. Only the ``SIMILAR_PHOTOGRAPHERS_COUNT`` best neighbours of
+each photographer are kept, in ``SimilarPhotographer``, which
+``photographer_detail`` reads with one indexed query.
+
+With the optional NumPy/SciPy the scores are sparse matrix products over
+CSR/CSC arrays, a block of photographers at a time, which gets through
+millions of interactions in minutes. Without them a pure-Python sparse
+product computes the same scores, which is enough for a small site.
+
+``build(since=...)`` refreshes incrementally. A favorite or like added after
+``since`` changes only its photographer's column, so only photographers
+sharing a user with a changed column get new scores and only their rows are
+rewritten. Removed favorites and likes leave no timestamp; a periodic full
+build picks them up.
+"""
+import heapq
+import math
+from array import array
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Max
+from django.utils import timezone
+
+from .models import Favorite, PhotoLike, SimilarPhotographer
+
+try:
+    import numpy as np
+    from scipy import sparse
+except ImportError:  # optional, the pure-Python product is used instead
+    np = sparse = None
+
+# Scores are rounded so that floating-point noise does not break ties.
+SCORE_DIGITS = 6
+FAVORITE_WEIGHT = 1.0
+LIKE_WEIGHT = 0.25
+LIKES_CAP = 4
+# Photographers whose neighbours are computed by one sparse product.
+BLOCK_SIZE = 1000
+WRITE_BATCH = 500
+
+
+def count():
+    return getattr(settings, 'SIMILAR_PHOTOGRAPHERS_COUNT', 6)
+
+
+def interactions():
+    """``(user_id, photographer_id, weight)`` rows; a pair may come twice (favorite and likes)."""
+    favorites = Favorite.objects.filter(photographer__user__is_active=True).values_list('user_id', 'photographer_id')
+    for user_id, photographer_id in favorites.iterator(chunk_size=10000):
+        yield user_id, photographer_id, FAVORITE_WEIGHT
+    likes = (
+        PhotoLike.objects.filter(photo__photographer__user__is_active=True)
+        .values('user_id', 'photo__photographer_id').annotate(likes=Count('pk')).order_by()
+        .values_list('user_id', 'photo__photographer_id', 'likes')
+    )
+    for user_id, photographer_id, liked in likes.iterator(chunk_size=10000):
+        yield user_id, photographer_id, LIKE_WEIGHT * min(liked, LIKES_CAP)
+
+
+def neighbours(rows, changed=None, k=None):
+    """``{photographer_id: [(similar_id, score), ...]}``, best first, from ``interactions()`` rows.
+
+    With ``changed`` (photographer ids), only photographers whose scores those
+    columns affect are included.
+    """
+    k = k or count()
+    if sparse is None:
+        return _neighbours_python(rows, changed, k)
+    return _neighbours_sparse(rows, changed, k)
+
+
+def _best(candidates, k):
+    # Highest score first; ties go to the lower id, so both implementations agree.
+    return heapq.nsmallest(k, candidates, key=lambda item: (-item[1], item[0]))
+
+
+def _neighbours_python(rows, changed, k):
+    columns = defaultdict(lambda: defaultdict(float))
+    for user_id, photographer_id, weight in rows:
+        columns[photographer_id][user_id] += weight
+    by_user = defaultdict(dict)
+    for photographer_id, users in columns.items():
+        for user_id, weight in users.items():
+            by_user[user_id][photographer_id] = weight
+    norms = {pk: math.sqrt(sum(w * w for w in users.values())) for pk, users in columns.items()}
+
+    if changed is None:
+        targets = columns.keys()
+    else:
+        targets = {
+            other for pk in changed if pk in columns for user_id in columns[pk] for other in by_user[user_id]
+        }
+    result = {}
+    for pk in targets:
+        dots = defaultdict(float)
+        for user_id, weight in columns[pk].items():
+            for other, other_weight in by_user[user_id].items():
+                if other != pk:
+                    dots[other] += weight * other_weight
+        result[pk] = _best(
+            ((other, round(dot / (norms[pk] * norms[other]), SCORE_DIGITS)) for other, dot in dots.items()), k,
+        )
+    return result
+
+
+def _neighbours_sparse(rows, changed, k):
+    users, items, weights = array('q'), array('q'), array('d')
+    for user_id, photographer_id, weight in rows:
+        users.append(user_id)
+        items.append(photographer_id)
+        weights.append(weight)
+    if not items:
+        return {}
+    item_ids, item_index = np.unique(np.frombuffer(items, dtype=np.int64), return_inverse=True)
+    user_ids, user_index = np.unique(np.frombuffer(users, dtype=np.int64), return_inverse=True)
+    # Duplicate (user, photographer) cells are summed by the conversion.
+    matrix = sparse.coo_matrix(
+        (np.frombuffer(weights, dtype=np.float64), (user_index, item_index)), shape=(len(user_ids), len(item_ids)),
+    ).tocsc()
+    norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=0)).ravel())
+    matrix = (matrix @ sparse.diags(1 / norms)).tocsc()
+
+    if changed is None:
+        targets = np.arange(len(item_ids))
+    else:
+        changed_index = np.flatnonzero(np.isin(item_ids, list(changed)))
+        touched_users = np.unique(matrix[:, changed_index].indices)
+        targets = np.unique(matrix.tocsr()[touched_users].indices)
+
+    transposed = matrix.T.tocsr()
+    result = {}
+    for start in range(0, len(targets), BLOCK_SIZE):
+        block = targets[start:start + BLOCK_SIZE]
+        scores = (transposed[block] @ matrix).tocsr()
+        for row, column in enumerate(block):
+            first, last = scores.indptr[row], scores.indptr[row + 1]
+            others, values = scores.indices[first:last], scores.data[first:last]
+            keep = others != column
+            others, values = others[keep], np.round(values[keep], SCORE_DIGITS)
+            if len(values) > k:
+                # Keep everything tied with the k-th score, then order exactly.
+                threshold = np.partition(values, len(values) - k)[len(values) - k]
+                keep = values >= threshold
+                others, values = others[keep], values[keep]
+            order = np.lexsort((item_ids[others], -values))[:k]
+            result[int(item_ids[column])] = [
+                (int(item_ids[others[i]]), float(values[i])) for i in order
+            ]
+    return result
+
+
+def save(result, computed_at):
+    """Replace the stored neighbours of every photographer in ``result``."""
+    pks = list(result)
+    for start in range(0, len(pks), WRITE_BATCH):
+        batch = pks[start:start + WRITE_BATCH]
+        with transaction.atomic():
+            SimilarPhotographer.objects.filter(photographer_id__in=batch).delete()
+            SimilarPhotographer.objects.bulk_create(
+                SimilarPhotographer(photographer_id=pk, similar_id=other, rank=rank, score=score,
+                                    computed_at=computed_at)
+                for pk in batch for rank, (other, score) in enumerate(result[pk], start=1)
+            )
+
+
+def changed_since(since):
+    changed = set(Favorite.objects.filter(created_at__gte=since).values_list('photographer_id', flat=True))
+    changed.update(PhotoLike.objects.filter(created_at__gte=since).values_list('photo__photographer_id', flat=True))
+    return changed
+
+
+def last_build():
+    return SimilarPhotographer.objects.aggregate(last=Max('computed_at'))['last']
+
+
+def build(since=None, k=None):
+    """Recompute neighbours, only the ones affected since ``since`` when given; returns how many were stored."""
+    started = timezone.now()
+    changed = None
+    if since is not None:
+        changed = changed_since(since)
+        if not changed:
+            return 0
+    result = neighbours(interactions(), changed, k)
+    save(result, started)
+    if changed is None:
+        # Photographers nobody is drawn to any more.
+        SimilarPhotographer.objects.filter(computed_at__lt=started).delete()
+    return len(result)
+
+
+def similar_to(photographer, limit=None):
+    """The stored similar photographers of ``photographer``, best first, in one query."""
+    rows = (
+        SimilarPhotographer.objects.filter(photographer=photographer, similar__user__is_active=True)
+        .select_related('similar__user').order_by('rank')[:limit or count()]
+    )
+    return [row.similar for row in rows]
@@ -0,0 +1,298 @@
+"""
+Full-text search over photographers and news (SQLite FTS5).
+
+Two FTS5 tables back the search, ``search_photographers`` and
+``search_news``, each with the ``title`` and ``body`` columns. The rowid of
+an index row is the primary key of the indexed object, so updating or
+deleting one object is a rowid lookup.
+
+FTS5 has no Russian stemmer, so text is stemmed here before it is indexed
+(Snowball Russian algorithm, with English words lowercased as-is) and
+queries are stemmed the same way. Every query term is a prefix match, which
+also covers partially typed words. Results are ranked with BM25, and the
+title column weighs more than the body. Highlighting is done in Python on
+the original text by comparing word stems.
+
+The index is kept in sync by the signal handlers in ``users/signals.py``
+and can be rebuilt with ``manage.py rebuild_search_index``. It is first
+filled right after the migration creating its tables has run. On a database
+other than SQLite every function here degrades to "no index".
+"""
+import re
+
+from django.db import connection, transaction
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
+
+from .models import News, PhotographerProfile
+
+PHOTOGRAPHERS_TABLE = 'search_photographers'
+NEWS_TABLE = 'search_news'
+TABLES = (PHOTOGRAPHERS_TABLE, NEWS_TABLE)
+
+# bm25() column weights: (title, body)
+WEIGHTS = (5.0, 1.0)
+
+WORD_RE = re.compile(r'\w+', re.UNICODE)
+
+
+# --- Russian stemmer (Snowball) --------------------------------------------
+
+VOWELS = 'аеиоуыэюя'
+
+PERFECTIVE_GERUND_1 = ('вшись', 'вши', 'в')
+PERFECTIVE_GERUND_2 = ('ившись', 'ывшись', 'ивши', 'ывши', 'ив', 'ыв')
+ADJECTIVE = (
+    'ими', 'ыми', 'его', 'ого', 'ему', 'ому', 'ее', 'ие', 'ые', 'ое', 'ей', 'ий', 'ый', 'ой', 'ем', 'им',
+    'ым', 'ом', 'их', 'ых', 'ую', 'юю', 'ая', 'яя', 'ою', 'ею',
+)
+PARTICIPLE_1 = ('ем', 'нн', 'вш', 'ющ', 'щ')
+PARTICIPLE_2 = ('ивш', 'ывш', 'ующ')
+REFLEXIVE = ('ся', 'сь')
+VERB_1 = ('ете', 'йте', 'ешь', 'нно', 'ла', 'на', 'ли', 'ем', 'ло', 'но', 'ет', 'ют', 'ны', 'ть', 'й', 'л', 'н')
+VERB_2 = (
+    'ейте', 'уйте', 'ила', 'ыла', 'ена', 'ите', 'или', 'ыли', 'ило', 'ыло', 'ено', 'ует', 'уют', 'ены', 'ить',
+    'ыть', 'ишь', 'ей', 'уй', 'ил', 'ыл', 'им', 'ым', 'ен', 'ят', 'ит', 'ыт', 'ую', 'ю',
+)
+NOUN = (
+    'иями', 'ями', 'ами', 'ией', 'иям', 'ием', 'иях', 'ев', 'ов', 'ие', 'ье', 'еи', 'ии', 'ей', 'ой', 'ий', 'ям',
+    'ем', 'ам', 'ом', 'ах', 'ях', 'ию', 'ью', 'ия', 'ья', 'а', 'е', 'и', 'й', 'о', 'у', 'ы', 'ь', 'ю', 'я',
+)
+SUPERLATIVE = ('ейше', 'ейш')
+DERIVATIONAL = ('ость', 'ост')
+
+
+def _regions(word):
+    """Start offsets of the RV and R2 regions."""
+    rv = len(word)
+    for i, char in enumerate(word):
+        if char in VOWELS:
+            rv = i + 1
+            break
+
+    def next_region(start):
+        for i in range(start + 1, len(word)):
+            if word[i] not in VOWELS and word[i - 1] in VOWELS:
+                return i + 1
+        return len(word)
+
+    r1 = next_region(0)
+    return rv, next_region(r1)
+
+
+def _strip(word, start, endings, preceded_by=None):
+    """Remove the longest ending found in ``word[start:]``; return the new word or None."""
+    region = word[start:]
+    for ending in sorted(endings, key=len, reverse=True):
+        if not region.endswith(ending):
+            continue
+        stem = word[:-len(ending)]
+        if preceded_by is not None:
+            if len(stem) <= start or stem[-1] not in preceded_by:
+                continue
+        return stem
+    return None
+
+
+def _strip_any(word, start, grouped, plain):
+    return _strip(word, start, grouped, preceded_by='ая') or _strip(word, start, plain)
+
+
+def stem(word):
+    word = word.lower().replace('ё', 'е')
+    if not re.fullmatch(r'[а-я]+', word):
+        return word
+    rv, r2 = _regions(word)
+
+    # Step 1
+    result = _strip_any(word, rv, PERFECTIVE_GERUND_1, PERFECTIVE_GERUND_2)
+    if result is None:
+        word = _strip(word, rv, REFLEXIVE) or word
+        result = _strip(word, rv, ADJECTIVE)
+        if result is not None:
+            result = _strip_any(result, rv, PARTICIPLE_1, PARTICIPLE_2) or result
+        else:
+            result = _strip_any(word, rv, VERB_1, VERB_2)
+            if result is None:
+                result = _strip(word, rv, NOUN)
+    word = result if result is not None else word
+
+    # Step 2
+    if word[rv:].endswith('и'):
+        word = word[:-1]
+
+    # Step 3
+    word = _strip(word, r2, DERIVATIONAL) or word
+
+    # Step 4
+    if word[rv:].endswith('нн'):
+        word = word[:-1]
+    else:
+        superlative = _strip(word, rv, SUPERLATIVE)
+        if superlative is not None:
+            word = superlative[:-1] if superlative[rv:].endswith('нн') else superlative
+        elif word[rv:].endswith('ь'):
+            word = word[:-1]
+    return word
+
+
+def tokenize(text):
+    return WORD_RE.findall(text or '')
+
+
+def stem_text(text):
+    return ' '.join(stem(token) for token in tokenize(text))
+
+
+# --- Index maintenance -----------------------------------------------------
+
+def is_supported():
+    return connection.vendor == 'sqlite'
+
+
+def create_tables(schema_editor=None):
+    execute = schema_editor.execute if schema_editor else connection.cursor().execute
+    for table in TABLES:
+        execute(
+            f'CREATE VIRTUAL TABLE IF NOT EXISTS {table} '
+            f'USING fts5(title, body, tokenize="unicode61 remove_diacritics 2")'
+        )
+
+
+def drop_tables(schema_editor=None):
+    execute = schema_editor.execute if schema_editor else connection.cursor().execute
+    for table in TABLES:
+        execute(f'DROP TABLE IF EXISTS {table}')
+
+
+def photographer_document(profile):
+    user = profile.user
+    title = ' '.join(filter(None, [user.first_name, user.last_name, user.username]))
+    body = ' '.join(filter(None, [profile.short_intro, profile.bio, profile.city]))
+    return title, body
+
+
+def news_document(news):
+    return news.title, news.content
+
+
+def index_rows(table, rows):
+    """Insert or replace index rows given as ``(pk, title, body)`` with unstemmed text."""
+    if not is_supported():
+        return
+    rows = list(rows)
+    if not rows:
+        return
+    with connection.cursor() as cursor:
+        cursor.executemany(f'DELETE FROM {table} WHERE rowid = %s', [(pk,) for pk, _, _ in rows])
+        cursor.executemany(
+            f'INSERT INTO {table} (rowid, title, body) VALUES (%s, %s, %s)',
+            [(pk, stem_text(title), stem_text(body)) for pk, title, body in rows],
+        )
+
+
+def remove(table, pk):
+    if not is_supported():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {table} WHERE rowid = %s', [pk])
+
+
+def index_photographer(profile):
+    index_rows(PHOTOGRAPHERS_TABLE, [(profile.pk, *photographer_document(profile))])
+
+
+def index_news(news):
+    index_rows(NEWS_TABLE, [(news.pk, *news_document(news))])
+
+
+def clear(table):
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {table}')
+
+
+def rebuild(batch_size=1000):
+    """Recreate the index of every photographer and news item; returns ``{table: rows indexed}``."""
+    create_tables()
+    sources = [
+        (PHOTOGRAPHERS_TABLE, PhotographerProfile.objects.select_related('user'), photographer_document),
+        (NEWS_TABLE, News.objects.all(), news_document),
+    ]
+    counts = {}
+    for table, queryset, document in sources:
+        with transaction.atomic():
+            clear(table)
+            count = 0
+            batch = []
+            for obj in queryset.order_by('pk').iterator(chunk_size=batch_size):
+                batch.append((obj.pk, *document(obj)))
+                if len(batch) >= batch_size:
+                    index_rows(table, batch)
+                    count += len(batch)
+                    batch = []
+            index_rows(table, batch)
+            counts[table] = count + len(batch)
+    return counts
+
+
+# --- Querying --------------------------------------------------------------
+
+def query_stems(query):
+    return [stem(token) for token in tokenize(query)]
+
+
+def match_expression(query):
+    """Turn free user input into a safe FTS5 expression: every stem must match as a prefix."""
+    return ' AND '.join(f'"{term}"*' for term in query_stems(query))
+
+
+def search(queryset, table, query):
+    """Restrict ``queryset`` to objects matching ``query`` and order it by relevance.
+
+    Returns None when the query has no searchable words or there is no index,
+    so callers can fall back to a plain filter.
+    """
+    expression = match_expression(query)
+    if not expression or not is_supported():
+        return None
+    model_table = queryset.model._meta.db_table
+    title_weight, body_weight = WEIGHTS
+    return queryset.extra(
+        tables=[table],
+        where=[f'{table}.rowid = {model_table}.id', f'{table} MATCH %s'],
+        params=[expression],
+        select={'search_rank': f'bm25({table}, {title_weight}, {body_weight})'},
+        order_by=['search_rank'],
+    )
+
+
+def highlight(text, query, words=30):
+    """HTML snippet of ``text`` around the first match with matched words in <mark>."""
+    stems = query_stems(query)
+    tokens = list(WORD_RE.finditer(text or ''))
+    if not stems or not tokens:
+        return escape((text or '')[:300])
+
+    def matches(token):
+        token_stem = stem(token.group())
+        return any(token_stem.startswith(term) for term in stems)
+
+    first = next((i for i, token in enumerate(tokens) if matches(token)), 0)
+    start_index = max(0, first - words // 3)
+    end_index = min(len(tokens), start_index + words)
+    start = tokens[start_index].start()
+    end = tokens[end_index - 1].end()
+
+    parts = ['…' if start_index else '']
+    position = start
+    for token in tokens[start_index:end_index]:
+        parts.append(escape(text[position:token.start()]))
+        if matches(token):
+            parts.append(f'<mark>{escape(token.group())}</mark>')
+        else:
+            parts.append(escape(token.group()))
+        position = token.end()
+    parts.append(escape(text[position:end]))
+    if end_index < len(tokens):
+        parts.append('…')
+    return mark_safe(''.join(parts))
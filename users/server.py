@@ -0,0 +1,237 @@
+"""
+Production entry point of the project (``manage.py serve``): gunicorn with a
+preloaded, warmed-up master.
+
+gunicorn is an optional dependency; only ``serve`` needs it. With
+``preload_app`` the master imports the project before forking. ``when_ready``
+then warms the master up before any worker exists:
+
+* the URL resolver is populated;
+* every project template is compiled into the cached template loader;
+* process-level caches (the city index) are filled;
+* ``SERVE_WARMUP_PATHS`` are requested once in-process. That runs the lazy
+  imports and one-time setup behind the middleware and views.
+
+It then closes its database and cache connections. The workers share the
+warmed memory copy-on-write and open their own connections, so the first
+request after a deploy costs about what every later one does.
+
+Process management is gunicorn's: TERM stops gracefully, HUP replaces the
+workers (without reloading code, which the master preloaded), and USR2
+starts a new master with the new code on the same sockets; send TERM to the
+old master once the new one is ready. Workers are synchronous, so run them
+behind a buffering reverse proxy (nginx) that absorbs slow clients.
+
+``startup_benchmark`` measures time-to-first-byte of a freshly started
+server with and without warm-up (``manage.py serve --benchmark``).
+"""
+import os
+import signal
+import subprocess
+import sys
+import time
+from pathlib import Path
+from urllib.request import urlopen
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.servers.basehttp import get_internal_wsgi_application
+from django.db import connections
+from django.template import TemplateDoesNotExist, TemplateSyntaxError, engines
+from django.urls import get_resolver
+
+from . import cities
+
+try:
+    from gunicorn.app.base import BaseApplication
+except ImportError:  # optional, only `manage.py serve` needs it
+    BaseApplication = None
+
+READY_TIMEOUT = 30
+READY_MESSAGE = 'Ready on'
+
+
+def _elapsed_ms(start):
+    return round((time.perf_counter() - start) * 1000, 1)
+
+
+def warmup_host():
+    """A host name the project accepts, for in-process warm-up requests."""
+    for host in settings.ALLOWED_HOSTS:
+        if host not in ('*', '') and not host.startswith('.'):
+            return host
+    return 'localhost'
+
+
+def _template_dirs(engine):
+    """Directories ``engine`` loads templates from, including its loaders' app directories."""
+    dirs = list(engine.template_dirs)
+    loaders = list(getattr(getattr(engine, 'engine', None), 'template_loaders', ()))
+    while loaders:
+        loader = loaders.pop()
+        loaders.extend(getattr(loader, 'loaders', ()))  # the cached loader wraps others
+        if hasattr(loader, 'get_dirs'):
+            dirs.extend(loader.get_dirs())
+    return dict.fromkeys(map(Path, dirs))
+
+
+def warm_templates():
+    """Compile every template of the project into the cached loader; returns how many."""
+    base = Path(settings.BASE_DIR).resolve()
+    compiled = 0
+    for engine in engines.all():
+        for directory in _template_dirs(engine):
+            if not directory.resolve().is_relative_to(base):
+                continue  # third-party templates compile on first use
+            for path in directory.rglob('*'):
+                if not path.is_file():
+                    continue
+                try:
+                    engine.get_template(path.relative_to(directory).as_posix())
+                except (TemplateDoesNotExist, TemplateSyntaxError, UnicodeDecodeError):
+                    continue
+                compiled += 1
+    return compiled
+
+
+def warm_request(application, path):
+    """Run a GET of ``path`` through ``application`` in-process; returns the status line."""
+    path, _, query = path.partition('?')
+    environ = {
+        'REQUEST_METHOD': 'GET', 'PATH_INFO': path, 'QUERY_STRING': query, 'SCRIPT_NAME': '',
+        'SERVER_NAME': warmup_host(), 'SERVER_PORT': '80', 'HTTP_HOST': warmup_host(),
+        'SERVER_PROTOCOL': 'HTTP/1.1', 'REMOTE_ADDR': '127.0.0.1',
+        'wsgi.version': (1, 0), 'wsgi.url_scheme': 'http', 'wsgi.input': _EmptyInput(),
+        'wsgi.errors': sys.stderr, 'wsgi.multithread': False, 'wsgi.multiprocess': True,
+        'wsgi.run_once': False,
+    }
+    statuses = []
+    result = application(environ, lambda status, headers, exc_info=None: statuses.append(status))
+    try:
+        for _ in result:
+            pass
+    finally:
+        if hasattr(result, 'close'):
+            result.close()
+    return statuses[0] if statuses else None
+
+
+class _EmptyInput:
+    def read(self, *args):
+        return b''
+
+    def readline(self, *args):
+        return b''
+
+
+def warm_up(application, paths=()):
+    """Do in this process what the first requests would otherwise do; returns ``{step: ms}``."""
+    timings = {}
+    start = time.perf_counter()
+    routes = len(get_resolver().reverse_dict)  # populates the resolver
+    timings[f'urls ({routes})'] = _elapsed_ms(start)
+
+    start = time.perf_counter()
+    templates = warm_templates()
+    timings[f'templates ({templates})'] = _elapsed_ms(start)
+
+    start = time.perf_counter()
+    cities.index()
+    timings['caches'] = _elapsed_ms(start)
+
+    for path in paths:
+        start = time.perf_counter()
+        status = warm_request(application, path)
+        timings[f'GET {path} ({status})'] = _elapsed_ms(start)
+    return timings
+
+
+def close_connections():
+    """Close what must not be shared by forked processes."""
+    connections.close_all()
+    for cache in caches.all(initialized_only=True):
+        cache.close()
+
+
+def when_ready(arbiter):
+    """gunicorn hook, run in the master after the application is loaded and before the workers fork."""
+    application = arbiter.app
+    if application.warmup_paths is not None:
+        timings = warm_up(application.wsgi(), application.warmup_paths)
+        arbiter.log.info('Warm-up: %s', ', '.join(f'{step} {ms} ms' for step, ms in timings.items()))
+    close_connections()
+    # startup_benchmark waits for this line.
+    print(f'{READY_MESSAGE} {arbiter.LISTENERS[0]}/ (pid {os.getpid()})', flush=True)
+
+
+def gunicorn_options(host, port, workers, max_requests=0, graceful_timeout=30, timeout=30):
+    return {
+        'bind': f'[{host}]:{port}' if ':' in host else f'{host}:{port}',
+        'workers': workers,
+        'worker_class': 'sync',
+        'preload_app': True,
+        'timeout': timeout,
+        'graceful_timeout': graceful_timeout,
+        'max_requests': max_requests,
+        # Workers recycled together would all be cold at once.
+        'max_requests_jitter': max_requests // 10,
+        'when_ready': when_ready,
+    }
+
+
+if BaseApplication is not None:
+    class Application(BaseApplication):
+        """The project's WSGI application served by gunicorn with ``options``."""
+
+        def __init__(self, options, warmup_paths=None):
+            self.options = options
+            # None: no warm-up.
+            self.warmup_paths = warmup_paths
+            super().__init__()
+
+        def load_config(self):
+            for key, value in self.options.items():
+                self.cfg.set(key, value)
+
+        def load(self):
+            return get_internal_wsgi_application()
+else:
+    Application = None
+
+
+def time_to_first_byte(url):
+    start = time.perf_counter()
+    with urlopen(url, timeout=READY_TIMEOUT) as response:
+        response.read(1)
+        elapsed = _elapsed_ms(start)
+        response.read()
+    return elapsed
+
+
+def startup_benchmark(paths, command, repeat=1):
+    """Start ``command`` (a ``serve`` with ``--port 0``) with and without warm-up and time its first requests.
+
+    Returns ``[(mode, ready ms, {path: (first request ms, later request ms)})]``.
+    """
+    rows = []
+    for mode, extra in (('cold', ['--no-warmup']), ('warm', [])):
+        for _ in range(repeat):
+            start = time.perf_counter()
+            process = subprocess.Popen(command + extra, stdout=subprocess.PIPE, text=True, cwd=settings.BASE_DIR)
+            try:
+                for line in process.stdout:
+                    if line.startswith(READY_MESSAGE):
+                        base = line.split()[2].rstrip('/')
+                        break
+                else:
+                    raise RuntimeError('The server exited before listening')
+                ready = _elapsed_ms(start)
+                timings = {}
+                for path in paths:
+                    first = time_to_first_byte(base + path)
+                    timings[path] = (first, time_to_first_byte(base + path))
+                rows.append((mode, ready, timings))
+            finally:
+                process.send_signal(signal.SIGTERM)
+                process.communicate(timeout=READY_TIMEOUT)
+    return rows
@@ -0,0 +1,108 @@
+from django.contrib.auth.models import User
+from django.db.models.signals import post_delete, post_migrate, post_save, pre_save
+from django.dispatch import receiver
+
+from . import cities, gallery, search
+from .models import (
+    BookingCounter, BookingRequest, News, Photo, PhotographerProfile, PriceBucket,
+)
+
+SEARCH_INDEX_MIGRATION = '0016_search_index'
+
+
+@receiver(pre_save, sender=PhotographerProfile)
+def assign_city(sender, instance, raw=False, update_fields=None, **kwargs):
+    if not raw and (update_fields is None or 'city' in update_fields):
+        cities.assign(instance)
+
+
+@receiver(post_save, sender=PhotographerProfile)
+def index_photographer(sender, instance, raw=False, **kwargs):
+    if not raw:
+        search.index_photographer(instance)
+
+
+@receiver(post_migrate)
+def fill_search_index(sender, plan=None, **kwargs):
+    """Index existing rows once the migration creating the search tables has run."""
+    created = any(
+        (migration.app_label, migration.name) == ('users', SEARCH_INDEX_MIGRATION) and not backwards
+        for migration, backwards in plan or ()
+    )
+    if sender.name == 'users' and created and search.is_supported():
+        search.rebuild()
+
+
+@receiver(post_delete, sender=PhotographerProfile)
+def unindex_photographer(sender, instance, **kwargs):
+    search.remove(search.PHOTOGRAPHERS_TABLE, instance.pk)
+
+
+@receiver(post_delete, sender=PhotographerProfile)
+def uncount_price(sender, instance, **kwargs):
+    if instance.is_listed():
+        PriceBucket.apply(PriceBucket.deltas(instance._priced_state or instance.price_state(), None))
+
+
+@receiver(pre_save, sender=User)
+def remember_activity(sender, instance, raw=False, update_fields=None, **kwargs):
+    if raw or instance._state.adding or (update_fields is not None and 'is_active' not in update_fields):
+        return
+    instance._was_active = User.objects.filter(pk=instance.pk).values_list('is_active', flat=True).first()
+
+
+@receiver(post_save, sender=User)
+def recount_price_on_activity(sender, instance, raw=False, **kwargs):
+    # Deactivated photographers leave the catalog, and so the price histograms.
+    was_active = getattr(instance, '_was_active', None)
+    instance._was_active = None
+    if raw or was_active is None or was_active == instance.is_active:
+        return
+    state = PhotographerProfile.objects.filter(user=instance).values_list(*PhotographerProfile.PRICED_FIELDS).first()
+    if state is not None:
+        PriceBucket.apply(PriceBucket.deltas(None, state) if instance.is_active else PriceBucket.deltas(state, None))
+
+
+@receiver(post_save, sender=User)
+def reindex_photographer_name(sender, instance, raw=False, created=False, **kwargs):
+    # The photographer's name lives on User; new users have no profile yet.
+    if raw or created:
+        return
+    profile = PhotographerProfile.objects.filter(user=instance).select_related('user').first()
+    if profile is not None:
+        search.index_photographer(profile)
+
+
+@receiver(post_save, sender=Photo)
+@receiver(post_delete, sender=Photo)
+@receiver(post_save, sender=PhotographerProfile)
+@receiver(post_delete, sender=PhotographerProfile)
+def change_gallery(sender, raw=False, **kwargs):
+    if not raw:
+        gallery.bump_on_commit()
+
+
+@receiver(post_save, sender=User)
+def change_gallery_names(sender, raw=False, update_fields=None, **kwargs):
+    # The gallery shows usernames and hides deactivated accounts; logins change neither.
+    if not raw and update_fields != frozenset({'last_login'}):
+        gallery.bump_on_commit()
+
+
+@receiver(post_save, sender=News)
+def index_news(sender, instance, raw=False, **kwargs):
+    if not raw:
+        search.index_news(instance)
+
+
+@receiver(post_delete, sender=News)
+def unindex_news(sender, instance, **kwargs):
+    search.remove(search.NEWS_TABLE, instance.pk)
+
+
+@receiver(post_delete, sender=BookingRequest)
+def uncount_booking(sender, instance, **kwargs):
+    # Runs inside the deletion's transaction, cascades included.
+    state = instance._counted_state or instance.counter_state()
+    BookingCounter.apply(instance.counter_deltas(state, None))
+
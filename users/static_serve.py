@@ -0,0 +1,84 @@
+"""
+Serves collected static files from STATIC_ROOT when no web server sits in front.
+
+The pre-compressed ``.br``/``.gz`` siblings written at collectstatic time are
+picked according to the q-values of ``Accept-Encoding``. Content-hashed names from the
+manifest get a one-year immutable ``Cache-Control``, and any other name gets
+a short one. Under ``runserver`` with DEBUG on, static files are served by
+django.contrib.staticfiles before this view is reached.
+"""
+import mimetypes
+import os
+from functools import lru_cache
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.http import FileResponse, Http404
+from django.utils._os import safe_join
+from django.utils.cache import patch_cache_control, patch_vary_headers
+
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+FAR_FUTURE = 365 * 24 * 60 * 60
+SHORT = 60
+
+
+def parse_accept_encoding(header):
+    """``{coding: q}`` of an ``Accept-Encoding`` header; an unparsable q counts as 0."""
+    qualities = {}
+    for item in header.split(','):
+        coding, *params = (part.strip() for part in item.split(';'))
+        if not coding:
+            continue
+        quality = 1.0
+        for param in params:
+            key, _, value = param.partition('=')
+            if key.strip().lower() == 'q':
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        qualities[coding.lower()] = quality
+    return qualities
+
+
+def preferred_encoding(header, available):
+    """The coding of ``available`` the client prefers, the first one on ties; None when none is acceptable."""
+    qualities = parse_accept_encoding(header)
+    best, best_quality = None, 0
+    for coding in available:
+        quality = qualities.get(coding, qualities.get('*', 0))
+        if quality > best_quality:
+            best, best_quality = coding, quality
+    return best
+
+
+@lru_cache(maxsize=1)
+def hashed_names():
+    return frozenset(getattr(staticfiles_storage, 'hashed_files', {}).values())
+
+
+def serve_static(request, path):
+    if not settings.STATIC_ROOT:
+        raise Http404
+    try:
+        full_path = safe_join(settings.STATIC_ROOT, path)
+    except ValueError:
+        raise Http404
+    if not os.path.isfile(full_path):
+        raise Http404
+
+    content_type, _ = mimetypes.guess_type(full_path)
+    available = [name for name, suffix in ENCODINGS if os.path.isfile(full_path + suffix)]
+    encoding = preferred_encoding(request.META.get('HTTP_ACCEPT_ENCODING', ''), available)
+    if encoding:
+        full_path += dict(ENCODINGS)[encoding]
+
+    response = FileResponse(open(full_path, 'rb'), content_type=content_type or 'application/octet-stream')
+    if encoding:
+        response['Content-Encoding'] = encoding
+    patch_vary_headers(response, ('Accept-Encoding',))
+    if path in hashed_names():
+        patch_cache_control(response, public=True, max_age=FAR_FUTURE, immutable=True)
+    else:
+        patch_cache_control(response, public=True, max_age=SHORT)
+    return response
@@ -0,0 +1,143 @@
+"""
+Static files pipeline used by ``collectstatic``.
+
+``OptimizedManifestStaticFilesStorage`` extends Django's manifest storage.
+Before hashing, it minifies CSS (and JS, when the optional ``rjsmin`` is
+installed), so each hashed name is derived from the content actually served.
+After every file is copied under a content-hashed name, it does two more things:
+
+* writes ``.gz`` and, when the optional ``brotli`` is installed, ``.br``
+  siblings of compressible files for ``users.static_serve`` to negotiate;
+* re-encodes images matching ``STATIC_RESPONSIVE_IMAGES`` at each width of
+  ``STATIC_RESPONSIVE_WIDTHS``. Each rendition is recorded in the manifest as
+  ``<name>-<width>w.<ext>``; templates use ``{% responsive_static %}``.
+
+Hashed names change whenever content changes, so the files can be served
+with far-future ``Cache-Control``.
+"""
+import fnmatch
+import gzip
+import re
+from io import BytesIO
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+from django.core.files.base import ContentFile
+from PIL import Image
+
+try:
+    import brotli
+except ImportError:  # optional
+    brotli = None
+
+try:
+    import rcssmin
+except ImportError:  # optional, a conservative built-in minifier is used instead
+    rcssmin = None
+
+try:
+    import rjsmin
+except ImportError:  # optional, JS is left as is without it
+    rjsmin = None
+
+COMPRESSIBLE_EXTENSIONS = ('.css', '.js', '.svg', '.txt', '.json', '.xml', '.html')
+MIN_COMPRESS_SIZE = 256
+
+
+def minify_css(css):
+    if rcssmin is not None:
+        return rcssmin.cssmin(css)
+    css = re.sub(r'/\*.*?\*/', '', css, flags=re.DOTALL)
+    css = re.sub(r'\s+', ' ', css)
+    css = re.sub(r'\s*([{};,>])\s*', r'\1', css)
+    # Only inside declaration blocks (the next brace closes one): in selectors
+    # the space in `.a :hover` is a descendant combinator.
+    css = re.sub(r'\s*:\s*(?=[^{}]*\})', ':', css)
+    css = css.replace(';}', '}')
+    return css.strip()
+
+
+def minify_js(js):
+    return rjsmin.jsmin(js) if rjsmin is not None else js
+
+
+def responsive_name(name, width):
+    stem, dot, extension = name.rpartition('.')
+    return f'{stem}-{width}w{dot}{extension}'
+
+
+class OptimizedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    # Without a manifest (collectstatic has not run, e.g. in tests) fall back
+    # to the plain names instead of failing to render pages.
+    manifest_strict = False
+
+    def stored_name(self, name):
+        try:
+            return super().stored_name(name)
+        except ValueError:
+            return name
+
+    def post_process(self, paths, dry_run=False, **options):
+        if not dry_run:
+            paths = dict(paths)
+            for name, (storage, path) in paths.items():
+                if name.endswith(('.css', '.js')):
+                    paths[name] = self.minify(name, storage, path)
+        yield from super().post_process(paths, dry_run, **options)
+        if dry_run:
+            return
+
+        for name, hashed_name in list(self.hashed_files.items()):
+            if self.matches_responsive(name):
+                for width, rendition in self.make_renditions(name, hashed_name):
+                    self.hashed_files[responsive_name(self.clean_name(name), width)] = rendition
+                    yield responsive_name(name, width), rendition, True
+
+        for hashed_name in list(self.hashed_files.values()):
+            if hashed_name.endswith(COMPRESSIBLE_EXTENSIONS):
+                self.precompress(hashed_name)
+        self.save_manifest()
+
+    def minify(self, name, storage, path):
+        """Minify the collected copy of ``name``; returns the ``(storage, path)`` to hash it from."""
+        with storage.open(path) as source:
+            original = source.read().decode('utf-8')
+        minified = minify_css(original) if name.endswith('.css') else minify_js(original)
+        if minified == original:
+            return storage, path
+        self._replace(name, minified.encode('utf-8'))
+        return self, name
+
+    def precompress(self, hashed_name):
+        with self.open(hashed_name) as source:
+            content = source.read()
+        if len(content) < MIN_COMPRESS_SIZE:
+            return
+        self._replace(f'{hashed_name}.gz', gzip.compress(content, compresslevel=9, mtime=0))
+        if brotli is not None:
+            self._replace(f'{hashed_name}.br', brotli.compress(content, quality=11))
+
+    def matches_responsive(self, name):
+        patterns = getattr(settings, 'STATIC_RESPONSIVE_IMAGES', [])
+        return any(fnmatch.fnmatch(name, pattern) for pattern in patterns)
+
+    def make_renditions(self, name, hashed_name):
+        with self.open(hashed_name) as source:
+            image = Image.open(source)
+            image.load()
+        if image.mode != 'RGB':
+            image = image.convert('RGB')
+        for width in getattr(settings, 'STATIC_RESPONSIVE_WIDTHS', []):
+            if width >= image.width:
+                continue
+            resized = image.resize((width, round(image.height * width / image.width)), Image.LANCZOS)
+            output = BytesIO()
+            resized.save(output, format='JPEG', quality=80, optimize=True, progressive=True)
+            rendition = responsive_name(hashed_name, width)
+            self._replace(rendition, output.getvalue())
+            yield width, rendition
+
+    def _replace(self, name, content):
+        if self.exists(name):
+            self.delete(name)
+        self._save(name, ContentFile(content))
@@ -1,5 +1,10 @@
 from django import template
+from django.conf import settings
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.templatetags.static import static
+from django.utils.http import urlencode
 from users.models import PhotographerProfile, ClientProfile
+from users.storage import responsive_name
 
 register = template.Library()
 
@@ -25,3 +30,40 @@ def get_avatar_url(user):
         
     name = user.get_full_name() or user.username
     return f"https://ui-avatars.com/api/?name={name}&background=e0bbd8&color=fff"
+
+@register.simple_tag
+def responsive_static(path, width):
+    """URL of the ``width``-pixel rendition of a static image, or of the original
+    when collectstatic has not produced one (e.g. with DEBUG on)."""
+    rendition = responsive_name(path, width)
+    if not settings.DEBUG and rendition in getattr(staticfiles_storage, 'hashed_files', {}):
+        return static(rendition)
+    return static(path)
+
+
+@register.simple_tag(takes_context=True)
+def preserved_query(context, *exclude):
+    """Current non-empty GET parameters except ``page`` (and ``exclude``) as
+    ``&key=value...``, ready to append after ``?page=N``.
+
+    Use it once per template with ``as`` and reuse the result in every link:
+    ``{% preserved_query as qs %}<a href="?page={{ n }}{{ qs }}">``.
+    """
+    request = context.get('request')
+    if request is None:
+        return ''
+    skip = {'page', *exclude}
+    params = [
+        (key, [value for value in values if value])
+        for key, values in request.GET.lists()
+        if key not in skip
+    ]
+    encoded = urlencode([(key, values) for key, values in params if values], doseq=True)
+    return f'&{encoded}' if encoded else ''
+
+
+@register.simple_tag
+def page_window(page, on_each_side=2, on_ends=1):
+    """Page numbers to link: first and last ``on_ends``, current ± ``on_each_side``,
+    with ``Paginator.ELLIPSIS`` in the gaps. Bounded no matter how many pages there are."""
+    return page.paginator.get_elided_page_range(page.number, on_each_side=on_each_side, on_ends=on_ends)
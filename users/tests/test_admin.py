@@ -0,0 +1,102 @@
+import shutil
+import tempfile
+from io import BytesIO, StringIO
+from pathlib import Path
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from PIL import Image
+
+from users import pagination
+from users.models import Photo, PhotoLike, PhotographerProfile
+from users.tests.utils import media_file
+from users.thumbnails import thumbnail_name
+
+
+class AdminChangelistTests(TestCase):
+
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        override = override_settings(MEDIA_ROOT=media_root)
+        override.enable()
+        self.addCleanup(override.disable)
+        cache.clear()
+        self.media_root = Path(media_root)
+
+        self.admin = User.objects.create_superuser('admin', 'admin@example.com', 'pass')
+        self.client.force_login(self.admin)
+
+    def add_photos(self, photographers, per_photographer):
+        for i in range(photographers):
+            user = User.objects.create_user(f'photographer{PhotographerProfile.objects.count()}')
+            profile = PhotographerProfile.objects.create(user=user, short_intro='Свадьбы', bio='Снимаю свадьбы')
+            Photo.objects.bulk_create([
+                Photo(photographer=profile, image=media_file(f'photographs/{user.username}_{j}.jpg'))
+                for j in range(per_photographer)
+            ])
+
+    def changelist_queries(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('admin:users_photo_changelist'))
+        self.assertEqual(response.status_code, 200)
+        return len(queries)
+
+    def test_photo_changelist_queries_do_not_grow_with_rows(self):
+        self.add_photos(2, 2)
+        few = self.changelist_queries()
+        self.add_photos(10, 4)
+        self.assertEqual(self.changelist_queries(), few)
+
+    def test_changelist_shows_thumbnails_it_does_not_make(self):
+        self.add_photos(1, 2)
+        url = reverse('admin:users_photo_changelist')
+        response = self.client.get(url)
+        self.assertContains(response, 'Превью ещё не готово', count=2)
+        self.assertFalse((self.media_root / 'thumbs').exists())
+
+        call_command('make_thumbnails', stdout=StringIO())
+        self.assertEqual(len(list((self.media_root / 'thumbs' / '120x120' / 'photographs').iterdir())), 2)
+        response = self.client.get(url)
+        self.assertNotContains(response, 'Превью ещё не готово')
+        self.assertContains(response, '/thumbs/120x120/photographs/', count=2)
+
+    def test_uploads_make_the_thumbnail(self):
+        user = User.objects.create_user('uploader', password='pass')
+        PhotographerProfile.objects.create(user=user)
+        self.client.force_login(user)
+        image = BytesIO()
+        Image.new('RGB', (300, 200), (224, 187, 216)).save(image, format='JPEG')
+        upload = SimpleUploadedFile('a.jpg', image.getvalue(), content_type='image/jpeg')
+        self.client.post(reverse('dashboard'), {'upload_photo': '1', 'category': 'wedding', 'image': upload})
+        photo = Photo.objects.get()
+        self.assertTrue((self.media_root / thumbnail_name(photo.image.name, (120, 120))).is_file())
+
+    def test_bulk_actions_are_set_based(self):
+        self.add_photos(3, 5)
+        PhotoLike.objects.create(user=self.admin, photo=Photo.objects.first())
+        url = reverse('admin:users_photo_changelist')
+        pks = list(Photo.objects.values_list('pk', flat=True))
+
+        self.client.post(url, {'action': 'set_category_fashion', '_selected_action': pks[:10]})
+        self.assertEqual(Photo.objects.filter(category='fashion').count(), 10)
+
+        self.client.post(url, {'action': 'delete_quickly', '_selected_action': pks})
+        self.assertFalse(Photo.objects.exists())
+        self.assertFalse(PhotoLike.objects.exists())
+
+    def test_large_unfiltered_tables_use_the_estimate(self):
+        self.add_photos(2, 3)
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+        with mock.patch.object(pagination, 'ESTIMATE_THRESHOLD', 1):
+            self.assertEqual(pagination.estimated_count(Photo.objects.all()), 6)
+            self.assertIsNone(pagination.estimated_count(Photo.objects.filter(category='wedding')))
+        self.assertIsNone(pagination.estimated_count(Photo.objects.all()))
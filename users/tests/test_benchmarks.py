@@ -0,0 +1,323 @@
+"""
+Per-view benchmark suite.
+
+Every route from ``myproject/urls.py`` and ``users/urls.py`` is requested
+through the Django test client against a seeded dataset, once per viewer role
+(anonymous, client, photographer, staff). For each route/role pair we record
+the SQL query count, p50/p95 latency and peak Python memory and compare them
+with the budgets committed in ``budgets.json`` next to this file. Query
+counts are deterministic and always checked; latency and memory depend on
+the machine and its load, so their budgets are only checked on request.
+
+Run it with::
+
+    python manage.py test users.tests.test_benchmarks
+
+Environment variables:
+
+* ``BENCH_ITERATIONS`` - timed requests per route/role (default 10).
+* ``BENCH_REPORT=1`` - print a table with the measured numbers.
+* ``BENCH_STRICT=1`` - check the latency and memory budgets too (on a quiet
+  machine, e.g. before and after a performance change).
+* ``BENCH_UPDATE_BUDGETS=1`` - rewrite ``budgets.json`` from the measured
+  numbers instead of checking them (review the diff before committing).
+"""
+import json
+import math
+import os
+import shutil
+import tempfile
+import time
+import tracemalloc
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from django.contrib.auth.models import User
+from django.contrib.auth.tokens import default_token_generator
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import URLPattern, URLResolver, reverse
+from django.utils.encoding import force_bytes
+from django.utils.http import urlsafe_base64_encode
+
+from users import urls as users_urls
+from users.models import (
+    BookingRequest, ClientProfile, Favorite, News, Photo, PhotoLike,
+    PhotographerProfile, SupportRequest, SPECIALIZATION_CHOICES,
+)
+from users.tests.utils import media_file
+from myproject import urls as project_urls
+
+BUDGETS_PATH = Path(__file__).resolve().parent / 'budgets.json'
+
+ITERATIONS = int(os.environ.get('BENCH_ITERATIONS', 10))
+# Metrics checked without BENCH_STRICT.
+ALWAYS_CHECKED = {'queries'}
+
+# Latency on a shared CI box is noisy, so generated budgets get generous
+# headroom. Query counts are deterministic and are budgeted exactly.
+LATENCY_HEADROOM = 4
+LATENCY_FLOOR_MS = 50
+MEMORY_HEADROOM = 1.5
+
+PHOTOGRAPHERS = 30
+PHOTOS_PER_PHOTOGRAPHER = 6
+NEWS_ITEMS = 12
+
+
+@dataclass
+class Route:
+    name: str
+    roles: tuple = ('anonymous', 'client')
+    method: str = 'get'
+    kwargs: callable = None
+    data: dict = field(default_factory=dict)
+
+    def url(self, seed):
+        return reverse(self.name, kwargs=self.kwargs(seed) if self.kwargs else None)
+
+
+ROUTES = [
+    Route('home'),
+    Route('admin:index', roles=('anonymous', 'staff')),
+    Route('register'),
+    Route('specialists'),
+    Route('city_autocomplete', roles=('anonymous',), data={'q': 'мо'}),
+    Route('price_histogram', roles=('anonymous',), data={'specialization': 'wedding', 'city': 'Москва'}),
+    Route('photographer_detail', roles=('anonymous', 'client', 'photographer'),
+          kwargs=lambda seed: {'pk': seed.photographer.pk}),
+    Route('toggle_favorite', roles=('client',), method='post',
+          kwargs=lambda seed: {'pk': seed.photographer.pk}),
+    Route('news'),
+    Route('news_detail', kwargs=lambda seed: {'pk': seed.news.pk}),
+    Route('news_feed_rss', roles=('anonymous',)),
+    Route('news_feed_atom', roles=('anonymous',)),
+    Route('toggle_photo_like', roles=('client',), method='post',
+          kwargs=lambda seed: {'pk': seed.photo.pk}),
+    Route('gallery'),
+    Route('viewer_state', data={'photos': '1,2,3', 'photographers': '1'}),
+    Route('dashboard', roles=('anonymous', 'client', 'photographer', 'staff')),
+    Route('booking_inbox_received', roles=('photographer',)),
+    Route('booking_inbox_sent', roles=('client',)),
+    Route('booking_bulk_received', roles=('photographer',), method='post',
+          data={'action': 'start', 'status': 'new'}),
+    Route('booking_bulk_sent', roles=('client',), method='post',
+          data={'action': 'archive', 'status': 'completed'}),
+    Route('delete_profile_image', roles=('client',), method='post'),
+    Route('photo_upload_start', roles=('photographer',), method='post',
+          data={'name': 'photo.jpg', 'content_type': 'image/jpeg', 'size': 1024}),
+    Route('photo_upload_complete', roles=('photographer',), method='post',
+          data={'token': 'expired', 'category': 'wedding'}),
+    Route('chunked_upload_create', roles=('photographer',), method='post',
+          data={'name': 'photo.jpg', 'size': 0, 'category': 'wedding'}),
+    Route('chunked_upload', roles=('photographer',),
+          kwargs=lambda seed: {'pk': '00000000-0000-0000-0000-000000000000'}),
+    Route('login'),
+    Route('logout', method='post'),
+    Route('password_change', roles=('client',)),
+    Route('password_change_done', roles=('client',)),
+    Route('password_reset', roles=('anonymous',)),
+    Route('password_reset_done', roles=('anonymous',)),
+    Route('password_reset_confirm', roles=('anonymous',),
+          kwargs=lambda seed: {
+              'uidb64': urlsafe_base64_encode(force_bytes(seed.client_user.pk)),
+              'token': default_token_generator.make_token(seed.client_user),
+          }),
+    Route('password_reset_complete', roles=('anonymous',)),
+]
+
+
+def route_names(patterns, namespace=None):
+    """Yield the names of every named route below ``patterns``."""
+    for pattern in patterns:
+        if isinstance(pattern, URLResolver):
+            if pattern.namespace:
+                # Namespaced apps (the admin) are covered through their index.
+                yield f'{pattern.namespace}:index'
+            else:
+                yield from route_names(pattern.url_patterns, namespace)
+        elif isinstance(pattern, URLPattern) and pattern.name:
+            yield pattern.name
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    index = max(0, math.ceil(pct / 100 * len(ordered)) - 1)
+    return ordered[index]
+
+
+class Seed:
+    """A small but realistic dataset: enough rows to expose per-row queries."""
+
+    def __init__(self):
+        categories = [code for code, _ in SPECIALIZATION_CHOICES]
+        cities = ['Москва', 'Санкт-Петербург', 'Казань', 'Новосибирск']
+
+        self.photographers = []
+        for i in range(PHOTOGRAPHERS):
+            user = User.objects.create_user(f'photographer{i}', f'p{i}@example.com', 'pass',
+                                            first_name='Фотограф', last_name=str(i))
+            profile = PhotographerProfile.objects.create(
+                user=user,
+                short_intro='Свадебный фотограф',
+                bio='Снимаю свадьбы и портреты.',
+                city=cities[i % len(cities)],
+                specialization=categories[i % len(categories)],
+                price=1000 + i * 100,
+                profile_image=media_file(f'profile_images/bench_{i}.jpg'),
+            )
+            Photo.objects.bulk_create([
+                Photo(photographer=profile, image=media_file(f'photographs/bench_{i}_{j}.jpg'),
+                      category=categories[j % len(categories)])
+                for j in range(PHOTOS_PER_PHOTOGRAPHER)
+            ])
+            self.photographers.append(profile)
+        self.photographer = self.photographers[0]
+        self.photo = self.photographer.photos.first()
+
+        self.client_user = User.objects.create_user('client', 'client@example.com', 'pass')
+        ClientProfile.objects.create(user=self.client_user)
+        Favorite.objects.bulk_create([
+            Favorite(user=self.client_user, photographer=p) for p in self.photographers[1:6]
+        ])
+        PhotoLike.objects.bulk_create([
+            PhotoLike(user=self.client_user, photo=photo)
+            for photo in Photo.objects.exclude(photographer=self.photographer)[:10]
+        ])
+        for i, status in enumerate(['new', 'in_progress', 'completed', 'cancelled'] * 3):
+            BookingRequest.objects.create(
+                client=self.client_user, photographer=self.photographers[i % 3],
+                status=status, message='Свадьба летом', contact_phone='+7 (999) 999-99-99',
+            )
+        SupportRequest.objects.create(user=self.client_user, message='Не загружается фото')
+
+        self.staff_user = User.objects.create_superuser('admin', 'admin@example.com', 'pass')
+
+        News.objects.bulk_create([
+            News(title=f'Новость {i}', content='Текст новости. ' * 50,
+                 image=media_file(f'news_images/bench_{i}.jpg'))
+            for i in range(NEWS_ITEMS)
+        ])
+        self.news = News.objects.first()
+
+    def user_for(self, role):
+        return {
+            'anonymous': None,
+            'client': self.client_user,
+            'photographer': self.photographer.user,
+            'staff': self.staff_user,
+        }[role]
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class ViewBenchmarkTests(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        media_root = tempfile.mkdtemp()
+        cls.addClassCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        media_override = override_settings(MEDIA_ROOT=media_root)
+        media_override.enable()
+        cls.addClassCleanup(media_override.disable)
+        super().setUpClass()
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.seed = Seed()
+        cls.budgets = json.loads(BUDGETS_PATH.read_text(encoding='utf-8'))
+
+    def request(self, route, role):
+        client = Client()
+        user = self.seed.user_for(role)
+        if user is not None:
+            client.force_login(user)
+        send = getattr(client, route.method)
+        return client, send, route.url(self.seed)
+
+    def measure(self, route, role):
+        # One untimed request first, so template compilation and other
+        # first-hit work does not land in the p95.
+        client, send, url = self.request(route, role)
+        send(url, route.data)
+
+        latencies = []
+        queries = 0
+        for _ in range(ITERATIONS):
+            client, send, url = self.request(route, role)
+            with CaptureQueriesContext(connection) as ctx:
+                start = time.perf_counter()
+                response = send(url, route.data)
+                latencies.append((time.perf_counter() - start) * 1000)
+            self.assertLess(response.status_code, 500, f'{route.name} [{role}] failed')
+            queries = max(queries, len(ctx.captured_queries))
+
+        client, send, url = self.request(route, role)
+        tracemalloc.start()
+        try:
+            send(url, route.data)
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+
+        return {
+            'queries': queries,
+            'p50_ms': round(percentile(latencies, 50), 2),
+            'p95_ms': round(percentile(latencies, 95), 2),
+            'peak_kb': round(peak / 1024, 1),
+        }
+
+    def test_every_route_is_benchmarked(self):
+        names = set(route_names(project_urls.urlpatterns)) | set(route_names(users_urls.urlpatterns))
+        covered = {route.name for route in ROUTES}
+        self.assertEqual(names - covered, set(), 'Routes without a benchmark entry')
+
+    def test_every_benchmark_has_a_budget(self):
+        if os.environ.get('BENCH_UPDATE_BUDGETS'):
+            self.skipTest('Budgets are being regenerated')
+        for route in ROUTES:
+            for role in route.roles:
+                self.assertIn(role, self.budgets.get(route.name, {}), f'No budget for {route.name} [{role}]')
+
+    def test_views_stay_within_budget(self):
+        results = {}
+        for route in ROUTES:
+            for role in route.roles:
+                results.setdefault(route.name, {})[role] = self.measure(route, role)
+
+        if os.environ.get('BENCH_REPORT'):
+            print()
+            print(f"{'route':<28}{'role':<14}{'queries':>8}{'p50 ms':>10}{'p95 ms':>10}{'peak KB':>10}")
+            for name, roles in results.items():
+                for role, m in roles.items():
+                    print(f"{name:<28}{role:<14}{m['queries']:>8}{m['p50_ms']:>10}{m['p95_ms']:>10}{m['peak_kb']:>10}")
+
+        if os.environ.get('BENCH_UPDATE_BUDGETS'):
+            budgets = {
+                name: {
+                    role: {
+                        'queries': m['queries'],
+                        'p50_ms': max(LATENCY_FLOOR_MS, math.ceil(m['p50_ms'] * LATENCY_HEADROOM)),
+                        'p95_ms': max(LATENCY_FLOOR_MS * 2, math.ceil(m['p95_ms'] * LATENCY_HEADROOM)),
+                        'peak_kb': math.ceil(m['peak_kb'] * MEMORY_HEADROOM),
+                    }
+                    for role, m in roles.items()
+                }
+                for name, roles in results.items()
+            }
+            BUDGETS_PATH.write_text(json.dumps(budgets, indent=4, ensure_ascii=False) + '\n', encoding='utf-8')
+            return
+
+        for name, roles in results.items():
+            for role, measured in roles.items():
+                budget = self.budgets.get(name, {}).get(role)
+                if budget is None:
+                    continue
+                for metric, limit in budget.items():
+                    if metric not in ALWAYS_CHECKED and not os.environ.get('BENCH_STRICT'):
+                        continue
+                    with self.subTest(route=name, role=role, metric=metric):
+                        self.assertLessEqual(
+                            measured[metric], limit,
+                            f'{name} [{role}] {metric}={measured[metric]} exceeds budget {limit}',
+                        )
@@ -0,0 +1,139 @@
+from django.contrib.auth.models import User
+from django.test import TestCase
+from django.urls import reverse
+
+from users import bookings
+from users.models import BookingCounter, BookingRequest, PhotographerProfile
+
+
+class BookingCounterTests(TestCase):
+
+    def setUp(self):
+        self.client_user = User.objects.create_user('client', 'client@example.com', 'pass')
+        self.photographer_user = User.objects.create_user('photographer', 'photographer@example.com', 'pass')
+        self.photographer = PhotographerProfile.objects.create(
+            user=self.photographer_user, short_intro='Свадьбы', bio='Снимаю свадьбы',
+        )
+
+    def book(self, status='new'):
+        return BookingRequest.objects.create(
+            client=self.client_user, photographer=self.photographer, status=status,
+            message='Свадьба летом', contact_phone='+7 (999) 999-99-99',
+        )
+
+    def counts(self):
+        return (BookingCounter.for_user(self.photographer_user, 'received'),
+                BookingCounter.for_user(self.client_user, 'sent'))
+
+    def assertCounts(self, **expected):
+        full = {'new': 0, 'in_progress': 0, 'completed': 0, 'cancelled': 0, **expected}
+        received, sent = self.counts()
+        self.assertEqual(received, full)
+        self.assertEqual(sent, full)
+
+    def test_counters_follow_status_changes(self):
+        first = self.book()
+        self.book()
+        self.assertCounts(new=2)
+
+        booking = BookingRequest.objects.get(pk=first.pk)
+        booking.status = 'in_progress'
+        booking.save()
+        booking.save()
+        self.assertCounts(new=1, in_progress=1)
+
+        booking.delete()
+        self.assertCounts(new=1)
+
+    def test_hidden_bookings_leave_only_that_inbox(self):
+        booking = self.book('completed')
+        booking.is_deleted_by_photographer = True
+        booking.save()
+        received, sent = self.counts()
+        self.assertEqual(received['completed'], 0)
+        self.assertEqual(sent['completed'], 1)
+
+        self.client_user.delete()
+        self.assertEqual(BookingCounter.for_user(self.photographer_user, 'received')['completed'], 0)
+
+    def test_rebuild_matches_maintained_counters(self):
+        for status in ['new', 'new', 'completed', 'cancelled']:
+            self.book(status)
+        maintained = self.counts()
+        BookingCounter.objects.update(count=0)
+        BookingCounter.rebuild()
+        self.assertEqual(self.counts(), maintained)
+
+    def test_bulk_transitions_follow_the_state_machine(self):
+        for status in ['new', 'new', 'in_progress', 'completed', 'cancelled']:
+            self.book(status)
+        received = bookings.owned(self.photographer_user, 'received')
+
+        # Set-based: the query count depends on the (user, status) groups touched, not on the rows.
+        with self.assertNumQueries(15):
+            self.assertEqual(bookings.perform('complete', 'received', received), 3)
+        self.assertCounts(completed=4, cancelled=1)
+        self.assertEqual(bookings.perform('start', 'received', received), 0)
+        with self.assertRaises(ValueError):
+            bookings.perform('complete', 'sent', bookings.owned(self.client_user, 'sent'))
+
+        self.assertEqual(bookings.perform('archive', 'received', received), 5)
+        received_counts, sent_counts = self.counts()
+        self.assertEqual(sum(received_counts.values()), 0)
+        self.assertEqual(sent_counts['completed'], 4)
+
+        # Archived by both sides: gone.
+        self.assertEqual(bookings.perform('archive', 'sent', bookings.owned(self.client_user, 'sent')), 5)
+        self.assertFalse(BookingRequest.objects.exists())
+        self.assertCounts()
+
+    def test_bulk_endpoint(self):
+        for status in ['new', 'in_progress', 'in_progress']:
+            self.book(status)
+        self.client.force_login(self.photographer_user)
+        url = reverse('booking_bulk_received')
+        response = self.client.post(url, {'action': 'complete', 'status': 'in_progress'},
+                                    HTTP_X_REQUESTED_WITH='XMLHttpRequest')
+        self.assertEqual(response.json()['changed'], 2)
+        self.assertEqual(response.json()['counts']['completed'], 2)
+        self.assertEqual(self.client.post(url, {'action': 'complete'}).status_code, 400)
+        self.assertEqual(self.client.post(url, {'action': 'purge', 'status': 'new'}).status_code, 400)
+
+        self.client.force_login(self.client_user)
+        self.client.post(reverse('booking_bulk_received'), {'action': 'cancel', 'status': 'new'})
+        self.assertEqual(BookingRequest.objects.filter(status='new').count(), 1)
+
+
+class BookingInboxTests(TestCase):
+
+    def setUp(self):
+        self.client_user = User.objects.create_user('client', 'client@example.com', 'pass')
+        self.photographer_user = User.objects.create_user('photographer', 'photographer@example.com', 'pass')
+        photographer = PhotographerProfile.objects.create(
+            user=self.photographer_user, short_intro='Свадьбы', bio='Снимаю свадьбы',
+        )
+        for i in range(25):
+            BookingRequest.objects.create(
+                client=self.client_user, photographer=photographer, status='completed' if i % 5 == 0 else 'new',
+                message=f'Заявка {i}', contact_phone='+7 (999) 999-99-99',
+            )
+
+    def test_keyset_pages_cover_the_inbox_once(self):
+        self.client.force_login(self.photographer_user)
+        url = reverse('booking_inbox_received') + '?status=new&limit=7'
+        seen = []
+        while url:
+            data = self.client.get(url).json()
+            seen += [row['id'] for row in data['results']]
+            url = data['next']
+        expected = list(BookingRequest.objects.filter(status='new').order_by('-created_at', '-pk').values_list('pk', flat=True))
+        self.assertEqual(seen, expected)
+        self.assertEqual(data['counts']['new'], 20)
+
+    def test_inbox_access_and_validation(self):
+        self.client.force_login(self.client_user)
+        self.assertEqual(self.client.get(reverse('booking_inbox_received')).status_code, 403)
+        self.assertEqual(self.client.get(reverse('booking_inbox_sent'), {'status': 'lost'}).status_code, 400)
+        data = self.client.get(reverse('booking_inbox_sent'), {'status': 'completed', 'html': 1}).json()
+        self.assertEqual(len(data['results']), 5)
+        self.assertIn('Кому: photographer', data['html'])
@@ -0,0 +1,130 @@
+import shutil
+import tempfile
+from datetime import timedelta
+from io import BytesIO
+from pathlib import Path
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from PIL import Image
+
+from users import chunked_uploads
+from users.models import ChunkedUpload, Photo, PhotographerProfile
+
+CHUNK = 1024
+
+
+def jpeg(width=600):
+    output = BytesIO()
+    # Noise keeps the JPEG larger than a few chunks.
+    Image.effect_noise((width, 400), 64).convert('RGB').save(output, format='JPEG', quality=95)
+    return output.getvalue()
+
+
+class ChunkedUploadTests(TestCase):
+
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        override = override_settings(
+            MEDIA_ROOT=media_root, CHUNKED_UPLOAD_DIR=Path(media_root) / 'tmp', CHUNKED_UPLOAD_CHUNK_SIZE=CHUNK,
+        )
+        override.enable()
+        self.addCleanup(override.disable)
+        cache.clear()
+
+        self.user = User.objects.create_user('photographer')
+        self.profile = PhotographerProfile.objects.create(user=self.user)
+        self.client.force_login(self.user)
+
+    def create(self, content, name='IMG_0001.jpg'):
+        response = self.client.post(reverse('chunked_upload_create'), {
+            'name': name, 'size': len(content), 'category': 'portrait',
+        })
+        self.assertEqual(response.status_code, 201, response.content)
+        return response.json()
+
+    def put(self, upload, content, index, offset=None):
+        offset = index * CHUNK if offset is None else offset
+        return self.client.put(upload['url'], content[offset:offset + CHUNK],
+                               content_type='application/offset+octet-stream', HTTP_UPLOAD_OFFSET=str(offset))
+
+    def test_chunks_in_any_order_resume_and_finish(self):
+        content = jpeg()
+        upload = self.create(content)
+        self.assertEqual(upload['chunk_count'], -(-len(content) // CHUNK))
+
+        # A first session sends every other chunk, backwards, then "disconnects".
+        for index in reversed(range(0, upload['chunk_count'], 2)):
+            self.assertEqual(self.put(upload, content, index).status_code, 200)
+        self.assertEqual(self.client.post(upload['url']).status_code, 409)
+
+        state = self.client.get(upload['url']).json()
+        missing = sorted(set(range(upload['chunk_count'])) - set(state['received']))
+        self.assertEqual(missing, list(range(1, upload['chunk_count'], 2)))
+        for index in missing:
+            self.put(upload, content, index)
+        self.put(upload, content, 0)  # a retried chunk is harmless
+
+        response = self.client.post(upload['url'])
+        self.assertEqual(response.status_code, 200, response.content)
+        photo = Photo.objects.get(pk=response.json()['photo']['id'])
+        self.assertEqual(photo.category, 'portrait')
+        with photo.image.open('rb') as stored:
+            self.assertEqual(Image.open(stored).size, (600, 400))
+        self.assertFalse(chunked_uploads.part_path(ChunkedUpload.objects.get()).exists())
+        # Finishing again (a lost response) returns the same photo.
+        self.assertEqual(self.client.post(upload['url']).json()['photo']['id'], photo.pk)
+
+    def test_offset_and_length_are_checked(self):
+        content = jpeg()
+        upload = self.create(content)
+        self.assertEqual(self.put(upload, content, 0, offset=10).status_code, 409)
+        self.assertEqual(self.put(upload, content, 0, offset=len(content) + CHUNK).status_code, 409)
+        short = self.client.put(upload['url'], content[:10], content_type='application/offset+octet-stream',
+                                HTTP_UPLOAD_OFFSET='0')
+        self.assertEqual(short.status_code, 409)
+        self.assertEqual(self.client.get(upload['url']).json()['received'], [])
+
+    def test_non_image_is_refused(self):
+        content = b'x' * (CHUNK + 10)
+        upload = self.create(content, name='notes.jpg')
+        self.put(upload, content, 0)
+        self.put(upload, content, 1)
+        self.assertEqual(self.client.post(upload['url']).status_code, 400)
+        self.assertFalse(ChunkedUpload.objects.exists())
+        self.assertFalse(Photo.objects.exists())
+
+    def test_failed_finish_can_be_retried(self):
+        content = jpeg()
+        upload = self.create(content)
+        for index in range(upload['chunk_count']):
+            self.put(upload, content, index)
+
+        with mock.patch('users.models.Photo.save', side_effect=OSError('disk full')):
+            with self.assertRaises(OSError):
+                self.client.post(upload['url'])
+        self.assertEqual(ChunkedUpload.objects.get().status, 'uploading')
+        self.assertFalse(Photo.objects.exists())
+
+        response = self.client.post(upload['url'])
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(ChunkedUpload.objects.get().photo_id, response.json()['photo']['id'])
+
+    def test_uploads_are_private(self):
+        upload = self.create(jpeg())
+        other = User.objects.create_user('other')
+        PhotographerProfile.objects.create(user=other)
+        self.client.force_login(other)
+        self.assertEqual(self.client.get(upload['url']).status_code, 404)
+
+    def test_cleanup_removes_abandoned_uploads(self):
+        upload = self.create(jpeg())
+        ChunkedUpload.objects.update(created_at=timezone.now() - timedelta(days=2))
+        path = chunked_uploads.part_path(ChunkedUpload.objects.get(pk=upload['id']))
+        self.assertEqual(chunked_uploads.cleanup()['expired'], 1)
+        self.assertFalse(path.exists())
@@ -0,0 +1,80 @@
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import SimpleTestCase, TestCase
+from django.urls import reverse
+
+from users import cities
+from users.models import City, PhotographerProfile
+
+
+class TrieTests(SimpleTestCase):
+
+    def test_nodes_keep_the_first_items_inserted(self):
+        trie = cities.Trie(limit=2)
+        for key in ['самара', 'сочи', 'саратов', 'москва']:
+            trie.insert(key, key.title())
+        self.assertEqual(trie.complete('са'), ['Самара', 'Саратов'])
+        self.assertEqual(trie.complete('с'), ['Самара', 'Сочи'])
+        self.assertEqual(trie.complete(''), ['Самара', 'Сочи'])
+        self.assertEqual(trie.complete('саратовская'), [])
+
+    def test_normalize(self):
+        self.assertEqual(cities.normalize('  МОСКВА '), 'москва')
+        self.assertEqual(cities.normalize('Орёл'), cities.normalize('орел'))
+        self.assertEqual(cities.normalize('Нижний   Новгород'), 'нижний новгород')
+
+
+class CityTests(TestCase):
+
+    def setUp(self):
+        cities.invalidate()
+        self.addCleanup(cities.invalidate)
+        self.moscow = [self.photographer(f'moscow{i}', name) for i, name in enumerate(['Москва', 'москва ', 'МОСКВА'])]
+        self.spb = self.photographer('spb', 'Санкт-Петербург')
+        self.samara = self.photographer('samara', 'Самара')
+        self.nowhere = self.photographer('nowhere', '')
+
+    def photographer(self, username, city):
+        return PhotographerProfile.objects.create(user=User.objects.create_user(username), city=city)
+
+    def found(self, city):
+        response = self.client.get(reverse('specialists'), {'city': city, 'sort': 'new'})
+        return {p.pk for p in response.context['photographers']}
+
+    def test_profiles_point_at_one_city_per_spelling(self):
+        self.assertEqual(City.objects.count(), 3)
+        for profile in self.moscow:
+            profile.refresh_from_db()
+            self.assertEqual((profile.city, profile.city_ref.name), ('Москва', 'Москва'))
+        self.assertIsNone(self.nowhere.city_ref)
+
+        self.spb.city = 'самара'
+        self.spb.save()
+        self.assertEqual(self.spb.city_ref, self.samara.city_ref)
+
+    def test_catalog_filter_is_case_insensitive_for_cyrillic(self):
+        self.assertEqual(self.found('москва'), {p.pk for p in self.moscow})
+        self.assertEqual(self.found('С'), {self.spb.pk, self.samara.pk})
+        self.assertEqual(self.found('Санкт'), {self.spb.pk})
+        self.assertEqual(self.found('Казань'), set())
+
+    def test_autocomplete(self):
+        url = reverse('city_autocomplete')
+        self.assertEqual(self.client.get(url, {'q': 'с'}).json(), {'cities': ['Самара', 'Санкт-Петербург']})
+        # Most photographers first.
+        self.photographer('moscow-region', 'Московский')
+        self.assertEqual(self.client.get(url, {'q': 'МО'}).json(), {'cities': ['Москва', 'Московский']})
+        with self.assertNumQueries(0):
+            response = self.client.get(url, {'q': 'мос'})
+        self.assertIn('public', response['Cache-Control'])
+        self.assertEqual(self.client.get(url).json(), {'cities': []})
+
+    def test_prefix_lookup_uses_the_key_index(self):
+        if connection.vendor != 'sqlite':
+            self.skipTest("EXPLAIN QUERY PLAN is SQLite's")
+        queryset = cities.filter_by_city(PhotographerProfile.objects.all(), 'санкт')
+        sql, params = queryset.query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+            plan = ' / '.join(row[-1] for row in cursor.fetchall())
+        self.assertRegex(plan, r'SEARCH \w+ USING (COVERING )?INDEX \w+ \(key>\? AND key<\?\)')
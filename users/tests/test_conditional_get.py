@@ -0,0 +1,103 @@
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import transaction
+from django.test import TestCase, TransactionTestCase
+from django.urls import reverse
+
+from users import gallery
+from users.models import Photo, PhotoLike, PhotographerProfile
+
+
+class PortfolioConditionalGetTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        photographer = User.objects.create_user('photographer', 'p@example.com', 'pass')
+        self.profile = PhotographerProfile.objects.create(user=photographer, short_intro='Фотограф', bio='О себе')
+        self.photo = Photo.objects.create(photographer=self.profile, image='photographs/test.jpg')
+        self.client_user = User.objects.create_user('client', 'c@example.com', 'pass')
+        self.url = reverse('photographer_detail', args=[self.profile.pk])
+
+    def test_unchanged_portfolio_answers_not_modified(self):
+        etag = self.client.get(self.url)['ETag']
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertIn('Cookie', response['Vary'])
+        self.assertEqual(response.templates, [])
+
+    def test_validator_changes_with_viewer_but_not_with_likes(self):
+        anonymous_etag = self.client.get(self.url)['ETag']
+        self.client.force_login(self.client_user)
+        etag = self.client.get(self.url, HTTP_IF_NONE_MATCH=anonymous_etag)['ETag']
+        self.assertNotEqual(etag, anonymous_etag)
+
+        # Likes are not in the HTML, they come from viewer_state.
+        PhotoLike.objects.create(user=self.client_user, photo=self.photo)
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_admin_category_change_invalidates_the_portfolio(self):
+        etag = self.client.get(self.url)['ETag']
+        admin = User.objects.create_superuser('admin', 'a@example.com', 'pass')
+        self.client.force_login(admin)
+        self.client.post(reverse('admin:users_photo_changelist'),
+                         {'action': 'set_category_portrait', '_selected_action': [self.photo.pk]})
+        self.client.logout()
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'data-category="portrait"')
+
+
+class GalleryConditionalGetTests(TransactionTestCase):
+    """Commits for real: the gallery version moves once a change commits."""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user('photographer', 'p@example.com', 'pass')
+        self.profile = PhotographerProfile.objects.create(user=self.user)
+        self.photo = Photo.objects.create(photographer=self.profile, image='photographs/test.jpg')
+
+    def etag_moves(self, change):
+        etag = self.client.get(reverse('gallery'))['ETag']
+        change()
+        return self.client.get(reverse('gallery'), HTTP_IF_NONE_MATCH=etag).status_code == 200
+
+    def test_answers_not_modified_without_a_query(self):
+        etag = self.client.get(reverse('gallery'))['ETag']
+        with self.assertNumQueries(0):
+            response = self.client.get(reverse('gallery'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_changes_with_photos_profiles_and_accounts(self):
+        admin = User.objects.create_superuser('admin', 'a@example.com', 'pass')
+
+        def set_category():
+            self.client.force_login(admin)
+            self.client.post(reverse('admin:users_photo_changelist'),
+                             {'action': 'set_category_portrait', '_selected_action': [self.photo.pk]})
+            self.client.logout()
+
+        def deactivate():
+            self.user.is_active = False
+            self.user.save()
+
+        self.assertTrue(self.etag_moves(
+            lambda: Photo.objects.create(photographer=self.profile, image='photographs/new.jpg')))
+        self.assertTrue(self.etag_moves(set_category))
+        self.assertTrue(self.etag_moves(lambda: PhotographerProfile.objects.get(pk=self.profile.pk).save()))
+        self.assertTrue(self.etag_moves(lambda: Photo.objects.filter(photographer=self.profile).delete()))
+        self.assertTrue(self.etag_moves(deactivate))
+        # Logging in saves only last_login.
+        version = gallery.version()
+        self.client.login(username='admin', password='pass')
+        self.assertEqual(gallery.version(), version)
+
+    def test_bulk_changes_bump_the_version_once(self):
+        Photo.objects.bulk_create(Photo(photographer=self.profile, image=f'photographs/{i}.jpg') for i in range(5))
+        with mock.patch('users.gallery.bump') as bump:
+            with transaction.atomic():
+                Photo.objects.filter(photographer=self.profile).delete()
+        self.assertEqual(bump.call_count, 1)
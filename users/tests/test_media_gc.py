@@ -0,0 +1,111 @@
+import os
+import shutil
+import tempfile
+import time
+from io import StringIO
+from pathlib import Path
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+
+from users import media_gc
+from users.media_gc import collect, walk
+from users.models import Photo, PhotographerProfile
+from users.tests.utils import media_file
+from users.thumbnails import thumbnail_name, thumbnail_url
+
+DAY = 24 * 60 * 60
+
+
+class OrphanedMediaTests(TestCase):
+
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        override = override_settings(MEDIA_ROOT=media_root)
+        override.enable()
+        self.addCleanup(override.disable)
+        cache.clear()
+        self.media_root = Path(media_root)
+
+        user = User.objects.create_user('photographer')
+        self.profile = PhotographerProfile.objects.create(user=user, profile_image=self.old('profile_images/me.jpg'))
+        # Names around the "/" and "." separators, which sort in between.
+        self.kept = ['photographs/a.jpg', 'photographs/a/b.jpg', 'photographs/a_b.jpg']
+        for name in self.kept:
+            Photo.objects.create(photographer=self.profile, image=self.old(name))
+        thumbnail_url(Photo.objects.get(image='photographs/a.jpg').image)
+
+        self.orphans = ['photographs/a-b.jpg', 'photographs/a/a.jpg', 'profile_images/old.jpg', 'zzz.txt']
+        for name in self.orphans:
+            self.old(name)
+        self.young = media_file('photographs/uploading.jpg')
+        gone = Photo.objects.create(photographer=self.profile, image=self.old('photographs/gone.jpg'))
+        thumbnail_url(gone.image)
+        os.remove(self.media_root / 'photographs/gone.jpg')
+        gone.delete()
+        self.orphan_thumb = thumbnail_name('photographs/gone.jpg', (120, 120))
+        self.kept_thumb = thumbnail_name('photographs/a.jpg', (120, 120))
+        for name in (self.orphan_thumb, self.kept_thumb):
+            self.age(name)
+
+    def old(self, name):
+        self.age(media_file(name))
+        return name
+
+    def age(self, name):
+        past = time.time() - 2 * DAY
+        os.utime(self.media_root / name, (past, past))
+
+    def test_walk_is_in_name_order(self):
+        names = list(walk(str(self.media_root), skip={'thumbs/'}))
+        self.assertEqual(names, sorted(names))
+        with mock.patch.object(media_gc, 'SORT_CHUNK', 2):
+            self.assertEqual(list(walk(str(self.media_root), skip={'thumbs/'})), names)
+
+    def test_listings_longer_than_a_sort_chunk_are_sorted_on_disk(self):
+        with mock.patch.object(media_gc, 'SORT_CHUNK', 2):
+            self.test_delete_removes_old_orphans_only()
+
+    def test_external_sort(self):
+        items = ['b', 'a\nb', 'é', 'a', '\udcff', 'c', 'a/']
+        self.assertEqual(list(media_gc.external_sort(iter(items), chunk_size=3)), sorted(items))
+        self.assertEqual(list(media_gc.external_sort([], chunk_size=3)), [])
+
+    def test_dry_run_reports_without_touching_files(self):
+        stats = collect(self.media_root, older_than=time.time() - DAY)
+        self.assertEqual(stats['files'], len(self.orphans) + 1)
+        self.assertGreater(stats['bytes'], 0)
+        self.assertEqual(stats['young'], 1)
+        self.assertTrue(all((self.media_root / name).exists() for name in self.orphans))
+
+    def test_delete_removes_old_orphans_only(self):
+        out = StringIO()
+        call_command('collect_orphaned_media', '--delete', stdout=out)
+        self.assertIn(f'Deleted {len(self.orphans) + 1} files', out.getvalue())
+        self.assertFalse(any((self.media_root / name).exists() for name in self.orphans))
+        self.assertFalse((self.media_root / self.orphan_thumb).exists())
+        for name in self.kept + [self.young, 'profile_images/me.jpg', self.kept_thumb]:
+            self.assertTrue((self.media_root / name).exists(), name)
+
+    def test_sources_differing_in_extension_keep_their_own_renditions(self):
+        png = Photo.objects.create(photographer=self.profile, image=self.old('photographs/a.png'))
+        jpg = Photo.objects.get(image='photographs/a.jpg')
+        self.assertNotEqual(thumbnail_url(png.image), thumbnail_url(jpg.image))
+        self.age(thumbnail_name(png.image.name, (120, 120)))
+
+        collect(self.media_root, older_than=time.time() - DAY, dry_run=False)
+        for photo in (png, jpg):
+            self.assertTrue((self.media_root / thumbnail_name(photo.image.name, (120, 120))).is_file())
+
+    def test_quarantine_keeps_relative_paths(self):
+        quarantine = self.media_root / 'quarantine'
+        collect(self.media_root, older_than=time.time() - DAY, dry_run=False, quarantine=str(quarantine))
+        self.assertTrue((quarantine / 'photographs/a/a.jpg').is_file())
+        self.assertFalse((self.media_root / 'photographs/a/a.jpg').exists())
+        # The quarantine directory itself is not collected on the next run.
+        stats = collect(self.media_root, older_than=time.time() + DAY, quarantine=str(quarantine))
+        self.assertEqual(stats['files'], 1)
@@ -0,0 +1,83 @@
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+
+from users import memberships
+from users.models import Favorite, Photo, PhotographerProfile, PhotoLike
+from users.purge import Purge, request_purge
+
+
+class MembershipTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.profiles = [
+            PhotographerProfile.objects.create(user=User.objects.create_user(f'photographer{i}'))
+            for i in range(3)
+        ]
+        self.photo = Photo.objects.create(photographer=self.profiles[0], image='photographs/a.jpg', category='portrait')
+        self.user = User.objects.create_user('client')
+        Favorite.objects.create(user=self.user, photographer=self.profiles[1])
+        PhotoLike.objects.create(user=self.user, photo=self.photo)
+
+    def fresh(self):
+        return User.objects.get(pk=self.user.pk)
+
+    def test_loaded_once_then_served_from_the_cache(self):
+        user = self.fresh()
+        with self.assertNumQueries(1):
+            memberships.load(user)
+            self.assertEqual(memberships.favorites(user), {self.profiles[1].pk})
+            self.assertEqual(memberships.likes(user), {self.photo.pk})
+        user = self.fresh()
+        with self.assertNumQueries(0):
+            members = memberships.load(user)
+        self.assertEqual(members, {memberships.FAVORITES: {self.profiles[1].pk}, memberships.LIKES: {self.photo.pk}})
+
+    def test_toggles_forget_the_cached_sets(self):
+        memberships.load(self.fresh())
+        self.client.force_login(self.user)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('toggle_favorite', args=[self.profiles[2].pk]))
+            self.client.post(reverse('toggle_favorite', args=[self.profiles[1].pk]))
+            self.client.post(reverse('toggle_photo_like', args=[self.photo.pk]))
+        user = self.fresh()
+        with self.assertNumQueries(1):
+            members = memberships.load(user)
+        self.assertEqual(members, {memberships.FAVORITES: {self.profiles[2].pk}, memberships.LIKES: set()})
+
+    def test_deleting_rows_keeps_the_fast_path(self):
+        # No per-row signals: one DELETE, no SELECT of the rows first.
+        with self.assertNumQueries(1):
+            PhotoLike.objects.filter(photo=self.photo).delete()
+        with self.assertNumQueries(1):
+            Favorite.objects.filter(user=self.user).delete()
+
+    def test_quick_photo_deletion_forgets_the_likes(self):
+        memberships.load(self.fresh())
+        staff = User.objects.create_superuser('admin', 'admin@example.com', 'pass')
+        self.client.force_login(staff)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('admin:users_photo_changelist'),
+                             {'action': 'delete_quickly', '_selected_action': [self.photo.pk]})
+        self.assertEqual(memberships.likes(self.fresh()), set())
+
+    def test_specialists_pages_check_favorites_without_a_query_each(self):
+        self.client.force_login(self.user)
+        page = self.client.get(reverse('specialists')).context['photographers']
+        self.assertEqual({p.pk for p in page if p.is_favorite}, {self.profiles[1].pk})
+        photos = self.client.get(reverse('gallery')).context['photos']
+        self.assertEqual([photo.is_favorite for photo in photos], [False])
+
+    def test_purge_forgets_the_sets_of_affected_users(self):
+        memberships.load(self.fresh())
+        with self.captureOnCommitCallbacks(execute=True):
+            Purge(request_purge(self.profiles[0].user)).run()
+        self.assertEqual(memberships.likes(self.fresh()), set())
+        self.assertEqual(memberships.favorites(self.fresh()), {self.profiles[1].pk})
+
+    def test_anonymous_users_have_no_members(self):
+        self.client.logout()
+        response = self.client.get(reverse('gallery'))
+        self.assertFalse(response.context['photos'][0].is_favorite)
@@ -0,0 +1,41 @@
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+
+from users.models import News
+
+
+class NewsFeedTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.news = News.objects.create(title='Новая выставка', content='<p>Открытие в центре.</p>')
+
+    def test_feeds_render_and_answer_not_modified(self):
+        for name in ('news_feed_rss', 'news_feed_atom'):
+            response = self.client.get(reverse(name))
+            self.assertContains(response, 'Новая выставка')
+            with self.assertNumQueries(1):
+                not_modified = self.client.get(reverse(name), HTTP_IF_NONE_MATCH=response['ETag'])
+            self.assertEqual(not_modified.status_code, 304)
+
+    def test_feed_validator_changes_when_news_is_edited(self):
+        etag = self.client.get(reverse('news_feed_atom'))['ETag']
+        self.news.title = 'Выставка перенесена'
+        self.news.save()
+        response = self.client.get(reverse('news_feed_atom'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Выставка перенесена')
+
+    def test_detail_answers_not_modified_without_rendering(self):
+        url = reverse('news_detail', args=[self.news.pk])
+        response = self.client.get(url)
+        self.assertIn('Last-Modified', response)
+        not_modified = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(not_modified.status_code, 304)
+        self.assertEqual(not_modified.templates, [])
+
+    def test_news_list_is_paginated(self):
+        News.objects.bulk_create([News(title=f'Новость {i}', content='Текст') for i in range(15)])
+        response = self.client.get(reverse('news'), {'page': 2})
+        self.assertEqual(len(response.context['news_items']), 6)
@@ -0,0 +1,268 @@
+import datetime
+import hashlib
+import threading
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from io import BytesIO
+from unittest import mock
+from urllib.parse import parse_qsl, unquote, urlsplit
+from urllib.request import Request, urlopen
+from xml.sax.saxutils import escape
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from PIL import Image
+
+from users.models import Photo, PhotographerProfile
+from users.object_storage import S3Error, S3Storage, signature
+from users.thumbnails import thumbnail_name
+
+ACCESS_KEY = 'AKIDEXAMPLE'
+SECRET_KEY = 'secret/EXAMPLEKEY'
+BUCKET = 'media'
+
+
+class FakeS3(BaseHTTPRequestHandler):
+    """The subset of S3 the storage uses, checking every SigV4 signature."""
+
+    objects = {}
+
+    def log_message(self, *args):
+        pass
+
+    def authorized(self, path, params, body):
+        headers = {name.lower(): value for name, value in self.headers.items()}
+        if 'X-Amz-Signature' in params:
+            given = params.pop('X-Amz-Signature')
+            issued = datetime.datetime.strptime(params['X-Amz-Date'], '%Y%m%dT%H%M%SZ').replace(
+                tzinfo=datetime.timezone.utc)
+            if datetime.datetime.now(datetime.timezone.utc) > issued + datetime.timedelta(
+                    seconds=int(params['X-Amz-Expires'])):
+                return False
+            names, payload_hash, amz_date = params['X-Amz-SignedHeaders'], 'UNSIGNED-PAYLOAD', params['X-Amz-Date']
+        else:
+            auth = dict(part.split('=', 1) for part in headers.get('authorization', '').split(' ', 1)[-1].split(', '))
+            given, names = auth.get('Signature'), auth.get('SignedHeaders', '')
+            payload_hash, amz_date = headers.get('x-amz-content-sha256'), headers.get('x-amz-date', '')
+            if payload_hash != hashlib.sha256(body).hexdigest():
+                return False
+        signed = {name: headers.get(name, '') for name in names.split(';')}
+        return given == signature(SECRET_KEY, 'us-east-1', self.command, path, params, signed, payload_hash, amz_date)
+
+    def handle_request(self):
+        url = urlsplit(self.path)
+        path = unquote(url.path)
+        params = dict(parse_qsl(url.query, keep_blank_values=True))
+        body = self.rfile.read(int(self.headers.get('Content-Length') or 0))
+        if not self.authorized(path, params, body):
+            return self.reply(403)
+        key = path.split('/', 2)[2] if path.count('/') > 1 else ''
+        if self.command == 'PUT':
+            self.objects[key] = (body, self.headers.get('Content-Type', ''))
+            return self.reply(200)
+        if self.command == 'DELETE':
+            self.objects.pop(key, None)
+            return self.reply(204)
+        if not key and params.get('list-type') == '2':
+            return self.reply(200, self.listing(params.get('prefix', '')), 'application/xml')
+        if key not in self.objects:
+            return self.reply(404)
+        content, content_type = self.objects[key]
+        self.reply(200, content, content_type, head=self.command == 'HEAD')
+
+    do_GET = do_PUT = do_HEAD = do_DELETE = handle_request
+
+    def listing(self, prefix):
+        keys, prefixes = [], set()
+        for key in sorted(self.objects):
+            if key.startswith(prefix):
+                rest = key[len(prefix):]
+                if '/' in rest:
+                    prefixes.add(prefix + rest.split('/', 1)[0] + '/')
+                else:
+                    keys.append(key)
+        return (
+            '<ListBucketResult xmlns="http://s3.amazonaws.com/doc/2006-03-01/">'
+            f'<Prefix>{escape(prefix)}</Prefix><IsTruncated>false</IsTruncated>'
+            + ''.join(f'<Contents><Key>{escape(key)}</Key></Contents>' for key in keys)
+            + ''.join(f'<CommonPrefixes><Prefix>{escape(p)}</Prefix></CommonPrefixes>' for p in sorted(prefixes))
+            + '</ListBucketResult>'
+        ).encode()
+
+    def reply(self, status, body=b'', content_type='application/octet-stream', head=False):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('Last-Modified', formatdate(usegmt=True))
+        self.end_headers()
+        if not head:
+            self.wfile.write(body)
+
+
+class FakeS3Mixin:
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.server = ThreadingHTTPServer(('127.0.0.1', 0), FakeS3)
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        cls.addClassCleanup(cls.server.server_close)
+        cls.addClassCleanup(cls.server.shutdown)
+        cls.endpoint = f'http://127.0.0.1:{cls.server.server_port}'
+
+    def setUp(self):
+        super().setUp()
+        FakeS3.objects.clear()
+        cache.clear()
+        override = override_settings(
+            S3_BUCKET=BUCKET, S3_ENDPOINT_URL=self.endpoint, S3_ACCESS_KEY_ID=ACCESS_KEY,
+            S3_SECRET_ACCESS_KEY=SECRET_KEY, S3_PUBLIC_URL='',
+            STORAGES={'default': {'BACKEND': 'users.object_storage.S3Storage'},
+                      'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'}},
+        )
+        override.enable()
+        self.addCleanup(override.disable)
+
+
+def jpeg(size=(300, 200), format='JPEG'):
+    output = BytesIO()
+    Image.new('RGB', size, (224, 187, 216)).save(output, format=format)
+    return output.getvalue()
+
+
+class S3StorageTests(FakeS3Mixin, SimpleTestCase):
+
+    def test_round_trip(self):
+        name = default_storage.save('photographs/a b.jpg', ContentFile(b'data'))
+        self.assertTrue(default_storage.exists(name))
+        self.assertEqual(default_storage.size(name), 4)
+        with default_storage.open(name) as stored:
+            self.assertEqual(stored.read(), b'data')
+        self.assertEqual(FakeS3.objects[name][1], 'image/jpeg')
+        default_storage.save('thumbs/120x120/photographs/a.jpg', ContentFile(b'x'))
+        self.assertEqual(default_storage.listdir('thumbs'), (['120x120'], []))
+        self.assertEqual(default_storage.listdir('photographs'), ([], ['a b.jpg']))
+
+        with urlopen(default_storage.url(name)) as response:
+            self.assertEqual(response.read(), b'data')
+        default_storage.delete(name)
+        self.assertFalse(default_storage.exists(name))
+
+    def test_public_url(self):
+        storage = S3Storage(public_url='https://cdn.example.com/')
+        self.assertEqual(storage.url('photographs/a b.jpg'), 'https://cdn.example.com/photographs/a%20b.jpg')
+
+    def test_presigned_upload_is_bound_to_its_content_type(self):
+        upload = default_storage.presigned_upload('photographs/new.jpg', 'image/jpeg')
+        rejected = Request(upload['url'], data=b'data', method='PUT', headers={'Content-Type': 'text/html'})
+        with self.assertRaises(OSError):
+            urlopen(rejected)
+        urlopen(Request(upload['url'], data=b'data', method='PUT', headers=upload['headers'])).close()
+        self.assertEqual(FakeS3.objects['photographs/new.jpg'], (b'data', 'image/jpeg'))
+
+    def test_unreachable_service_raises_s3_error(self):
+        server = ThreadingHTTPServer(('127.0.0.1', 0), FakeS3)
+        port = server.server_port
+        server.server_close()
+        storage = S3Storage(endpoint_url=f'http://127.0.0.1:{port}', timeout=1)
+        with self.assertRaises(S3Error) as raised:
+            storage.exists('photographs/a.jpg')
+        self.assertIsNone(raised.exception.status)
+
+    def test_signature_matches_aws_example(self):
+        # "GET Object" example of the AWS Signature Version 4 documentation.
+        empty = 'e3b0c44298fc1c149afbf4c8996fb92427ae41e4649b934ca495991b7852b855'
+        headers = {
+            'host': 'examplebucket.s3.amazonaws.com', 'range': 'bytes=0-9',
+            'x-amz-content-sha256': empty, 'x-amz-date': '20130524T000000Z',
+        }
+        self.assertEqual(
+            signature('wJalrXUtnFEMI/K7MDENG/bPxRfiCYEXAMPLEKEY', 'us-east-1', 'GET', '/test.txt', {},
+                      headers, empty, '20130524T000000Z'),
+            'f0e8bdb87c964420e857bd35b5d6ed310bd44f0170aba48dd91039c6036bdb41',
+        )
+
+
+class DirectUploadTests(FakeS3Mixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create_user('photographer', 'photographer@example.com', 'pass')
+        self.profile = PhotographerProfile.objects.create(user=self.user)
+        self.client.force_login(self.user)
+
+    def start(self, content, content_type='image/jpeg'):
+        response = self.client.post(reverse('photo_upload_start'), {
+            'name': 'IMG_0001.JPG', 'content_type': content_type, 'size': len(content),
+        })
+        self.assertEqual(response.status_code, 200, response.content)
+        upload = response.json()
+        urlopen(Request(upload['url'], data=content, method=upload['method'], headers=upload['headers'])).close()
+        return upload
+
+    def test_uploaded_photo_is_registered_and_processed(self):
+        upload = self.start(jpeg())
+        response = self.client.post(reverse('photo_upload_complete'), {'token': upload['token'], 'category': 'portrait'})
+        self.assertEqual(response.status_code, 200, response.content)
+
+        photo = Photo.objects.get(pk=response.json()['id'])
+        self.assertEqual(photo.category, 'portrait')
+        self.assertTrue(photo.image.name.startswith('photographs/') and photo.image.name.endswith('.jpg'))
+        self.assertIn(thumbnail_name(photo.image.name, (120, 120)), FakeS3.objects)
+
+        again = self.client.post(reverse('photo_upload_complete'), {'token': upload['token'], 'category': 'portrait'})
+        self.assertEqual(again.json()['id'], photo.pk)
+        self.assertEqual(Photo.objects.count(), 1)
+
+    def test_uploaded_photo_is_compressed_like_form_uploads(self):
+        upload = self.start(jpeg((2400, 1200), 'PNG'), 'image/png')
+        response = self.client.post(reverse('photo_upload_complete'), {'token': upload['token'], 'category': 'portrait'})
+        self.assertEqual(response.status_code, 200, response.content)
+
+        photo = Photo.objects.get(pk=response.json()['id'])
+        self.assertTrue(photo.image.name.endswith('.jpg'))
+        self.assertEqual(set(FakeS3.objects) - {photo.image.name}, {thumbnail_name(photo.image.name, (120, 120))})
+        body, content_type = FakeS3.objects[photo.image.name]
+        self.assertEqual(content_type, 'image/jpeg')
+        with Image.open(BytesIO(body)) as stored:
+            self.assertEqual((stored.format, stored.size), ('JPEG', (1600, 800)))
+
+        again = self.client.post(reverse('photo_upload_complete'), {'token': upload['token'], 'category': 'portrait'})
+        self.assertEqual(again.json()['id'], photo.pk)
+
+    def test_unreachable_storage_is_reported(self):
+        upload = self.start(jpeg())
+        with mock.patch('users.object_storage.urlopen', side_effect=ConnectionResetError):
+            response = self.client.post(reverse('photo_upload_complete'), {'token': upload['token'], 'category': 'portrait'})
+        self.assertEqual(response.status_code, 503)
+        self.assertFalse(Photo.objects.exists())
+
+    def test_non_image_is_rejected_and_removed(self):
+        upload = self.start(b'<html>not an image</html>')
+        response = self.client.post(reverse('photo_upload_complete'), {'token': upload['token'], 'category': 'portrait'})
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Photo.objects.exists())
+        self.assertEqual(FakeS3.objects, {})
+
+    def test_refused_uploads(self):
+        response = self.client.post(reverse('photo_upload_start'), {
+            'name': 'page.html', 'content_type': 'text/html', 'size': 10,
+        })
+        self.assertEqual(response.status_code, 400)
+        response = self.client.post(reverse('photo_upload_complete'), {'token': 'forged', 'category': 'portrait'})
+        self.assertEqual(response.status_code, 400)
+
+        upload = self.start(jpeg())
+        other = User.objects.create_user('other')
+        PhotographerProfile.objects.create(user=other)
+        self.client.force_login(other)
+        response = self.client.post(reverse('photo_upload_complete'), {'token': upload['token'], 'category': 'portrait'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_dashboard_uses_direct_upload(self):
+        response = self.client.get(reverse('dashboard'))
+        self.assertContains(response, reverse('photo_upload_start'))
@@ -0,0 +1,118 @@
+import smtplib
+from datetime import timedelta
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core import mail
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from users import bookings
+from users.models import BookingRequest, OutboxEmail, PhotographerProfile, SupportRequest
+from users.notifications import booking_created
+from users.outbox import OutboxBackend, deliver_batch
+
+
+@override_settings(
+    EMAIL_BACKEND='users.outbox.OutboxBackend',
+    OUTBOX_DELIVERY_BACKEND='django.core.mail.backends.locmem.EmailBackend',
+    OUTBOX_MAX_ATTEMPTS=2,
+)
+class OutboxTests(TestCase):
+
+    def setUp(self):
+        self.client_user = User.objects.create_user('client', 'client@example.com', 'pass')
+        self.photographer_user = User.objects.create_user('photographer', 'photographer@example.com', 'pass')
+        self.photographer = PhotographerProfile.objects.create(
+            user=self.photographer_user, short_intro='Свадьбы', bio='Снимаю свадьбы',
+        )
+
+    def test_booking_emails_are_queued_not_sent(self):
+        self.client.force_login(self.client_user)
+        self.client.post(reverse('photographer_detail', args=[self.photographer.pk]), {
+            'submit_booking': '1', 'message': 'Свадьба летом', 'contact_phone': '+7 (999) 999-99-99',
+        })
+        self.assertEqual(len(mail.outbox), 0)
+        queued = OutboxEmail.objects.get()
+        self.assertEqual(queued.recipients, 'photographer@example.com')
+
+        bookings.perform('complete', 'received', bookings.owned(self.photographer_user, 'received'))
+        self.assertEqual(OutboxEmail.objects.filter(recipients='client@example.com').count(), 1)
+
+        call_command('send_outbox', stdout=mock.MagicMock())
+        self.assertEqual(sorted(message.to[0] for message in mail.outbox),
+                         ['client@example.com', 'photographer@example.com'])
+        self.assertFalse(OutboxEmail.objects.exclude(status='sent').exists())
+
+    def test_email_is_rolled_back_with_its_change(self):
+        support_request = SupportRequest.objects.create(user=self.client_user, message='Не загружается фото')
+        admin = User.objects.create_superuser('admin', 'admin@example.com', 'pass')
+        self.client.force_login(admin)
+        reply = {'admin_reply': '1', 'request_id': support_request.pk, 'admin_response': 'Готово'}
+        queue = OutboxBackend.send_messages
+
+        def queue_then_fail(backend, messages):
+            queue(backend, messages)
+            raise RuntimeError('crash after queueing')
+
+        with mock.patch.object(OutboxBackend, 'send_messages', queue_then_fail):
+            with self.assertRaises(RuntimeError):
+                self.client.post(reverse('dashboard'), reply)
+        self.assertFalse(OutboxEmail.objects.exists())
+        support_request.refresh_from_db()
+        self.assertEqual(support_request.status, 'new')
+
+        self.client.post(reverse('dashboard'), reply)
+        self.assertIn('Готово', OutboxEmail.objects.get().payload['body'])
+
+    def test_failures_are_retried_with_backoff_then_given_up(self):
+        BookingRequest.objects.create(
+            client=self.client_user, photographer=self.photographer,
+            message='Свадьба летом', contact_phone='+7 (999) 999-99-99',
+        )
+        booking_created(BookingRequest.objects.get())
+        error = smtplib.SMTPServerDisconnected('gone')
+        with mock.patch('django.core.mail.backends.locmem.EmailBackend.send_messages', side_effect=error):
+            call_command('send_outbox', stdout=mock.MagicMock())
+            email = OutboxEmail.objects.get()
+            self.assertEqual((email.status, email.attempts), ('pending', 1))
+            self.assertGreater(email.next_attempt_at, timezone.now() + timedelta(seconds=30))
+            self.assertIn('gone', email.last_error)
+
+            OutboxEmail.objects.update(next_attempt_at=timezone.now())
+            call_command('send_outbox', stdout=mock.MagicMock())
+        email.refresh_from_db()
+        self.assertEqual((email.status, email.attempts), ('failed', 2))
+
+    def test_no_transaction_is_open_while_sending(self):
+        booking_created(BookingRequest.objects.create(
+            client=self.client_user, photographer=self.photographer,
+            message='Свадьба летом', contact_phone='+7 (999) 999-99-99',
+        ))
+        # TestCase wraps the test in transactions of its own; deliver_batch must not add any.
+        outer = len(connection.atomic_blocks)
+        states = []
+
+        def send_messages(backend, messages):
+            states.append((len(connection.atomic_blocks), OutboxEmail.objects.get().status))
+            return len(messages)
+
+        with mock.patch('django.core.mail.backends.locmem.EmailBackend.send_messages', send_messages):
+            self.assertEqual(deliver_batch(), (1, 0))
+        self.assertEqual(states, [(outer, 'sending')])
+        self.assertEqual(OutboxEmail.objects.get().status, 'sent')
+
+    def test_claimed_messages_return_when_the_lease_runs_out(self):
+        booking_created(BookingRequest.objects.create(
+            client=self.client_user, photographer=self.photographer,
+            message='Свадьба летом', contact_phone='+7 (999) 999-99-99',
+        ))
+        # A worker claimed the message and died before recording the result.
+        OutboxEmail.objects.update(status='sending', next_attempt_at=timezone.now() + timedelta(minutes=5))
+        self.assertEqual(deliver_batch(), (0, 0))
+        OutboxEmail.objects.update(next_attempt_at=timezone.now())
+        self.assertEqual(deliver_batch(), (1, 0))
+        self.assertEqual(len(mail.outbox), 1)
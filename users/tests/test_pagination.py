@@ -0,0 +1,26 @@
+from django.core.paginator import Paginator
+from django.template import Context, Template
+from django.test import RequestFactory, SimpleTestCase
+
+PAGER = Template(
+    '{% load user_filters %}{% preserved_query as qs %}{% page_window page as pages %}'
+    '{% for i in pages %}[{% if i == page.paginator.ELLIPSIS %}…{% else %}?page={{ i }}{{ qs }}{% endif %}]{% endfor %}'
+)
+
+
+class PaginationTagTests(SimpleTestCase):
+
+    def render(self, query, number):
+        request = RequestFactory().get('/users/specialists/', query)
+        page = Paginator(range(10_000), 10).page(number)
+        return PAGER.render(Context({'request': request, 'page': page}))
+
+    def test_window_is_bounded(self):
+        html = self.render({}, 500)
+        self.assertEqual(html, '[?page=1][…][?page=498][?page=499][?page=500][?page=501][?page=502][…][?page=1000]')
+
+    def test_filters_are_preserved_and_escaped(self):
+        html = self.render({'page': '3', 'city': 'Москва', 'price_min': '', 'q': 'a&b'}, 1)
+        self.assertIn('[?page=2&amp;city=%D0%9C%D0%BE%D1%81%D0%BA%D0%B2%D0%B0&amp;q=a%26b]', html)
+        self.assertNotIn('price_min', html)
+        self.assertEqual(html.count('page='), 4)
@@ -0,0 +1,97 @@
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from users import cities, purge
+from users.models import PhotographerProfile, PriceBucket
+
+
+@override_settings(PRICE_BUCKET_WIDTH=1000, PRICE_BUCKET_MAX=5000)
+class PriceHistogramTests(TestCase):
+
+    def setUp(self):
+        cities.invalidate()
+        self.addCleanup(cities.invalidate)
+        self.profiles = [
+            PhotographerProfile.objects.create(
+                user=User.objects.create_user(f'photographer{i}'), specialization=specialization, city=city, price=price)
+            for i, (specialization, city, price) in enumerate([
+                ('wedding', 'Москва', 1500), ('wedding', 'Казань', 1800), ('portrait', 'Москва', 3000),
+                ('wedding', 'Москва', 9000), ('portrait', '', 500),
+            ])
+        ]
+
+    def histogram(self, **params):
+        return self.client.get(reverse('price_histogram'), params).json()
+
+    def counts(self, **params):
+        return [(bucket['from'], bucket['count']) for bucket in self.histogram(**params)['buckets']]
+
+    def test_histograms_per_specialization_and_city(self):
+        self.assertEqual(self.counts(), [(0, 1), (1000, 2), (3000, 1), (5000, 1)])
+        self.assertEqual(self.counts(specialization='wedding'), [(1000, 2), (5000, 1)])
+        self.assertEqual(self.counts(city='москва'), [(1000, 1), (3000, 1), (5000, 1)])
+        self.assertEqual(self.counts(specialization='wedding', city='МОСКВА'), [(1000, 1), (5000, 1)])
+        # Unknown cities and specializations fall back to everything.
+        self.assertEqual(self.counts(specialization='any', city='Моск'), self.counts())
+
+        data = self.histogram()
+        self.assertEqual((data['width'], data['total']), (1000, 5))
+        self.assertIsNone(data['buckets'][-1]['to'])
+        self.assertEqual(data['percentiles'], {'25': 1125, '50': 1750, '75': 3750, '90': 5500})
+
+    def test_saves_and_deletes_move_profiles_between_buckets(self):
+        profile = PhotographerProfile.objects.get(pk=self.profiles[0].pk)
+        profile.price, profile.specialization = 3500, 'portrait'
+        profile.save()
+        self.profiles[1].city = 'Москва'
+        self.profiles[1].save()
+        self.profiles[3].delete()
+        self.profiles[4].save()  # unchanged
+
+        self.assertEqual(self.counts(), [(0, 1), (1000, 1), (3000, 2)])
+        self.assertEqual(self.counts(specialization='portrait', city='Москва'), [(3000, 2)])
+        self.assertEqual(self.counts(specialization='wedding', city='Москва'), [(1000, 1)])
+        self.assertEqual(self.counts(city='Казань'), [])
+
+        stored = sorted(PriceBucket.objects.values_list('specialization', 'city', 'bucket', 'count'))
+        PriceBucket.rebuild()
+        self.assertEqual(
+            [row for row in stored if row[3]],
+            sorted(PriceBucket.objects.values_list('specialization', 'city', 'bucket', 'count')),
+        )
+
+    def test_profiles_loaded_without_prices_are_counted_once(self):
+        profile = PhotographerProfile.objects.only('pk', 'bio', 'user').get(pk=self.profiles[4].pk)
+        profile.bio = 'Новая биография'
+        profile.save()
+        self.assertEqual(self.counts(specialization='portrait'), [(0, 1), (3000, 1)])
+
+    def test_inactive_photographers_are_not_counted(self):
+        user = self.profiles[3].user
+        purge.request_purge(user)
+        self.assertEqual(self.counts(specialization='wedding'), [(1000, 2)])
+
+        # Edits while inactive and deletion stay out of the histograms.
+        profile = PhotographerProfile.objects.get(pk=self.profiles[3].pk)
+        profile.price = 100
+        profile.save()
+        self.assertEqual(self.counts(specialization='wedding'), [(1000, 2)])
+        stored = sorted(PriceBucket.objects.filter(count__gt=0).values_list('specialization', 'city', 'bucket', 'count'))
+        PriceBucket.rebuild()
+        self.assertEqual(stored, sorted(PriceBucket.objects.values_list('specialization', 'city', 'bucket', 'count')))
+
+        user.is_active = True
+        user.save()
+        self.assertEqual(self.counts(specialization='wedding'), [(0, 1), (1000, 2)])
+        user.save()  # unchanged
+        self.assertEqual(self.counts(specialization='wedding'), [(0, 1), (1000, 2)])
+
+        purge.request_purge(user)
+        PhotographerProfile.objects.get(pk=self.profiles[3].pk).delete()
+        self.assertEqual(self.counts(specialization='wedding'), [(1000, 2)])
+
+    def test_one_query(self):
+        cities.index()
+        with self.assertNumQueries(1):
+            self.histogram(specialization='wedding', city='Москва')
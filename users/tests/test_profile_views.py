@@ -0,0 +1,100 @@
+from datetime import timedelta
+from io import StringIO
+
+from django.contrib.auth.models import User
+from django.contrib.sessions.models import Session
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from users.models import PhotographerProfile, ProfileView, ProfileViewDaily
+from users.profile_views import daily_views
+
+
+class ProfileViewCountingTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        user = User.objects.create_user('photographer', 'p@example.com', 'pass')
+        self.photographer = PhotographerProfile.objects.create(user=user, short_intro='Фотограф', bio='О себе')
+        self.url = reverse('photographer_detail', args=[self.photographer.pk])
+
+    def views_count(self):
+        return PhotographerProfile.objects.get(pk=self.photographer.pk).views_count
+
+    def test_anonymous_view_is_counted_once_without_a_session(self):
+        self.client.get(self.url, HTTP_USER_AGENT='Browser A')
+        self.client.get(self.url, HTTP_USER_AGENT='Browser A')
+        self.assertEqual(self.views_count(), 1)
+        self.assertFalse(Session.objects.exists())
+
+        # Past the cache: a new visit, but not a new viewer today.
+        cache.clear()
+        self.client.get(self.url, HTTP_USER_AGENT='Browser A')
+        self.assertEqual(self.views_count(), 1)
+        self.assertEqual(ProfileView.objects.get().hits, 2)
+
+        self.client.get(self.url, HTTP_USER_AGENT='Browser B')
+        self.assertEqual(self.views_count(), 2)
+
+    def test_photographer_does_not_count_own_views(self):
+        self.client.force_login(self.photographer.user)
+        self.client.get(self.url)
+        self.assertEqual(self.views_count(), 0)
+        self.assertFalse(ProfileView.objects.exists())
+
+
+class CompactProfileViewsTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        user = User.objects.create_user('photographer', 'p@example.com', 'pass')
+        self.photographer = PhotographerProfile.objects.create(user=user, short_intro='Фотограф', bio='О себе')
+        self.url = reverse('photographer_detail', args=[self.photographer.pk])
+
+    def add_view(self, days_ago, hits=1, **viewer):
+        ProfileView.objects.create(
+            photographer=self.photographer, date=timezone.localdate() - timedelta(days=days_ago), hits=hits, **viewer,
+        )
+
+    def test_old_views_are_rolled_up_and_deleted(self):
+        viewer = User.objects.create_user('client', 'c@example.com', 'pass')
+        self.add_view(100, hits=3, user=viewer)
+        self.add_view(100, session_key='a' * 40)
+        self.add_view(100, session_key='b' * 40)
+        self.add_view(5, hits=2, session_key='c' * 40)
+
+        call_command('compact_profile_views', days=90, batch_size=2, stdout=StringIO())
+
+        self.assertEqual(ProfileView.objects.count(), 1)
+        rollup = ProfileViewDaily.objects.get(photographer=self.photographer)
+        self.assertEqual((rollup.unique_views, rollup.total_views), (3, 5))
+
+        chart = daily_views(self.photographer, days=30)
+        self.assertEqual(len(chart), 30)
+        self.assertEqual((sum(day['unique'] for day in chart), sum(day['total'] for day in chart)), (1, 2))
+
+    def test_view_compact_view_again(self):
+        viewer = User.objects.create_user('client', 'c@example.com', 'pass')
+        self.client.force_login(viewer)
+        self.client.get(self.url)
+        cache.clear()
+        self.client.get(self.url)
+        ProfileView.objects.update(date=timezone.localdate() - timedelta(days=100))
+
+        call_command('compact_profile_views', days=90, stdout=StringIO())
+        self.assertFalse(ProfileView.objects.exists())
+        rollup = ProfileViewDaily.objects.get()
+        self.assertEqual((rollup.unique_views, rollup.total_views), (1, 2))
+
+        # Nothing per viewer outlives the window: today the viewer is a unique viewer of today.
+        cache.clear()
+        self.client.get(self.url)
+        cache.clear()
+        self.client.get(self.url)
+        self.assertEqual(PhotographerProfile.objects.get(pk=self.photographer.pk).views_count, 2)
+        self.assertEqual(daily_views(self.photographer)[-1], {
+            'date': timezone.localdate(), 'unique': 1, 'total': 2, 'percent': 100,
+        })
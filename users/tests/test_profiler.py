@@ -0,0 +1,50 @@
+import shutil
+import tempfile
+from pathlib import Path
+
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from users.models import RequestProfile
+from users.profiler import make_token
+
+
+class RequestProfilerTests(TestCase):
+
+    def setUp(self):
+        self.profiles_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.profiles_dir, ignore_errors=True)
+        override = override_settings(PROFILER_DIR=Path(self.profiles_dir))
+        override.enable()
+        self.addCleanup(override.disable)
+        self.staff = User.objects.create_superuser('admin', 'admin@example.com', 'pass')
+        self.user = User.objects.create_user('client', 'client@example.com', 'pass')
+
+    def test_anonymous_request_is_not_profiled(self):
+        response = self.client.get(reverse('news'), {'_profile': '1'})
+        self.assertNotIn('X-Profile-Id', response)
+        self.assertFalse(RequestProfile.objects.exists())
+
+    def test_staff_can_profile_a_request(self):
+        self.client.force_login(self.staff)
+        response = self.client.get(reverse('news'), HTTP_X_PROFILE='1')
+        profile = RequestProfile.objects.get(pk=response['X-Profile-Id'])
+        self.assertEqual(profile.url_name, 'news')
+        self.assertTrue((Path(self.profiles_dir) / profile.stats_file).is_file())
+        self.assertTrue((Path(self.profiles_dir) / profile.stacks_file).is_file())
+
+        change_url = reverse('admin:users_requestprofile_change', args=[profile.pk])
+        self.assertContains(self.client.get(change_url), 'cumulative')
+        download_url = reverse('admin:users_requestprofile_download', args=[profile.pk, 'stats'])
+        self.assertEqual(self.client.get(download_url).status_code, 200)
+
+    def test_user_needs_a_token_minted_for_them(self):
+        self.client.force_login(self.user)
+        self.client.get(reverse('news'), {'_profile': '1'})
+        other = User.objects.create_user('other', 'other@example.com', 'pass')
+        self.client.get(reverse('news'), {'_profile': make_token(other)})
+        self.assertFalse(RequestProfile.objects.exists())
+
+        response = self.client.get(reverse('news'), {'_profile': make_token(self.user)})
+        self.assertTrue(RequestProfile.objects.filter(pk=response['X-Profile-Id'], user=self.user).exists())
@@ -0,0 +1,106 @@
+import shutil
+import tempfile
+from io import StringIO
+from pathlib import Path
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from users import purge
+from users.models import (
+    AccountPurge, BookingCounter, BookingRequest, Favorite, Photo, PhotographerProfile, PhotoLike, ProfileView,
+)
+from users.tests.utils import media_file
+from users.thumbnails import thumbnail_name, thumbnail_url
+
+
+class AccountPurgeTests(TestCase):
+
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        override = override_settings(MEDIA_ROOT=media_root, PURGE_BATCH_SIZE=2)
+        override.enable()
+        self.addCleanup(override.disable)
+        cache.clear()
+        self.media_root = Path(media_root)
+
+        self.user = User.objects.create_user('photographer', 'photographer@example.com', 'pass')
+        self.profile = PhotographerProfile.objects.create(user=self.user, short_intro='Свадьбы')
+        self.photos = [
+            Photo.objects.create(photographer=self.profile, image=media_file(f'photographs/own_{i}.jpg'))
+            for i in range(5)
+        ]
+        thumbnail_url(self.photos[0].image)
+
+        self.other = User.objects.create_user('client', 'client@example.com', 'pass')
+        other_profile = PhotographerProfile.objects.create(user=self.other)
+        self.kept_photo = Photo.objects.create(photographer=other_profile, image=media_file('photographs/kept.jpg'))
+        PhotoLike.objects.create(user=self.other, photo=self.photos[0])
+        PhotoLike.objects.create(user=self.user, photo=self.kept_photo)
+        Favorite.objects.create(user=self.other, photographer=self.profile)
+        ProfileView.objects.create(photographer=other_profile, user=self.user)
+        for status in ('new', 'in_progress', 'completed'):
+            BookingRequest.objects.create(client=self.other, photographer=self.profile, status=status,
+                                          message='Съемка', contact_phone='+7 900 000-00-00')
+        BookingRequest.objects.create(client=self.user, photographer=other_profile,
+                                      message='Съемка', contact_phone='+7 900 000-00-00')
+
+    def test_delete_account_deactivates_and_queues_a_job(self):
+        self.client.force_login(self.user)
+        response = self.client.post(reverse('dashboard'), {'delete_account': '1'})
+        self.assertRedirects(response, reverse('home'), fetch_redirect_response=False)
+
+        self.user.refresh_from_db()
+        self.assertFalse(self.user.is_active)
+        self.assertTrue(AccountPurge.objects.filter(user_id=self.user.pk, status='pending').exists())
+        self.assertEqual(Photo.objects.filter(photographer=self.profile).count(), 5)
+        self.assertEqual(self.client.get(reverse('photographer_detail', args=[self.profile.pk])).status_code, 404)
+
+    def test_home_page_hides_photos_of_deactivated_accounts(self):
+        self.assertIn(self.photos[0], self.client.get(reverse('home')).context['best_photos'])
+        purge.request_purge(self.user)
+        # Nothing else was liked this week, so the page falls back to random photos.
+        self.assertEqual(list(self.client.get(reverse('home')).context['best_photos']), [self.kept_photo])
+
+    def test_job_deletes_rows_and_files_in_batches(self):
+        job = purge.request_purge(self.user)
+        thumb = self.media_root / thumbnail_name(self.photos[0].image.name, (120, 120))
+        self.assertTrue(thumb.is_file())
+
+        with self.captureOnCommitCallbacks(execute=True):
+            purge.run_job(purge.claim_next())
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'done', job.last_error)
+        self.assertGreater(job.deleted_rows, 5)
+        self.assertFalse(User.objects.filter(pk=self.user.pk).exists())
+        self.assertFalse(any((self.media_root / photo.image.name).exists() for photo in self.photos))
+        self.assertFalse(thumb.exists())
+        self.assertTrue((self.media_root / self.kept_photo.image.name).is_file())
+        self.assertEqual(list(ProfileView.objects.values_list('user', flat=True)), [None])
+
+        # The other side keeps correct counters for the bookings that disappeared.
+        self.assertFalse(BookingRequest.objects.exists())
+        self.assertEqual(set(BookingCounter.for_user(self.other, 'sent').values()), {0})
+        self.assertEqual(set(BookingCounter.for_user(self.other, 'received').values()), {0})
+        self.assertIsNone(purge.claim_next())
+
+    def test_files_stay_until_the_batch_commits(self):
+        purge.request_purge(self.user)
+        with self.captureOnCommitCallbacks() as callbacks:
+            purge.run_job(purge.claim_next())
+        self.assertTrue(callbacks)
+        self.assertTrue(all((self.media_root / photo.image.name).is_file() for photo in self.photos))
+
+    def test_failed_job_can_be_retried(self):
+        job = purge.request_purge(self.user)
+        AccountPurge.objects.filter(pk=job.pk).update(status='failed', last_error='boom')
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command('purge_accounts', '--retry-failed', stdout=StringIO())
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'done')
+        self.assertFalse(User.objects.filter(pk=self.user.pk).exists())
@@ -0,0 +1,80 @@
+import math
+import unittest
+from io import StringIO
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+
+from users import recommendations
+from users.models import Favorite, Photo, PhotographerProfile, PhotoLike, SimilarPhotographer
+
+
+class RecommendationTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.a, self.b, self.c, self.d, self.e = [
+            PhotographerProfile.objects.create(user=User.objects.create_user(f'photographer{i}'))
+            for i in range(5)
+        ]
+        self.clients = [User.objects.create_user(f'client{i}') for i in range(4)]
+        for client, photographers in zip(self.clients, [(self.a, self.b), (self.a, self.b, self.c), (self.c, self.d)]):
+            for photographer in photographers:
+                Favorite.objects.create(user=client, photographer=photographer)
+
+    def stored(self, photographer):
+        return list(SimilarPhotographer.objects.filter(photographer=photographer).values_list('similar_id', 'score'))
+
+    def test_cosine_of_co_favorites(self):
+        self.assertEqual(recommendations.build(), 4)
+        self.assertEqual(self.stored(self.a), [(self.b.pk, 1.0), (self.c.pk, 0.5)])
+        # Ties go to the lower id.
+        self.assertEqual([pk for pk, _ in self.stored(self.c)], [self.d.pk, self.a.pk, self.b.pk])
+        self.assertAlmostEqual(self.stored(self.c)[0][1], 1 / math.sqrt(2), places=recommendations.SCORE_DIGITS)
+        self.assertEqual(recommendations.similar_to(self.a), [self.b, self.c])
+        self.assertEqual(recommendations.similar_to(self.c, limit=1), [self.d])
+
+    def test_likes_count_towards_the_photographer(self):
+        photo = Photo.objects.create(photographer=self.e, image='photographs/e.jpg', category='portrait')
+        PhotoLike.objects.create(user=self.clients[2], photo=photo)
+        recommendations.build()
+        self.assertEqual([pk for pk, _ in self.stored(self.e)], [self.d.pk, self.c.pk])
+
+    def test_incremental_build_rewrites_only_affected_photographers(self):
+        recommendations.build()
+        before = SimilarPhotographer.objects.get(photographer=self.a, rank=1).computed_at
+        Favorite.objects.create(user=self.clients[3], photographer=self.d)
+        Favorite.objects.create(user=self.clients[3], photographer=self.e)
+
+        # d changed: c and d share its users, e is new.
+        self.assertEqual(recommendations.build(since=recommendations.last_build()), 3)
+        self.assertEqual(SimilarPhotographer.objects.get(photographer=self.a, rank=1).computed_at, before)
+        self.assertEqual([pk for pk, _ in self.stored(self.e)], [self.d.pk])
+        self.assertEqual(recommendations.build(since=recommendations.last_build()), 0)
+
+    def test_full_build_drops_photographers_nobody_is_drawn_to(self):
+        recommendations.build()
+        Favorite.objects.filter(photographer=self.d).delete()
+        call_command('build_recommendations', stdout=StringIO())
+        self.assertEqual(self.stored(self.d), [])
+        self.assertNotIn(self.d.pk, [pk for pk, _ in self.stored(self.c)])
+
+    def test_photographer_page_shows_similar_photographers(self):
+        recommendations.build()
+        self.b.user.is_active = False
+        self.b.user.save()
+        response = self.client.get(reverse('photographer_detail', args=[self.a.pk]))
+        self.assertEqual(response.context['similar_photographers'], [self.c])
+        self.assertContains(response, reverse('photographer_detail', args=[self.c.pk]))
+
+    @unittest.skipIf(recommendations.sparse is None, "NumPy/SciPy are not installed")
+    def test_sparse_product_matches_pure_python(self):
+        rows = list(recommendations.interactions())
+        expected = recommendations._neighbours_python(rows, None, 3)
+        result = recommendations._neighbours_sparse(rows, None, 3)
+        self.assertEqual(result.keys(), expected.keys())
+        for pk, neighbours in expected.items():
+            self.assertEqual([other for other, _ in result[pk]], [other for other, _ in neighbours])
@@ -0,0 +1,82 @@
+import json
+import re
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from users import instrumentation
+from users.models import PhotographerProfile
+
+SERVER_TIMING = re.compile(
+    r'^db;dur=(?P<db>\d+\.\d\d);desc="(?P<queries>\d+) queries", '
+    r'tpl;dur=(?P<tpl>\d+\.\d\d);desc="templates", '
+    r'total;dur=(?P<total>\d+\.\d\d);desc="(?P<view>[\w:]+)"$'
+)
+
+
+@override_settings(SERVER_TIMING_HEADER=True, SLOW_REQUEST_THRESHOLD_MS=None)
+class RequestTimingTests(TestCase):
+
+    def setUp(self):
+        for i in range(3):
+            PhotographerProfile.objects.create(user=User.objects.create_user(f'photographer{i}'))
+
+    def test_server_timing_counts_queries_and_templates(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('specialists'))
+        match = SERVER_TIMING.match(response['Server-Timing'])
+        self.assertIsNotNone(match, response['Server-Timing'])
+        self.assertEqual(int(match['queries']), len(queries))
+        self.assertEqual(match['view'], 'specialists')
+        self.assertGreater(float(match['tpl']), 0)
+        # Queries run inside template rendering too, so db and tpl overlap: only each is bounded.
+        self.assertLessEqual(float(match['db']), float(match['total']))
+        self.assertLessEqual(float(match['tpl']), float(match['total']))
+
+    @override_settings(SERVER_TIMING_HEADER=False)
+    def test_header_can_be_turned_off(self):
+        self.assertNotIn('Server-Timing', self.client.get(reverse('specialists')))
+
+    def test_unresolved_paths_are_named_so(self):
+        response = self.client.get('/no-such-page/')
+        self.assertTrue(response['Server-Timing'].endswith('desc="unresolved"'))
+
+    @override_settings(SLOW_REQUEST_THRESHOLD_MS=0)
+    def test_requests_over_the_threshold_are_logged(self):
+        with self.assertLogs('users.slow_requests', 'WARNING') as logs:
+            self.client.get(reverse('specialists'), {'page': 1})
+        entry = json.loads(logs.records[0].getMessage())
+        self.assertEqual((entry['url_name'], entry['path'], entry['status']), ('specialists', '/users/specialists/', 200))
+        self.assertGreater(entry['queries'], 0)
+        self.assertEqual(len(entry['worst_queries']), min(entry['queries'], instrumentation.WORST_QUERIES))
+        durations = [query['ms'] for query in entry['worst_queries']]
+        self.assertEqual(durations, sorted(durations, reverse=True))
+
+    @override_settings(SLOW_REQUEST_THRESHOLD_MS=60 * 1000)
+    def test_fast_requests_are_not_logged(self):
+        with self.assertNoLogs('users.slow_requests'):
+            self.client.get(reverse('specialists'))
+
+
+class TrackTests(TestCase):
+
+    def test_nested_blocks_count_once_and_nothing_is_tracked_outside_requests(self):
+        with instrumentation.track('template'):
+            pass  # no request: a no-op
+
+        timings = instrumentation.RequestTimings()
+        token = instrumentation.activate(timings)
+        try:
+            # Only the outer block reads the clock.
+            with mock.patch('users.instrumentation.time.perf_counter', side_effect=[1.0, 1.5]):
+                with instrumentation.track('image'):
+                    with instrumentation.track('image'):
+                        pass
+        finally:
+            instrumentation.deactivate(token)
+        self.assertEqual(timings.ms('image'), 500)
+        self.assertIsNone(instrumentation.current())
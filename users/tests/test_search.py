@@ -0,0 +1,71 @@
+from io import StringIO
+from types import SimpleNamespace
+
+from django.apps import apps
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+
+from users import search, signals
+from users.models import News, PhotographerProfile
+
+
+class StemmerTests(TestCase):
+
+    def test_word_forms_share_a_stem(self):
+        self.assertEqual(search.stem('свадьба'), search.stem('свадьбы'))
+        self.assertEqual(search.stem('Москва'), search.stem('москве'))
+        self.assertEqual(search.stem('съёмка'), search.stem('съемки'))
+
+
+class FullTextSearchTests(TestCase):
+
+    def setUp(self):
+        anna = User.objects.create_user('anna', first_name='Анна', last_name='Смирнова')
+        self.anna = PhotographerProfile.objects.create(
+            user=anna, short_intro='Портретный фотограф', bio='Снимаю портреты в студии.', city='Казань')
+        ivan = User.objects.create_user('ivan', first_name='Иван')
+        self.ivan = PhotographerProfile.objects.create(
+            user=ivan, short_intro='Свадебный фотограф', bio='Снимаю свадьбы в Москве.', city='Москва')
+
+    def test_specialists_search_matches_word_forms(self):
+        response = self.client.get(reverse('specialists'), {'q': 'свадьбу в москве'})
+        self.assertEqual(list(response.context['photographers']), [self.ivan])
+        self.assertContains(response, '<mark>свадьбы</mark>', html=False)
+
+    def test_index_follows_profile_and_name_changes(self):
+        self.anna.bio = 'Теперь снимаю свадьбы.'
+        self.anna.save()
+        self.anna.user.first_name = 'Мария'
+        self.anna.user.save()
+        found = search.search(PhotographerProfile.objects.all(), search.PHOTOGRAPHERS_TABLE, 'мария свадьба')
+        self.assertEqual(list(found), [self.anna])
+
+        self.ivan.delete()
+        found = search.search(PhotographerProfile.objects.all(), search.PHOTOGRAPHERS_TABLE, 'свадьбы')
+        self.assertEqual(list(found), [self.anna])
+
+    def test_news_search_ranks_title_matches_first(self):
+        in_body = News.objects.create(title='Итоги года', content='Лучшие выставки года.')
+        in_title = News.objects.create(title='Новая выставка', content='Открытие в центре.')
+        response = self.client.get(reverse('news'), {'q': 'выставка'})
+        self.assertEqual(list(response.context['news_items']), [in_title, in_body])
+
+    def test_rebuild_command_restores_the_index(self):
+        search.clear(search.PHOTOGRAPHERS_TABLE)
+        call_command('rebuild_search_index', stdout=StringIO())
+        found = search.search(PhotographerProfile.objects.all(), search.PHOTOGRAPHERS_TABLE, 'портрет')
+        self.assertEqual(list(found), [self.anna])
+
+    def test_index_is_filled_after_the_migration_creating_it(self):
+        users = apps.get_app_config('users')
+        search.clear(search.PHOTOGRAPHERS_TABLE)
+        other = SimpleNamespace(app_label='users', name='0017_other')
+        signals.fill_search_index(users, plan=[(other, False)])
+        found = search.search(PhotographerProfile.objects.all(), search.PHOTOGRAPHERS_TABLE, 'портрет')
+        self.assertEqual(list(found), [])
+
+        created = SimpleNamespace(app_label='users', name=signals.SEARCH_INDEX_MIGRATION)
+        signals.fill_search_index(users, plan=[(created, False)])
+        self.assertEqual(list(found.all()), [self.anna])
@@ -0,0 +1,70 @@
+import io
+import unittest
+from contextlib import redirect_stdout
+from types import SimpleNamespace
+from unittest import mock
+
+from django.core.management import CommandError, call_command
+from django.core.servers.basehttp import get_internal_wsgi_application
+from django.template import engines
+from django.test import TestCase
+from django.urls import reverse
+
+from users import cities, server
+
+
+class WarmUpTests(TestCase):
+
+    def setUp(self):
+        cities.invalidate()
+        self.addCleanup(cities.invalidate)
+
+    def test_warm_up_fills_what_first_requests_would(self):
+        loader = engines.all()[0].engine.template_loaders[0]
+        loader.reset()
+        timings = server.warm_up(get_internal_wsgi_application(), [reverse('specialists'), '/missing/'])
+
+        self.assertIn('users/specialists.html', loader.get_template_cache)
+        self.assertIsNotNone(cities._index)
+        self.assertIn(f"GET {reverse('specialists')} (200 OK)", timings)
+        self.assertIn('GET /missing/ (404 Not Found)', timings)
+        self.assertTrue(any(step.startswith('templates (') for step in timings))
+
+
+class GunicornHookTests(TestCase):
+
+    def setUp(self):
+        cities.invalidate()
+        self.addCleanup(cities.invalidate)
+
+    def arbiter(self, warmup_paths):
+        application = get_internal_wsgi_application()
+        app = SimpleNamespace(warmup_paths=warmup_paths, wsgi=lambda: application)
+        return SimpleNamespace(app=app, log=mock.Mock(), LISTENERS=['http://127.0.0.1:8000'])
+
+    def test_when_ready_warms_up_and_announces_the_listener(self):
+        arbiter = self.arbiter([reverse('city_autocomplete')])
+        with mock.patch('users.server.close_connections') as close, redirect_stdout(io.StringIO()) as out:
+            server.when_ready(arbiter)
+        self.assertIsNotNone(cities._index)
+        self.assertIn('GET /users/specialists/cities/ (200 OK)', arbiter.log.info.call_args.args[1])
+        close.assert_called_once_with()
+        self.assertTrue(out.getvalue().startswith(f'{server.READY_MESSAGE} http://127.0.0.1:8000/ '))
+
+    def test_when_ready_without_warm_up(self):
+        arbiter = self.arbiter(None)
+        with mock.patch('users.server.close_connections'), redirect_stdout(io.StringIO()):
+            server.when_ready(arbiter)
+        self.assertIsNone(cities._index)
+        arbiter.log.info.assert_not_called()
+
+    def test_options_preload_the_application(self):
+        options = server.gunicorn_options('::1', 8000, 4, max_requests=1000)
+        self.assertEqual((options['bind'], options['preload_app']), ('[::1]:8000', True))
+        self.assertEqual(options['max_requests_jitter'], 100)
+        self.assertIs(options['when_ready'], server.when_ready)
+
+    @unittest.skipUnless(server.Application is None, 'gunicorn is installed')
+    def test_serve_needs_gunicorn(self):
+        with self.assertRaisesMessage(CommandError, 'gunicorn is not installed'):
+            call_command('serve')
@@ -0,0 +1,138 @@
+import math
+import unittest
+from datetime import timedelta
+from urllib.parse import quote
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from users import pagination, popularity, search
+from users.models import Favorite, Photo, PhotographerProfile, PhotoLike
+from users.views import SPECIALIST_ORDERS
+
+
+class SpecialistOrderTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.profiles = [
+            PhotographerProfile.objects.create(
+                user=User.objects.create_user(f'photographer{i}', first_name=f'Фотограф{i}'),
+                price=price, views_count=views, specialization='wedding',
+            )
+            for i, (price, views) in enumerate([(3000, 10), (1000, 500), (3000, 0), (2000, 40)])
+        ]
+
+    def order(self, **params):
+        response = self.client.get(reverse('specialists'), params)
+        return [p.pk for p in response.context['photographers']]
+
+    def pks(self, *indexes):
+        return [self.profiles[i].pk for i in indexes]
+
+    def test_sort_orders_break_ties_by_pk(self):
+        self.assertEqual(self.order(sort='price'), self.pks(1, 3, 0, 2))
+        self.assertEqual(self.order(sort='price_desc'), self.pks(2, 0, 3, 1))
+        self.assertEqual(self.order(sort='views'), self.pks(1, 3, 0, 2))
+        self.assertEqual(self.order(sort='new'), self.pks(3, 2, 1, 0))
+        # Unknown orders fall back to popularity.
+        self.assertEqual(self.order(sort='bogus'), self.order())
+
+    def test_popularity_job(self):
+        photo = Photo.objects.create(photographer=self.profiles[2], image='photographs/a.jpg', category='wedding')
+        client = User.objects.create_user('client')
+        Favorite.objects.create(user=client, photographer=self.profiles[2])
+        PhotoLike.objects.create(user=client, photo=photo)
+        stale = PhotoLike.objects.create(user=User.objects.create_user('other'), photo=photo)
+        PhotoLike.objects.filter(pk=stale.pk).update(created_at=timezone.now() - timedelta(days=60))
+        updated_at = PhotographerProfile.objects.get(pk=self.profiles[2].pk).updated_at
+
+        self.assertEqual(popularity.update(batch_size=3), 4)
+        profile = PhotographerProfile.objects.get(pk=self.profiles[2].pk)
+        self.assertEqual(profile.popularity, popularity.FAVORITE_WEIGHT + popularity.LIKE_WEIGHT)
+        self.assertEqual(profile.updated_at, updated_at)
+        self.assertAlmostEqual(PhotographerProfile.objects.get(pk=self.profiles[1].pk).popularity, math.log1p(500), 4)
+        self.assertEqual(self.order(), self.pks(1, 3, 2, 0))
+        self.assertEqual(popularity.update(), 0)
+
+    def test_search_keeps_relevance_unless_sorted(self):
+        response = self.client.get(reverse('specialists'), {'q': 'Фотограф1'})
+        self.assertEqual(response.context['sort'], '' if search.is_supported() else 'popular')
+        response = self.client.get(reverse('specialists'), {'q': 'Фотограф', 'sort': 'price'})
+        self.assertEqual(response.context['sort'], 'price')
+
+    def test_sorted_pages_are_read_by_keyset(self):
+        for i in range(30):
+            PhotographerProfile.objects.create(user=User.objects.create_user(f'extra{i}'), price=1000 + i % 3 * 500)
+        expected = list(PhotographerProfile.objects.order_by('price', 'pk').values_list('pk', flat=True))
+
+        pages, params = [], {'sort': 'price'}
+        while True:
+            with CaptureQueriesContext(connection) as queries:
+                page = self.client.get(reverse('specialists'), params).context['photographers']
+            sql = ' '.join(query['sql'] for query in queries)
+            self.assertNotIn('COUNT(', sql)
+            self.assertNotIn('OFFSET', sql)
+            pages.append([p.pk for p in page])
+            if not page.next_cursor:
+                break
+            params = {'sort': 'price', 'after': page.next_cursor}
+        self.assertEqual([pk for page in pages for pk in page], expected)
+        self.assertEqual([len(page) for page in pages], [15, 15, 4])
+
+        response = self.client.get(reverse('specialists'), {'sort': 'price', 'before': page.previous_cursor})
+        back = response.context['photographers']
+        self.assertEqual([p.pk for p in back], pages[1])
+        self.assertContains(response, f'?after={quote(back.next_cursor)}&amp;sort=price')
+        first = self.client.get(reverse('specialists'), {'sort': 'price', 'before': back.previous_cursor})
+        self.assertEqual([p.pk for p in first.context['photographers']], pages[0])
+        self.assertIsNone(first.context['photographers'].previous_cursor)
+        # A broken cursor shows the first page.
+        broken = self.client.get(reverse('specialists'), {'sort': 'price', 'after': 'cheap|1'})
+        self.assertEqual([p.pk for p in broken.context['photographers']], pages[0])
+
+    def test_queries_do_not_grow_with_the_page(self):
+        def queries():
+            with CaptureQueriesContext(connection) as captured:
+                response = self.client.get(reverse('specialists'))
+            return len(captured), len(response.context['photographers'])
+
+        for profile in self.profiles:
+            for i in range(4):
+                Photo.objects.create(photographer=profile, image=f'photographs/{profile.pk}-{i}.jpg')
+        few = queries()
+        for i in range(10):
+            profile = PhotographerProfile.objects.create(user=User.objects.create_user(f'extra{i}', first_name='Ф'))
+            Photo.objects.create(photographer=profile, image=f'photographs/extra{i}.jpg')
+        many = queries()
+        self.assertEqual((few[1], many[1]), (4, 14))
+        self.assertEqual(few[0], many[0])
+
+        response = self.client.get(reverse('specialists'))
+        newest = Photo.objects.filter(photographer=self.profiles[0]).order_by('-uploaded_at', '-pk')[:3]
+        card = next(p for p in response.context['photographers'] if p.pk == self.profiles[0].pk)
+        self.assertEqual(card.preview_photos, list(newest))
+
+    @unittest.skipUnless(connection.vendor == 'sqlite', "EXPLAIN QUERY PLAN is SQLite's")
+    def plan(self, queryset):
+        sql, params = queryset.query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+            return ' / '.join(row[-1] for row in cursor.fetchall())
+
+    def test_orders_are_read_off_an_index(self):
+        visible = PhotographerProfile.objects.filter(user__is_active=True)
+        for key, (_, order_by) in SPECIALIST_ORDERS.items():
+            after = [1] * len(order_by)
+            for queryset in (visible, visible.filter(specialization='wedding'), visible.filter(city_ref_id=1)):
+                first_page = self.plan(queryset.order_by(*order_by)[:16])
+                self.assertNotIn('TEMP B-TREE', first_page, key)
+                next_page = self.plan(queryset.filter(pagination.beyond(order_by, after)).order_by(*order_by)[:16])
+                self.assertNotIn('TEMP B-TREE', next_page, key)
+                # A seek to the cursor, not a scan from the first row.
+                self.assertTrue(next_page.startswith('SEARCH users_photographerprofile'), next_page)
@@ -0,0 +1,94 @@
+import gzip
+import shutil
+import tempfile
+from pathlib import Path
+
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.files.base import ContentFile
+from django.core.management import call_command
+from django.template import Context, Template
+from django.test import SimpleTestCase, override_settings
+from PIL import Image
+
+from users import static_serve
+
+CSS = '/* header */\nbody {\n    color : red;\n    margin: 0 auto;\n}\n.a :hover { color: blue }\n' + '.a { padding: 1px; }\n' * 40
+
+
+class StaticPipelineTests(SimpleTestCase):
+
+    def setUp(self):
+        source = Path(tempfile.mkdtemp())
+        root = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, source, ignore_errors=True)
+        self.addCleanup(shutil.rmtree, root, ignore_errors=True)
+        (source / 'site.css').write_text(CSS)
+        (source / 'img').mkdir()
+        Image.new('RGB', (1000, 500), 'purple').save(source / 'img' / 'hero.jpg')
+
+        override = override_settings(
+            DEBUG=False,
+            STATICFILES_DIRS=[source],
+            STATIC_ROOT=root,
+            STATIC_RESPONSIVE_IMAGES=['img/*.jpg'],
+            STATIC_RESPONSIVE_WIDTHS=[400, 2000],
+        )
+        override.enable()
+        self.addCleanup(override.disable)
+        static_serve.hashed_names.cache_clear()
+        self.addCleanup(static_serve.hashed_names.cache_clear)
+        call_command('collectstatic', interactive=False, verbosity=0)
+        staticfiles_storage.load_manifest()
+        self.root = root
+
+    def test_css_is_hashed_minified_and_precompressed(self):
+        hashed = staticfiles_storage.stored_name('site.css')
+        self.assertNotEqual(hashed, 'site.css')
+        minified = (self.root / hashed).read_text()
+        self.assertIn('body{color:red;margin:0 auto}', minified)
+        self.assertIn('.a :hover{color:blue}', minified)
+        self.assertNotIn('header', minified)
+        # The name is the hash of the minified content, not of the source.
+        self.assertEqual(hashed, staticfiles_storage.hashed_name('site.css', ContentFile(minified.encode())))
+        self.assertEqual(gzip.decompress((self.root / f'{hashed}.gz').read_bytes()).decode(), minified)
+
+    def test_responsive_renditions_are_recorded_in_the_manifest(self):
+        html = Template(
+            '{% load user_filters %}{% responsive_static "img/hero.jpg" 400 %} {% responsive_static "img/hero.jpg" 2000 %}'
+        ).render(Context())
+        small, large = html.split()
+        self.assertRegex(small, r'^/static/img/hero\.\w+-400w\.jpg$')
+        with Image.open(self.root / small.removeprefix('/static/')) as image:
+            self.assertEqual(image.size, (400, 200))
+        # No upscaling: wider than the original falls back to the original.
+        self.assertEqual(large, staticfiles_storage.url('img/hero.jpg'))
+
+    def test_serving_negotiates_encoding_and_caches_hashed_names(self):
+        hashed = staticfiles_storage.stored_name('site.css')
+        response = self.client.get(f'/static/{hashed}', HTTP_ACCEPT_ENCODING='gzip, deflate')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(response['Content-Type'], 'text/css')
+        self.assertIn('Accept-Encoding', response['Vary'])
+        self.assertIn('immutable', response['Cache-Control'])
+
+        response = self.client.get('/static/site.css')
+        self.assertFalse(response.has_header('Content-Encoding'))
+        self.assertNotIn('immutable', response['Cache-Control'])
+        self.assertEqual(self.client.get('/static/missing.css').status_code, 404)
+
+    def test_serving_honours_q_values(self):
+        hashed = staticfiles_storage.stored_name('site.css')
+        for accepted, encoding in [('gzip;q=0, deflate', None), ('x-gzip, gzip ; q=0.5', 'gzip'),
+                                   ('*;q=0.1', 'gzip'), ('gzip;q=0, *', None)]:
+            response = self.client.get(f'/static/{hashed}', HTTP_ACCEPT_ENCODING=accepted)
+            self.assertEqual(response.get('Content-Encoding'), encoding, accepted)
+
+
+class AcceptEncodingTests(SimpleTestCase):
+
+    def test_preferred_encoding(self):
+        self.assertEqual(static_serve.preferred_encoding('gzip, br', ['br', 'gzip']), 'br')
+        self.assertEqual(static_serve.preferred_encoding('br;q=0.5, gzip;q=0.8', ['br', 'gzip']), 'gzip')
+        self.assertEqual(static_serve.preferred_encoding('br;q=0, GZIP', ['br', 'gzip']), 'gzip')
+        self.assertEqual(static_serve.preferred_encoding('br;q=oops', ['br']), None)
+        self.assertEqual(static_serve.preferred_encoding('', ['br', 'gzip']), None)
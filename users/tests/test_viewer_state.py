@@ -0,0 +1,60 @@
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from users.models import Favorite, Photo, PhotographerProfile, PhotoLike
+from users.views import viewer_state_for
+
+
+class SharedPortfolioTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        photographer = User.objects.create_user('photographer')
+        self.profile = PhotographerProfile.objects.create(user=photographer, short_intro='Фотограф', bio='О себе')
+        self.photos = [
+            Photo.objects.create(photographer=self.profile, image=f'photographs/{i}.jpg', category=category)
+            for i, category in enumerate(['wedding', 'portrait', 'portrait'])
+        ]
+        self.viewer = User.objects.create_user('client')
+        self.url = reverse('photographer_detail', args=[self.profile.pk])
+
+    def test_portfolio_html_is_the_same_for_every_viewer(self):
+        anonymous = self.client.get(self.url).context['portfolio']
+        PhotoLike.objects.create(user=self.viewer, photo=self.photos[0])
+        self.client.force_login(self.viewer)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.url)
+        self.assertEqual(response.context['portfolio'], anonymous)
+        # Rendered from the cache: no photo rows and no like lookups.
+        self.assertFalse([q for q in queries if 'users_photolike' in q['sql'] or '"users_photo"."image"' in q['sql']])
+        self.assertContains(response, reverse('viewer_state'))
+
+    def test_new_photo_renders_a_new_portfolio(self):
+        before = self.client.get(self.url).context['portfolio']
+        Photo.objects.create(photographer=self.profile, image='photographs/new.jpg', category='fashion')
+        after = self.client.get(self.url).context['portfolio']
+        self.assertNotEqual(before, after)
+        self.assertIn('photographs/new.jpg', after)
+
+    def test_state_comes_from_one_query(self):
+        PhotoLike.objects.create(user=self.viewer, photo=self.photos[1])
+        Favorite.objects.create(user=self.viewer, photographer=self.profile)
+        photo_ids = [photo.pk for photo in self.photos]
+        with self.assertNumQueries(1):
+            liked, favorites = viewer_state_for(self.viewer, photo_ids, [self.profile.pk])
+        self.assertEqual((liked, favorites), ([self.photos[1].pk], [self.profile.pk]))
+
+    def test_state_endpoint(self):
+        PhotoLike.objects.create(user=self.viewer, photo=self.photos[2])
+        query = {'photos': ','.join(str(photo.pk) for photo in self.photos), 'photographers': str(self.profile.pk)}
+        self.assertEqual(self.client.get(reverse('viewer_state'), query).json(), {'liked': [], 'favorites': []})
+
+        self.client.force_login(self.viewer)
+        response = self.client.get(reverse('viewer_state'), query)
+        self.assertEqual(response.json(), {'liked': [self.photos[2].pk], 'favorites': []})
+        self.assertIn('private', response['Cache-Control'])
+        self.assertEqual(self.client.get(reverse('viewer_state'), {'photos': 'x'}).status_code, 400)
@@ -0,0 +1,13 @@
+"""Helpers shared by the test modules."""
+from pathlib import Path
+
+from django.conf import settings
+from PIL import Image
+
+
+def media_file(name):
+    """Write a tiny JPEG under MEDIA_ROOT and return its storage name."""
+    path = Path(settings.MEDIA_ROOT) / name
+    path.parent.mkdir(parents=True, exist_ok=True)
+    Image.new('RGB', (8, 8), (224, 187, 216)).save(path, format='JPEG')
+    return name
@@ -0,0 +1,95 @@
+"""
+Small JPEG renditions of uploaded images.
+
+A rendition of ``photographs/a.png`` at 120x120 is stored next to the
+other media as ``thumbs/120x120/photographs/a.png.jpg``; the source name is
+kept whole, so ``a.png`` and ``a.jpg`` do not share a rendition. Once a
+rendition exists, its stored name is remembered in the cache, so a page
+with a hundred thumbnails does not stat a hundred files.
+
+Uploads make the ``DEFAULT_SIZE`` rendition of a photo right away, and the
+``make_thumbnails`` command makes the missing ones of older images. Pages
+that list many images (the admin) ask for existing renditions only
+(``make=False``) and show a placeholder for the others; that a rendition is
+missing is remembered for ``MISSING_TIMEOUT``.
+"""
+from io import BytesIO
+
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from PIL import Image
+
+THUMBS_DIR = 'thumbs'
+DEFAULT_SIZE = (120, 120)
+CACHE_TIMEOUT = 24 * 60 * 60
+MISSING = ''
+MISSING_TIMEOUT = 5 * 60
+
+
+RENDITION_SUFFIX = '.jpg'
+
+
+def thumbnail_name(name, size):
+    width, height = size
+    return f'{THUMBS_DIR}/{width}x{height}/{name}{RENDITION_SUFFIX}'
+
+
+def source_name(rendition):
+    """Name of the image ``rendition`` (relative to its ``thumbs/<size>/`` directory) was made from."""
+    return rendition[:-len(RENDITION_SUFFIX)] if rendition.endswith(RENDITION_SUFFIX) else None
+
+
+def cache_key(rendition):
+    return f'rendition:{rendition}'
+
+
+def thumbnail_url(field, size=DEFAULT_SIZE, make=True):
+    """URL of a rendition of ``field`` that fits in ``size``, or '' when the image is missing or broken.
+
+    With ``make=False`` a rendition that does not exist yet is not made either: '' as well.
+    """
+    if not field:
+        return ''
+    name = thumbnail_name(field.name, size)
+    storage = field.storage
+    key = cache_key(name)
+    saved = cache.get(key)
+    if saved is None or (saved == MISSING and make):
+        saved = name
+        if not storage.exists(name):
+            if not make:
+                cache.set(key, MISSING, MISSING_TIMEOUT)
+                return ''
+            try:
+                with field.storage.open(field.name, 'rb') as source:
+                    image = Image.open(source)
+                    image.thumbnail(size)
+                    if image.mode != 'RGB':
+                        image = image.convert('RGB')
+                    output = BytesIO()
+                    image.save(output, format='JPEG', quality=75, optimize=True)
+            except (OSError, ValueError):
+                return ''
+            saved = storage.save(name, ContentFile(output.getvalue()))
+            if saved != name and storage.exists(name):
+                # A concurrent request saved this rendition first; keep one copy.
+                storage.delete(saved)
+                saved = name
+        cache.set(key, saved, CACHE_TIMEOUT)
+    return storage.url(saved) if saved != MISSING else ''
+
+
+def delete_renditions(storage, name):
+    """Remove every rendition of ``name``, whatever its size."""
+    try:
+        sizes, _ = storage.listdir(THUMBS_DIR)
+    except (FileNotFoundError, NotImplementedError):
+        return 0
+    deleted = 0
+    for size in sizes:
+        rendition = thumbnail_name(name, tuple(size.split('x')))
+        if storage.exists(rendition):
+            storage.delete(rendition)
+            deleted += 1
+        cache.delete(cache_key(rendition))
+    return deleted
@@ -1,17 +1,31 @@
 from django.urls import path, include
 from . import views
+from .feeds import LatestNewsFeed, LatestNewsAtomFeed
 
 urlpatterns = [
     path('register/', views.register, name='register'),
     path('specialists/', views.specialists, name='specialists'),
+    path('specialists/cities/', views.city_autocomplete, name='city_autocomplete'),
+    path('specialists/prices/', views.price_histogram, name='price_histogram'),
     path('specialists/<int:pk>/', views.photographer_detail, name='photographer_detail'),
     path('specialists/<int:pk>/favorite/', views.toggle_favorite, name='toggle_favorite'),
     path('news/', views.news, name='news'),
     path('news/<int:pk>/', views.news_detail, name='news_detail'),
+    path('news/rss/', views.news_feed, {'feed_class': LatestNewsFeed}, name='news_feed_rss'),
+    path('news/atom/', views.news_feed, {'feed_class': LatestNewsAtomFeed}, name='news_feed_atom'),
     path('photo/<int:pk>/like/', views.toggle_photo_like, name='toggle_photo_like'),
+    path('viewer-state/', views.viewer_state, name='viewer_state'),
     path('gallery/', views.gallery, name='gallery'),
     path('dashboard/', views.dashboard, name='dashboard'),
+    path('bookings/received/', views.booking_inbox, {'box': 'received'}, name='booking_inbox_received'),
+    path('bookings/sent/', views.booking_inbox, {'box': 'sent'}, name='booking_inbox_sent'),
+    path('bookings/received/bulk/', views.booking_bulk, {'box': 'received'}, name='booking_bulk_received'),
+    path('bookings/sent/bulk/', views.booking_bulk, {'box': 'sent'}, name='booking_bulk_sent'),
     path('profile/delete-image/', views.delete_profile_image, name='delete_profile_image'),
+    path('dashboard/photos/upload/', views.photo_upload_start, name='photo_upload_start'),
+    path('dashboard/photos/upload/complete/', views.photo_upload_complete, name='photo_upload_complete'),
+    path('dashboard/photos/uploads/', views.chunked_upload_create, name='chunked_upload_create'),
+    path('dashboard/photos/uploads/<uuid:pk>/', views.chunked_upload, name='chunked_upload'),
     path('', include('django.contrib.auth.urls')),
 ]
 
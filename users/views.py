@@ -2,27 +2,41 @@ from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth import login, logout
 from django.contrib.auth.decorators import login_required
 from .forms import UserRegistrationForm, PhotographerProfileForm, PhotoUploadForm, BookingRequestForm, ClientProfileForm, SupportRequestForm
-from .models import PhotographerProfile, Photo, News, BookingRequest, Favorite, ClientProfile, PhotoLike, SupportRequest, ProfileView, SPECIALIZATION_CHOICES
+from .models import PhotographerProfile, Photo, News, BookingRequest, Favorite, ClientProfile, PhotoLike, SupportRequest, ChunkedUpload, PriceBucket, SPECIALIZATION_CHOICES
 import random
-from django.http import JsonResponse
+import hashlib
+from django.http import JsonResponse, HttpResponse
 from django.template.loader import render_to_string
-from django.db.models import Q, Count, Exists, OuterRef
+from django.db.models import Q, Count, Max, Prefetch
 from django.core.paginator import Paginator, EmptyPage, PageNotAnInteger
 from django.contrib.auth.forms import PasswordChangeForm
 from django.utils import timezone
 from datetime import timedelta
 from django.contrib.auth import update_session_auth_hash
 from django.contrib import messages
+from django.utils.html import strip_tags
+from django.core.cache import cache
+from django.db import transaction
+from django.urls import reverse
+from django.utils.cache import patch_cache_control, patch_vary_headers, quote_etag
+from django.utils.safestring import mark_safe
+from django.utils.http import urlencode
+from .profile_views import register_view, daily_views
+from .conditional import conditional_response, with_validators
+from .gallery import version as gallery_version
+from .thumbnails import thumbnail_url
+from . import bookings, chunked_uploads, cities, direct_uploads, memberships, notifications, pagination, purge, recommendations, search
 
 def home(request):
     one_week_ago = timezone.now() - timedelta(days=7)
     
-    best_photos = Photo.objects.annotate(
+    visible = Photo.objects.filter(photographer__user__is_active=True)
+    best_photos = visible.annotate(
         recent_likes_count=Count('likes', filter=Q(likes__created_at__gte=one_week_ago))
     ).filter(recent_likes_count__gt=0).order_by('-recent_likes_count')[:6]
     
     if not best_photos:
-        all_photos = list(Photo.objects.all())
+        all_photos = list(visible)
         best_photos = random.sample(all_photos, min(len(all_photos), 6))
     
     specializations = SPECIALIZATION_CHOICES
@@ -76,8 +90,7 @@ def dashboard(request):
     p_form = None
     photo_form = None
     photos = []
-    received_active_bookings = []
-    received_completed_bookings = []
+    views_chart = []
     
     # Forms for client
     client_form = None
@@ -98,16 +111,14 @@ def dashboard(request):
         p_form = PhotographerProfileForm(instance=profile)
         photo_form = PhotoUploadForm()
         photos = profile.photos.all().order_by('-uploaded_at')
-        all_received = BookingRequest.objects.filter(photographer=profile, is_deleted_by_photographer=False).order_by('-created_at')
-        received_active_bookings = all_received.exclude(status='completed')
-        received_completed_bookings = all_received.filter(status='completed')
+        received = inbox_sections(request.user, 'received')
+        views_chart = daily_views(profile)
     else:
         client_form = ClientProfileForm(instance=client_profile)
+        received = None
 
     # Common data
-    all_sent = BookingRequest.objects.filter(client=request.user, is_deleted_by_client=False).order_by('-created_at')
-    sent_active_bookings = all_sent.exclude(status='completed')
-    sent_completed_bookings = all_sent.filter(status='completed')
+    sent = inbox_sections(request.user, 'sent')
     
     favorites = Favorite.objects.filter(user=request.user)
 
@@ -149,7 +160,9 @@ def dashboard(request):
                     support_request = SupportRequest.objects.get(id=request_id)
                     support_request.admin_response = admin_response
                     support_request.status = 'resolved'
-                    support_request.save()
+                    with transaction.atomic():
+                        support_request.save()
+                        notifications.support_replied(support_request)
                     messages.success(request, f'Ответ пользователю {support_request.user.username} отправлен. Обращение обработано.')
                 except SupportRequest.DoesNotExist:
                     messages.error(request, 'Обращение не найдено.')
@@ -175,88 +188,37 @@ def dashboard(request):
 
         # Handle Account Deletion
         elif 'delete_account' in request.POST:
-            user = request.user
-    
-            user.delete()
+            # Deactivated right away; rows and media go in batches in
+            # `manage.py purge_accounts`.
+            purge.request_purge(request.user)
             logout(request)
             messages.success(request, 'Ваш аккаунт был успешно удален.')
             return redirect('home')
 
         # Handle Booking Status Update
         elif 'update_booking_status' in request.POST:
-            booking_id = request.POST.get('booking_id')
-            new_status = request.POST.get('status')
-            booking = get_object_or_404(BookingRequest, id=booking_id, photographer=profile)
-            booking.status = new_status
-            booking.save()
-            messages.success(request, 'Статус заявки обновлен.')
+            booking = bookings.owned(request.user, 'received').filter(pk=request.POST.get('booking_id'))
+            if bookings.change_status(booking, request.POST.get('status'), notify='client'):
+                messages.success(request, 'Статус заявки обновлен.')
+            else:
+                messages.error(request, 'Такая смена статуса недоступна.')
             return redirect('dashboard')
         
-        # Handle Booking Cancellation
+        # Handle Booking Cancellation: active bookings are cancelled, finished
+        # ones are archived from the user's list (and deleted once both sides
+        # have archived them).
         elif 'cancel_booking' in request.POST:
             booking_id = request.POST.get('booking_id')
-            # Check if user is client OR photographer involved in this booking
-            try:
-                if is_photographer:
-                    booking = BookingRequest.objects.get(id=booking_id, photographer=profile)
-                    
-                    # If status is completed or cancelled -> Soft delete for photographer
-                    if booking.status == 'completed' or booking.status == 'cancelled':
-                         booking.is_deleted_by_photographer = True
-                         booking.save()
-                         
-                         # Check if both deleted, then actually delete
-                         if booking.is_deleted_by_client and booking.is_deleted_by_photographer:
-                             booking.delete()
-                             
-                         messages.success(request, 'Заявка удалена из вашего списка.')
-                         return redirect('dashboard')
-                         
-                    # If active -> Set status to cancelled
-                    if booking.status != 'cancelled' and booking.status != 'completed':
-                        booking.status = 'cancelled'
-                        booking.save()
-                        messages.success(request, 'Заявка отменена. Клиент получит уведомление.')
-                        return redirect('dashboard')
-                        
-                else:
-                    booking = BookingRequest.objects.get(id=booking_id, client=request.user)
-                    
-                    # If status is completed or cancelled -> Soft delete for client
-                    if booking.status == 'completed' or booking.status == 'cancelled':
-                         booking.is_deleted_by_client = True
-                         booking.save()
-                         
-                         # Check if both deleted, then actually delete
-                         if booking.is_deleted_by_client and booking.is_deleted_by_photographer:
-                             booking.delete()
-                             
-                         messages.success(request, 'Заявка удалена из вашего списка.')
-                         return redirect('dashboard')
-                    
-                    # For active client bookings, we can default to delete or cancel?
-                    # User said previously: "Сейчас после отмены... давай она будет автоматически удаляться"
-                    # But now we have soft delete.
-                    # If client cancels active booking:
-                    # Option 1: Just delete (hard delete) - easiest for "I don't want this anymore"
-                    # Option 2: Set status to cancelled?
-                    # Let's stick to previous logic: Delete. But now we have flags.
-                    # If we hard delete, it disappears for photographer too.
-                    # Maybe better to set status=cancelled AND soft delete for client?
-                    # But the requirement was "automcatically delete".
-                    # Let's keep hard delete for active client cancellation for now as per previous instruction,
-                    # UNLESS it's completed/cancelled which we handled above.
-                    
-                    pass # Go to default delete below
-
-            except BookingRequest.DoesNotExist:
-                # Fallback: maybe photographer acting as client? 
-                # Or just general check
-                booking = get_object_or_404(BookingRequest, Q(id=booking_id) & (Q(client=request.user) | Q(photographer__user=request.user)))
-            
-            # Default action for fallback (hard delete)
-            booking.delete()
-            messages.success(request, 'Заявка удалена.')
+            for box in ('received', 'sent'):
+                booking = bookings.owned(request.user, box).filter(pk=booking_id)
+                if bookings.perform('cancel', box, booking):
+                    messages.success(request, 'Заявка отменена.')
+                    break
+                if bookings.perform('archive', box, booking):
+                    messages.success(request, 'Заявка удалена из вашего списка.')
+                    break
+            else:
+                messages.error(request, 'Заявка не найдена.')
             return redirect('dashboard')
 
         if is_photographer:
@@ -264,7 +226,9 @@ def dashboard(request):
             if 'update_profile' in request.POST:
                 p_form = PhotographerProfileForm(request.POST, request.FILES, instance=profile)
                 if p_form.is_valid():
-                    p_form.save()
+                    profile = p_form.save()
+                    if 'profile_image' in p_form.changed_data:
+                        thumbnail_url(profile.profile_image)
                     messages.success(request, 'Профиль обновлен.')
                     return redirect('dashboard')
             
@@ -275,7 +239,8 @@ def dashboard(request):
                     images = request.FILES.getlist('image')
                     category = photo_form.cleaned_data['category']
                     for img in images:
-                        Photo.objects.create(photographer=profile, image=img, category=category)
+                        photo = Photo.objects.create(photographer=profile, image=img, category=category)
+                        thumbnail_url(photo.image)
                     
                     count = len(images)
                     if count > 0:
@@ -299,12 +264,8 @@ def dashboard(request):
         'photo_form': photo_form,
         'photos': photos,
         'password_form': password_form,
-        'received_bookings': received_active_bookings, # Backward compatibility if needed, but we'll use new names in template
-        'received_active_bookings': received_active_bookings,
-        'received_completed_bookings': received_completed_bookings,
-        'sent_bookings': sent_active_bookings, # Backward compatibility
-        'sent_active_bookings': sent_active_bookings,
-        'sent_completed_bookings': sent_completed_bookings,
+        'received': received,
+        'sent': sent,
         'favorites': favorites,
         'client_form': client_form,
         'client_profile': client_profile,
@@ -312,10 +273,111 @@ def dashboard(request):
         'my_support_requests': my_support_requests,
         'admin_support_requests': admin_support_requests,
         'admin_new_requests_count': admin_new_requests_count,
+        'views_chart': views_chart,
+        'direct_upload': is_photographer and direct_uploads.is_available(),
     })
 
+def inbox_sections(user, box):
+    """First page of the active and completed sections of an inbox, with counts from BookingCounter."""
+    counts = bookings.counts(user, box)
+    sections = {'counts': counts, 'total': sum(counts.values())}
+    for section, statuses in (('active', bookings.ACTIVE_STATUSES), ('completed', bookings.COMPLETED_STATUSES)):
+        items, cursor = bookings.page(bookings.inbox(user, box, statuses))
+        next_url = None
+        if cursor:
+            next_url = reverse(f'booking_inbox_{box}') + '?' + urlencode(
+                {'status': ','.join(statuses), 'before': cursor, 'html': 1}
+            )
+        sections[section] = {
+            'bookings': items,
+            'count': sum(counts[status] for status in statuses),
+            'next': next_url,
+        }
+    return sections
+
+@login_required
+def booking_inbox(request, box):
+    """A page of the user's received or sent bookings as JSON, newest first.
+
+    ``status`` filters by a comma-separated list of statuses, ``limit`` sets
+    the page size and ``before`` is the cursor from ``next`` of the previous
+    page. With ``html=1`` the rendered booking cards are included as well.
+    """
+    if box == 'received' and not PhotographerProfile.objects.filter(user=request.user).exists():
+        return JsonResponse({'error': 'Входящие заявки есть только у фотографов.'}, status=403)
+    try:
+        statuses = bookings.parse_statuses(request.GET.get('status'))
+        before = bookings.parse_cursor(request.GET['before']) if request.GET.get('before') else None
+        limit = min(int(request.GET.get('limit', bookings.PAGE_SIZE)), bookings.MAX_PAGE_SIZE)
+    except ValueError as error:
+        return JsonResponse({'error': str(error)}, status=400)
+    if limit < 1:
+        return JsonResponse({'error': 'limit must be positive'}, status=400)
+
+    items, cursor = bookings.page(bookings.inbox(request.user, box, statuses), before, limit)
+    next_url = None
+    if cursor:
+        params = request.GET.copy()
+        params['before'] = cursor
+        next_url = f'{request.path}?{params.urlencode()}'
+    data = {
+        'results': [bookings.as_json(booking, box) for booking in items],
+        'counts': bookings.counts(request.user, box),
+        'next': next_url,
+    }
+    if request.GET.get('html'):
+        data['html'] = render_to_string('users/booking_cards.html', {'bookings': items, 'box': box}, request=request)
+    return JsonResponse(data)
+
+@login_required
+def booking_bulk(request, box):
+    """Apply one state-machine action to many bookings of the user's ``box`` at once.
+
+    POST ``action`` (start, complete, cancel or archive) and select the
+    bookings with ``ids`` (repeated), ``status`` (comma-separated) or both.
+    Answers JSON to AJAX requests and redirects to the dashboard otherwise.
+    """
+    if request.method != 'POST':
+        return JsonResponse({'error': 'POST required'}, status=405)
+    action = request.POST.get('action')
+    ids = request.POST.getlist('ids')
+    try:
+        statuses = bookings.parse_statuses(request.POST.get('status'))
+        if action not in bookings.BOX_ACTIONS[box]:
+            raise ValueError(f'Unknown action: {action}')
+        if not ids and not statuses:
+            raise ValueError('Select bookings with ids or status')
+        if not all(pk.isdigit() for pk in ids):
+            raise ValueError('ids must be integers')
+    except ValueError as error:
+        return JsonResponse({'error': str(error)}, status=400)
+
+    selected = bookings.owned(request.user, box)
+    if ids:
+        selected = selected.filter(pk__in=ids)
+    if statuses:
+        selected = selected.filter(status__in=statuses)
+    changed = bookings.perform(action, box, selected)
+
+    if request.headers.get('x-requested-with') == 'XMLHttpRequest':
+        return JsonResponse({'changed': changed, 'counts': bookings.counts(request.user, box)})
+    messages.success(request, f'Обработано заявок: {changed}.')
+    return redirect(reverse('dashboard') + '?tab=bookings')
+
+# Sort orders of the specialists catalog: key: (label, ORDER BY). Each is
+# read straight off an index of PhotographerProfile, the pk breaking ties.
+SPECIALIST_ORDERS = {
+    'popular': ('Популярные', ('-popularity', '-pk')),
+    'price': ('Сначала дешевле', ('price', 'pk')),
+    'price_desc': ('Сначала дороже', ('-price', '-pk')),
+    'views': ('Больше просмотров', ('-views_count', '-pk')),
+    'new': ('Новые', ('-pk',)),
+}
+DEFAULT_SPECIALIST_ORDER = 'popular'
+
+
 def specialists(request):
-    photographers = PhotographerProfile.objects.all()
+    photographers = PhotographerProfile.objects.filter(user__is_active=True)
 
     # Filtering
     specialization = request.GET.get('specialization')
@@ -323,6 +385,10 @@ def specialists(request):
     price_max = request.GET.get('price_max')
     city = request.GET.get('city')
     language = request.GET.get('language')
+    query = request.GET.get('q', '').strip()
+    sort = request.GET.get('sort')
+    if sort not in SPECIALIST_ORDERS:
+        sort = None
 
     if specialization and specialization != 'any':
         photographers = photographers.filter(specialization=specialization)
@@ -331,7 +397,7 @@ def specialists(request):
         photographers = photographers.filter(language=language)
 
     if city:
-        photographers = photographers.filter(city__icontains=city)
+        photographers = cities.filter_by_city(photographers, city)
 
     if price_min:
         try:
@@ -345,61 +411,150 @@ def specialists(request):
         except ValueError:
             pass
 
-    # Annotate favorites
-    if request.user.is_authenticated:
-        favorite_ids = Favorite.objects.filter(user=request.user).values_list('photographer_id', flat=True)
-        for p in photographers:
-            p.is_favorite = p.id in favorite_ids
+    by_relevance = False
+    if query:
+        found = search.search(photographers, search.PHOTOGRAPHERS_TABLE, query)
+        if found is None:
+            found = photographers.filter(
+                Q(user__first_name__icontains=query) | Q(user__last_name__icontains=query) |
+                Q(short_intro__icontains=query) | Q(bio__icontains=query)
+            )
+        else:
+            by_relevance = not sort
+        photographers = found
 
-    # Pagination
-    page = request.GET.get('page', 1)
-    paginator = Paginator(photographers, 15)
-    
-    try:
-        photographers_page = paginator.page(page)
-    except PageNotAnInteger:
-        photographers_page = paginator.page(1)
-    except EmptyPage:
-        photographers_page = paginator.page(paginator.num_pages)
+    # The cards show the name and the three newest photos: fetched for the whole page at once.
+    photographers = photographers.select_related('user').prefetch_related(
+        Prefetch('photos', queryset=Photo.objects.order_by('-uploaded_at', '-pk')[:3], to_attr='preview_photos'),
+    )
+
+    # Pagination: sorted listings by keyset, relevance-ranked search results by page number.
+    if by_relevance:
+        page = request.GET.get('page', 1)
+        paginator = Paginator(photographers, 15)
+
+        try:
+            photographers_page = paginator.page(page)
+        except PageNotAnInteger:
+            photographers_page = paginator.page(1)
+        except EmptyPage:
+            photographers_page = paginator.page(paginator.num_pages)
+    else:
+        order_by = SPECIALIST_ORDERS[sort or DEFAULT_SPECIALIST_ORDER][1]
+        cursors = {}
+        for direction in ('after', 'before'):
+            if request.GET.get(direction):
+                try:
+                    cursors[direction] = pagination.parse_cursor(PhotographerProfile, order_by, request.GET[direction])
+                except ValueError:
+                    pass
+        photographers_page = pagination.keyset_page(photographers, order_by, 15, **cursors)
+
+    favorite_ids = memberships.favorites(request.user)
+    for p in photographers_page:
+        p.is_favorite = p.pk in favorite_ids
+        if query:
+            p.search_snippet = search.highlight(f'{p.short_intro}. {p.bio}', query)
 
     if request.headers.get('x-requested-with') == 'XMLHttpRequest':
         html = render_to_string('users/specialists_list.html', {'photographers': photographers_page, 'user': request.user}, request=request)
         return JsonResponse({'html': html})
 
-    return render(request, 'users/specialists.html', {'photographers': photographers_page})
+    return render(request, 'users/specialists.html', {
+        'photographers': photographers_page,
+        'sort_orders': [(key, label) for key, (label, _) in SPECIALIST_ORDERS.items()],
+        'sort': '' if by_relevance else sort or DEFAULT_SPECIALIST_ORDER,
+    })
+
 
+def city_autocomplete(request):
+    """Known cities starting with ``q``, the ones with most photographers first."""
+    response = JsonResponse({'cities': cities.suggest(request.GET.get('q', '')[:100])})
+    patch_cache_control(response, public=True, max_age=5 * 60)
+    return response
+
+
+def price_histogram(request):
+    """Photographers per price bucket and price percentiles for the catalog's price filter.
+
+    Read from the stored ``PriceBucket`` histograms: one indexed query, no
+    aggregate over the profiles. An unknown city gets the histogram of all cities.
+    """
+    specialization = request.GET.get('specialization', '')
+    if specialization not in dict(SPECIALIZATION_CHOICES):
+        specialization = ''
+    city_id = cities.index().by_key.get(cities.normalize(request.GET.get('city', '')), 0)
+    histogram = PriceBucket.histogram(specialization, city_id)
+    width, highest = PriceBucket.width(), PriceBucket.highest()
+    response = JsonResponse({
+        'width': width,
+        'buckets': [
+            {'from': bucket, 'to': None if bucket >= highest else bucket + width, 'count': count}
+            for bucket, count in histogram
+        ],
+        'total': sum(count for _, count in histogram),
+        'percentiles': PriceBucket.percentiles(histogram),
+        'city': bool(city_id),
+    })
+    patch_cache_control(response, public=True, max_age=60)
+    return response
+
+
+PORTFOLIO_CACHE_TIMEOUT = 10 * 60
+MAX_STATE_IDS = 500
+
+
+def portfolio_version(photographer):
+    """Version of the shared part of a photographer page (bio and portfolio), from one aggregate.
+
+    The count catches deleted photos, the latest ``updated_at`` new and edited ones.
+    """
+    photos = Photo.objects.filter(photographer=photographer).aggregate(count=Count('pk'), last=Max('updated_at'))
+    parts = [photographer.pk, photographer.updated_at, photos['count'], photos['last']]
+    return hashlib.md5(':'.join(map(str, parts)).encode()).hexdigest()
+
+def portfolio_etag(request, photographer, version, similar):
+    """ETag of a photographer page.
+
+    Only an ETag is sent: deleting a photo does not move any timestamp
+    forward, so Last-Modified alone could serve a stale page. Likes and
+    favorites are not part of the page (see ``viewer_state``), so they do
+    not change it either.
+    """
+    parts = [version, photographer.views_count, photographer.user.get_full_name(), request.user.pk,
+             *(p.pk for p in similar)]
+    return quote_etag(hashlib.md5(':'.join(map(str, parts)).encode()).hexdigest())
+
+def portfolio_section(photographer, version):
+    """Bio and portfolio HTML, the same for every viewer, rendered once per version."""
+    key = f'portfolio:{photographer.pk}:{version}'
+    html = cache.get(key)
+    if html is None:
+        photos = list(photographer.photos.order_by('-uploaded_at'))
+        used_categories = {photo.category for photo in photos}
+        html = render_to_string('users/portfolio_section.html', {
+            'photographer': photographer,
+            'photos': photos,
+            'specialization_choices': [
+                (code, name) for code, name in SPECIALIZATION_CHOICES if code in used_categories
+            ],
+        })
+        cache.set(key, html, PORTFOLIO_CACHE_TIMEOUT)
+    return mark_safe(html)
 
 def photographer_detail(request, pk):
-    photographer = get_object_or_404(PhotographerProfile, pk=pk)
+    photographer = get_object_or_404(PhotographerProfile.objects.select_related('user'), pk=pk, user__is_active=True)
     
-    # Increment views (Unique per user/session)
-    if request.user.is_authenticated:
-        # Check if user is NOT the photographer themselves
-        if request.user != photographer.user:
-            # Check if user already viewed
-            if not ProfileView.objects.filter(photographer=photographer, user=request.user).exists():
-                ProfileView.objects.create(photographer=photographer, user=request.user)
-                photographer.views_count += 1
-                photographer.save(update_fields=['views_count'])
-    else:
-        # Check session for anonymous users
-        session_key = request.session.session_key
-        if not session_key:
-            request.session.save()
-            session_key = request.session.session_key
-        
-        if session_key and not ProfileView.objects.filter(photographer=photographer, session_key=session_key).exists():
-             ProfileView.objects.create(
-                 photographer=photographer, 
-                 session_key=session_key,
-                 ip_address=request.META.get('REMOTE_ADDR')
-             )
-             photographer.views_count += 1
-             photographer.save(update_fields=['views_count'])
-    
-    is_favorite = False
-    if request.user.is_authenticated:
-        is_favorite = Favorite.objects.filter(user=request.user, photographer=photographer).exists()
+    # Increment views (unique per user, or per IP + User-Agent for guests)
+    register_view(request, photographer)
+
+    version = portfolio_version(photographer)
+    similar = recommendations.similar_to(photographer)
+    etag = portfolio_etag(request, photographer, version, similar)
+    response = conditional_response(request, etag)
+    if response is not None:
+        patch_vary_headers(response, ('Cookie',))
+        return response
 
     initial_data = {}
     if request.user.is_authenticated:
@@ -421,34 +576,58 @@ def photographer_detail(request, pk):
                 booking = form.save(commit=False)
                 booking.client = request.user
                 booking.photographer = photographer
-                booking.save()
+                with transaction.atomic():
+                    booking.save()
+                    notifications.booking_created(booking)
                 messages.success(request, 'Ваша заявка успешно отправлена!')
                 return redirect('photographer_detail', pk=pk)
 
-    # Get photos with like status
-    photos = photographer.photos.all().order_by('-uploaded_at')
-    
-    # Get distinct categories used by this photographer
-    used_categories = set(photos.values_list('category', flat=True))
-    
-    # Filter specialization choices
-    active_specializations = [
-        (code, name) for code, name in SPECIALIZATION_CHOICES 
-        if code in used_categories
-    ]
-    
-    if request.user.is_authenticated:
-        photos = photos.annotate(
-            is_liked=Exists(PhotoLike.objects.filter(photo=OuterRef('pk'), user=request.user))
-        )
-
-    return render(request, 'users/photographer_detail.html', {
+    # Likes are filled in by the page from viewer_state.
+    response = render(request, 'users/photographer_detail.html', {
         'photographer': photographer,
         'booking_form': form,
-        'is_favorite': is_favorite,
-        'photos': photos,
-        'specialization_choices': active_specializations
+        'portfolio': portfolio_section(photographer, version),
+        'similar_photographers': similar,
     })
+    patch_vary_headers(response, ('Cookie',))
+    if request.method == 'GET':
+        with_validators(response, etag)
+    return response
+
+def _ids(value):
+    ids = [int(part) for part in (value or '').split(',') if part.strip()]
+    if len(ids) > MAX_STATE_IDS:
+        raise ValueError(f'At most {MAX_STATE_IDS} ids per request')
+    return ids
+
+def viewer_state_for(user, photo_ids, photographer_ids):
+    """``(liked photo ids, favorite photographer ids)`` of ``user`` among the given ones.
+
+    Answered from the cached membership sets; at most one query when they are not cached yet.
+    """
+    if not user.is_authenticated or not (photo_ids or photographer_ids):
+        return [], []
+    members = memberships.load(user)
+    return (
+        [pk for pk in photo_ids if pk in members[memberships.LIKES]],
+        [pk for pk in photographer_ids if pk in members[memberships.FAVORITES]],
+    )
+
+def viewer_state(request):
+    """The viewer's likes and favorites among the ``photos`` and ``photographers`` ids (comma-separated).
+
+    Pages that are the same for everyone (and cached) ask for it to show
+    per-user state.
+    """
+    try:
+        photo_ids = _ids(request.GET.get('photos'))
+        photographer_ids = _ids(request.GET.get('photographers'))
+    except ValueError as error:
+        return JsonResponse({'error': str(error)}, status=400)
+    liked, favorites = viewer_state_for(request.user, photo_ids, photographer_ids)
+    response = JsonResponse({'liked': sorted(liked), 'favorites': sorted(favorites)})
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
 
 @login_required
 def toggle_favorite(request, pk):
@@ -461,6 +640,7 @@ def toggle_favorite(request, pk):
             is_favorite = False
         else:
             is_favorite = True
+        memberships.forget_on_commit([request.user.pk], memberships.FAVORITES)
             
         return JsonResponse({'status': 'ok', 'is_favorite': is_favorite})
     return JsonResponse({'status': 'error'}, status=400)
@@ -481,6 +661,7 @@ def toggle_photo_like(request, pk):
             is_liked = False
         else:
             is_liked = True
+        memberships.forget_on_commit([request.user.pk], memberships.LIKES)
             
         return JsonResponse({
             'status': 'ok', 
@@ -512,21 +693,182 @@ def delete_profile_image(request):
             return JsonResponse({'status': 'error', 'message': str(e)}, status=500)
     return JsonResponse({'status': 'error', 'message': 'Invalid method'}, status=405)
 
+@login_required
+def photo_upload_start(request):
+    """Presigned URL for uploading one photo straight to the storage.
+
+    POST ``name``, ``content_type`` and ``size`` of the file. The answer has
+    the ``url``, ``method`` and ``headers`` of the upload, and the ``token``
+    to pass to ``photo_upload_complete`` afterwards.
+    """
+    if request.method != 'POST':
+        return JsonResponse({'error': 'POST required'}, status=405)
+    profile = PhotographerProfile.objects.filter(user=request.user).first()
+    if profile is None:
+        return JsonResponse({'error': 'Загружать фото могут только фотографы.'}, status=403)
+    try:
+        upload = direct_uploads.start(
+            profile, request.POST.get('name', ''), request.POST.get('content_type', ''),
+            int(request.POST.get('size') or 0),
+        )
+    except ValueError as error:
+        return JsonResponse({'error': str(error)}, status=400)
+    return JsonResponse(upload)
+
+@login_required
+def photo_upload_complete(request):
+    """Register a photo uploaded with ``photo_upload_start``: POST its ``token`` and ``category``."""
+    if request.method != 'POST':
+        return JsonResponse({'error': 'POST required'}, status=405)
+    profile = PhotographerProfile.objects.filter(user=request.user).first()
+    if profile is None:
+        return JsonResponse({'error': 'Загружать фото могут только фотографы.'}, status=403)
+    category = request.POST.get('category', 'wedding')
+    if category not in dict(SPECIALIZATION_CHOICES):
+        return JsonResponse({'error': 'Неизвестная категория.'}, status=400)
+    try:
+        photo = direct_uploads.complete(profile, request.POST.get('token', ''), category)
+    except ValueError as error:
+        return JsonResponse({'error': str(error)}, status=400)
+    except OSError:
+        return JsonResponse({'error': 'Хранилище недоступно, попробуйте позже.'}, status=503)
+    return JsonResponse({'id': photo.pk, 'url': photo.image.url})
+
+@login_required
+def chunked_upload_create(request):
+    """Start a chunked upload: POST ``name``, ``size`` and ``category`` of one file."""
+    if request.method != 'POST':
+        return JsonResponse({'error': 'POST required'}, status=405)
+    profile = PhotographerProfile.objects.filter(user=request.user).first()
+    if profile is None:
+        return JsonResponse({'error': 'Загружать фото могут только фотографы.'}, status=403)
+    category = request.POST.get('category', 'wedding')
+    if category not in dict(SPECIALIZATION_CHOICES):
+        return JsonResponse({'error': 'Неизвестная категория.'}, status=400)
+    try:
+        upload = chunked_uploads.create(profile, request.POST.get('name', ''), int(request.POST.get('size') or 0), category)
+    except ValueError as error:
+        return JsonResponse({'error': str(error)}, status=getattr(error, 'status', 400))
+    return JsonResponse({
+        'id': str(upload.pk),
+        'url': reverse('chunked_upload', args=[upload.pk]),
+        'chunk_size': upload.chunk_size,
+        'chunk_count': upload.chunk_count,
+    }, status=201)
+
+@login_required
+def chunked_upload(request, pk):
+    """One chunked upload of the photographer.
+
+    GET: the ``received`` chunk indexes, to resume. PUT: one chunk, its
+    offset in the ``Upload-Offset`` header. POST: finish, registering the
+    photo once every chunk is in. DELETE: abort.
+    """
+    upload = ChunkedUpload.objects.filter(pk=pk, photographer__user=request.user).first()
+    if upload is None:
+        return JsonResponse({'error': 'Загрузка не найдена.'}, status=404)
+    try:
+        if request.method == 'GET':
+            pass
+        elif request.method == 'PUT':
+            offset = int(request.headers.get('Upload-Offset', ''))
+            length = int(request.META.get('CONTENT_LENGTH') or 0)
+            chunked_uploads.write_chunk(upload, offset, length, request)
+        elif request.method == 'POST':
+            photo = chunked_uploads.finish(upload)
+            return JsonResponse({'status': 'done', 'photo': {'id': photo.pk, 'url': photo.image.url}})
+        elif request.method == 'DELETE':
+            chunked_uploads.discard(upload)
+            return JsonResponse({'status': 'deleted'})
+        else:
+            return JsonResponse({'error': 'Method not allowed'}, status=405)
+    except ValueError as error:
+        return JsonResponse({'error': str(error)}, status=getattr(error, 'status', 400))
+    return JsonResponse({
+        'status': upload.status,
+        'chunk_size': upload.chunk_size,
+        'chunk_count': upload.chunk_count,
+        'received': chunked_uploads.received(upload),
+    })
+
 def gallery(request):
-    photos = Photo.objects.all().order_by('-uploaded_at')
-    
-    if request.user.is_authenticated:
-        favorite_ids = Favorite.objects.filter(user=request.user).values_list('photographer_id', flat=True)
-        for photo in photos:
-            photo.is_favorite = photo.photographer.id in favorite_ids
+    # The ETag costs no query: the version moves with every photo, profile
+    # and account change (see users/gallery.py).
+    etag = quote_etag(hashlib.md5(f"{gallery_version()}:{request.user.pk}".encode()).hexdigest())
+    response = conditional_response(request, etag)
+    if response is not None:
+        patch_vary_headers(response, ('Cookie',))
+        return response
+
+    # Photos of deactivated accounts waiting for their purge are hidden.
+    visible = Photo.objects.filter(photographer__user__is_active=True)
+    photos = list(visible.select_related('photographer__user').order_by('-uploaded_at'))
+    favorite_ids = memberships.favorites(request.user)
+    for photo in photos:
+        photo.is_favorite = photo.photographer_id in favorite_ids
             
-    return render(request, 'users/gallery.html', {'photos': photos})
+    response = render(request, 'users/gallery.html', {'photos': photos})
+    patch_vary_headers(response, ('Cookie',))
+    return with_validators(response, etag)
+
+NEWS_PER_PAGE = 10
+NEWS_FEED_CACHE_TIMEOUT = 24 * 60 * 60
 
 def news(request):
     news_items = News.objects.all().order_by('-created_at')
-    return render(request, 'users/news.html', {'news_items': news_items})
+    query = request.GET.get('q', '').strip()
+    if query:
+        found = search.search(news_items, search.NEWS_TABLE, query)
+        if found is None:
+            found = news_items.filter(Q(title__icontains=query) | Q(content__icontains=query))
+        news_items = found
+
+    paginator = Paginator(news_items, NEWS_PER_PAGE)
+    try:
+        news_page = paginator.page(request.GET.get('page', 1))
+    except PageNotAnInteger:
+        news_page = paginator.page(1)
+    except EmptyPage:
+        news_page = paginator.page(paginator.num_pages)
+
+    if query:
+        for item in news_page:
+            item.title_highlighted = search.highlight(item.title, query, words=50)
+            item.search_snippet = search.highlight(strip_tags(item.content), query, words=50)
+    return render(request, 'users/news.html', {'news_items': news_page, 'query': query})
+
+def news_feed(request, feed_class):
+    """RSS/Atom feed that answers 304 from the validators and caches the rendered XML."""
+    state = News.objects.aggregate(count=Count('pk'), created=Max('created_at'), updated=Max('updated_at'))
+    last_modified = max(filter(None, [state['created'], state['updated']]), default=None)
+    etag = quote_etag(hashlib.md5(
+        f"{feed_class.__name__}:{state['count']}:{state['created']}:{state['updated']}".encode()
+    ).hexdigest())
+
+    response = conditional_response(request, etag, last_modified)
+    if response is not None:
+        return response
+
+    # The key changes whenever a News row is added, edited or deleted.
+    cache_key = f'news_feed:{etag}'
+    cached = cache.get(cache_key)
+    if cached is None:
+        feed_response = feed_class()(request)
+        cached = (feed_response.content, feed_response['Content-Type'])
+        cache.set(cache_key, cached, NEWS_FEED_CACHE_TIMEOUT)
+    response = HttpResponse(cached[0], content_type=cached[1])
+    return with_validators(response, etag, last_modified)
 
 def news_detail(request, pk):
     news_item = get_object_or_404(News, pk=pk)
-    return render(request, 'users/news_detail.html', {'news': news_item})
-
+    # The page shows the viewer's menu and, for admins, an edit link, so the
+    # validator is per viewer.
+    etag = quote_etag(hashlib.md5(
+        f'{news_item.pk}:{news_item.created_at}:{news_item.updated_at}:{request.user.pk}'.encode()
+    ).hexdigest())
+    last_modified = max(news_item.created_at, news_item.updated_at)
+    response = conditional_response(request, etag, last_modified)
+    if response is not None:
+        return response
+    response = render(request, 'users/news_detail.html', {'news': news_item})
+    return with_validators(response, etag, last_modified)